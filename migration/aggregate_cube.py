@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Precomputed aggregate cube over a deal list.
+
+The site's stats (deal count, total and average funding), sector and round
+charts, city leaderboard and map all re-summed round counts and amounts
+over every filtered deal after each filter change. build_cube() sums them
+once per combination of
+
+  sector × round type × city × year × month
+
+and Cube answers any filter on those dimensions from the cells:
+
+  {
+    "format": "ftj-deals-cube",
+    "version": 1,
+    "data_version": "3f2a9c...",
+    "values": {"sector": ["AI", "Fintech", ...], "round": ["Seed", ...],
+               "city": ["Paris", ...], "year": [2025, 2026], "month": [1, 2, ...]},
+    "combos": [[0], [0, 1], [], ...],            # sector sets (indexes into values.sector)
+    "cells": [[combo, round, city, year, month, count, disclosed, amount], ...]
+  }
+
+The number of distinct companies in the stats is still counted from the
+filtered deals, because distinct counts do not add up across cells.
+
+Dimension values are indexes into `values` (null: no round type / city /
+parseable month). Measures: count of rounds, count of rounds with a
+disclosed amount (> 0), and the sum of amount (€M, as shown on the site).
+Months are numbers (month_number()), whatever the stored spelling.
+
+A company's rounds belong to all of its sectors. The cells are keyed by the
+deal's whole sector set, not by one sector, so every round is in exactly
+one cell: totals never count a multi-sector round twice, and filtering on
+one sector takes each round once. Only a breakdown by sector lists a
+round under each of its sectors, as the sector chart does; the values of
+such a breakdown overlap and do not add up to the total.
+
+  cube = Cube(build_cube(deals))
+  cube.total(year=2026, city='Paris')         # {'count': 41, 'disclosed': 37, 'amount': 512.3}
+  cube.breakdown('sector', round='Seed')       # {'AI': {...}, 'Fintech': {...}, ...}
+"""
+
+import itertools
+import json
+import os
+
+from snapshot import month_number
+
+FORMAT = 'ftj-deals-cube'
+VERSION = 1
+
+DIMENSIONS = ('sector', 'round', 'city', 'year', 'month')
+MEASURES = ('count', 'disclosed', 'amount')
+
+
+def _amount(deal):
+    """deal.amount || 0, as the site sums it."""
+    return deal.get('amount') or 0
+
+
+def deal_cell(deal):
+    """(sector set, round, city, year, month) of one deal."""
+    return (tuple(sorted(set(deal.get('sectors') or []))), deal.get('round') or None,
+            deal.get('hq') or None, deal.get('year') or None, month_number(deal.get('month')))
+
+
+def _sorted_values(values):
+    return sorted(values, key=lambda v: (v is not None, v))
+
+
+def build_cube(deals, **extra):
+    """The cube document of `deals`; `extra` top-level fields are kept as is."""
+    cells = {}
+    for deal in deals:
+        measures = cells.setdefault(deal_cell(deal), [0, 0, 0])
+        amount = _amount(deal)
+        measures[0] += 1
+        measures[1] += amount > 0
+        measures[2] += amount
+
+    values = {'sector': sorted({s for key in cells for s in key[0]})}
+    for i, dim in enumerate(DIMENSIONS[1:], 1):
+        values[dim] = _sorted_values({key[i] for key in cells})
+    index = {dim: {v: i for i, v in enumerate(vals)} for dim, vals in values.items()}
+    combos = sorted({key[0] for key in cells}, key=lambda c: (len(c), c))
+    combo_index = {c: i for i, c in enumerate(combos)}
+
+    rows = []
+    for key, (count, disclosed, amount) in sorted(cells.items(), key=lambda kv: -kv[1][0]):
+        rows.append([combo_index[key[0]]] + [index[dim][v] for dim, v in zip(DIMENSIONS[1:], key[1:])]
+                    + [count, disclosed, round(amount, 6)])
+    return {
+        'format': FORMAT,
+        'version': VERSION,
+        **extra,
+        'values': values,
+        'combos': [[index['sector'][s] for s in combo] for combo in combos],
+        'cells': rows,
+    }
+
+
+class Cube:
+    """Totals and breakdowns of a cube document for any filter on its dimensions."""
+
+    def __init__(self, document):
+        if document.get('format') != FORMAT or document.get('version') != VERSION:
+            raise ValueError(f'not a version {VERSION} {FORMAT} document')
+        values = document['values']
+        combos = [tuple(values['sector'][i] for i in combo) for combo in document['combos']]
+        self.cells = []
+        for row in document['cells']:
+            key = (combos[row[0]],) + tuple(values[dim][i] for dim, i in zip(DIMENSIONS[1:], row[1:5]))
+            self.cells.append((key, row[5:8]))
+        self._groups = {}
+
+    def _group(self, filter_dims, by):
+        """{filter values: {`by` value: [count, disclosed, amount]}}, computed once per shape."""
+        shape = (filter_dims, by)
+        groups = self._groups.get(shape)
+        if groups is not None:
+            return groups
+        groups = {}
+        positions = [DIMENSIONS.index(d) for d in filter_dims]
+        by_pos = DIMENSIONS.index(by) if by else None
+        for key, measures in self.cells:
+            # The sector dimension takes a cell once under each sector of its set
+            options = [key[0] if p == 0 else (key[p],) for p in positions]
+            targets = key[0] if by_pos == 0 else ((key[by_pos],) if by else (None,))
+            for fkey in itertools.product(*options):
+                bucket = groups.setdefault(fkey, {})
+                for value in targets:
+                    total = bucket.setdefault(value, [0, 0, 0])
+                    for i, m in enumerate(measures):
+                        total[i] += m
+        self._groups[shape] = groups
+        return groups
+
+    @staticmethod
+    def _filters(filters):
+        unknown = set(filters) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f'unknown cube dimensions: {", ".join(sorted(unknown))}')
+        dims = tuple(d for d in DIMENSIONS if filters.get(d) is not None)
+        return dims, tuple(filters[d] for d in dims)
+
+    def breakdown(self, by, **filters):
+        """{value of `by`: measures} over the rounds matching `filters` (dimension=value)."""
+        if by not in DIMENSIONS:
+            raise ValueError(f'unknown cube dimension: {by}')
+        dims, fkey = self._filters(filters)
+        bucket = self._group(dims, by).get(fkey, {})
+        return {value: dict(zip(MEASURES, m)) for value, m in bucket.items()}
+
+    def total(self, **filters):
+        """Measures over the rounds matching `filters`, each round counted once."""
+        dims, fkey = self._filters(filters)
+        measures = self._group(dims, None).get(fkey, {}).get(None, [0, 0, 0])
+        return dict(zip(MEASURES, measures))
+
+
+def cube_path(snapshot_path):
+    """deals-snapshot.json → deals-snapshot.cube.json"""
+    root, ext = os.path.splitext(snapshot_path)
+    return f'{root}.cube{ext or ".json"}'
+
+
+def write_cube(path, document):
+    """Write a cube document atomically (temp file + rename)."""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Ingest and cleanup benchmarks with round-trip budgets.
+
+Replays the DEALS of insert-deals-march2026.py and insert-jan16-2026-curl.py,
+scaled up synthetically (copy k of a deal gets " k" appended to its company
+and founder names, and a share of its investors renamed too), against the
+local PostgREST stand-in (fake_postgrest.py) with simulated latency. Every
+path gets a fresh database except where it builds on an earlier one:
+
+  ingest-steps    DealIngestor, step by step (bulk resolve + per-deal links)
+  ingest-resume   the same deals again with the same journal
+  ingest-rpc      DealIngestor with use_rpc (ingest_deals, one request per batch)
+  patch-rounds    new notes for every ingested round (round_patch.py)
+  cleanup         cleanup-investors-cat4.py with its OPERATIONS / DELETES
+                  scaled the same way, against seeded investors and links
+
+For each path it reports units/sec, total requests (counted server-side,
+not counting injected failures) and requests per unit, and exits 1 if a path needs more requests per unit
+than its budget in BUDGETS. Raise a budget only together with the change
+that justifies it.
+
+Usage:
+  python3 migration/benchmark-ingest.py
+  python3 migration/benchmark-ingest.py --scale 50 --latency 0.03 --jitter 0.02
+  python3 migration/benchmark-ingest.py --path ingest-rpc --error-rate 0.02 --json bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import runpy
+import sys
+import tempfile
+import time
+
+# The scripts refuse to start without a key; the fake server accepts any
+os.environ.setdefault('SUPABASE_SERVICE_KEY', 'benchmark')
+
+import supabase_rest  # noqa: E402
+from deal_ingest import DEFAULT_CONCURRENCY, DealIngestor, from_flat  # noqa: E402
+from entity_resolver import EntityResolver  # noqa: E402
+from fake_postgrest import FakePostgrest  # noqa: E402
+from ingest_journal import IngestJournal  # noqa: E402
+from round_patch import patch_rounds  # noqa: E402
+from supabase_rest import SupabaseClient  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Most requests per unit (deal, round or cleanup entry) each path may make
+BUDGETS = {
+    'ingest-steps':  4.5,
+    'ingest-resume': 0.0,
+    'ingest-rpc':    0.5,
+    'patch-rounds':  0.1,
+    'cleanup':       0.5,
+}
+
+RENAMED_INVESTOR_SHARE = 0.3
+
+
+def load_script(name):
+    """Module globals of a migration script, without running its main()."""
+    return runpy.run_path(os.path.join(HERE, name), run_name='benchmark')
+
+
+def template_deals():
+    """(nested deals, sector name → id) from the two weekly insert scripts."""
+    march = load_script('insert-deals-march2026.py')
+    jan16 = load_script('insert-jan16-2026-curl.py')
+    deals = list(march['DEALS'])
+    deals += [from_flat(d, announced_month='January', announced_year=2026) for d in jan16['DEALS']]
+    return deals, {**jan16['SECTOR_IDS'], **march['SECTORS']}
+
+
+def scale_deals(templates, scale, rng):
+    """`scale` copies of every template; copies after the first get new names."""
+    out = []
+    for k in range(scale):
+        for deal in templates:
+            if k == 0:
+                out.append(deal)
+                continue
+            suffix = f' {k}'
+            rounds = [{**rnd, 'investors': [
+                inv + suffix if rng.random() < RENAMED_INVESTOR_SHARE else inv
+                for inv in rnd.get('investors', [])]} for rnd in deal['rounds']]
+            out.append({**deal,
+                        'company': {**deal['company'], 'name': deal['company']['name'] + suffix},
+                        'founders': [f + suffix for f in deal.get('founders', [])],
+                        'rounds': rounds})
+    return out
+
+
+def sector_seed(sector_ids):
+    """One sectors row per distinct id (several names share an id in the scripts)."""
+    rows = {}
+    for name, sector_id in sector_ids.items():
+        rows.setdefault(sector_id, {'id': sector_id, 'name': name,
+                                    'slug': f'{len(rows)}-' + name.lower().replace(' ', '-')})
+    return list(rows.values())
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+
+    def server(self, seed=None):
+        a = self.args
+        return FakePostgrest(latency=a.latency, jitter=a.jitter, error_rate=a.error_rate,
+                             retry_after=0.05 if a.error_rate else None, seed=seed,
+                             random_seed=a.seed).start()
+
+    @staticmethod
+    def client(server):
+        client = SupabaseClient(url=server.url, key='benchmark')
+        client.metrics.progress = False
+        supabase_rest._client = client          # for scripts calling get_client()
+        return client
+
+    def measure(self, path, server, units, fn):
+        """Run fn; record its requests and speed if `path` was selected."""
+        server.reset_stats()
+        start = time.monotonic()
+        value = fn()
+        elapsed = time.monotonic() - start
+        if path not in self.args.path:
+            return value
+        # Injected failures and their retries are not the call pattern's fault
+        requests = server.requests - server.failures
+        per_unit = requests / units if units else 0.0
+        budget = BUDGETS[path]
+        self.results.append({
+            'path': path, 'units': units, 'seconds': round(elapsed, 3),
+            'units_per_s': round(units / elapsed, 1) if elapsed else None,
+            'requests': requests, 'requests_per_unit': round(per_unit, 3),
+            'injected_failures': server.failures,
+            'budget': budget, 'ok': per_unit <= budget,
+        })
+        return value
+
+    # ── Paths ────────────────────────────────────────────────────────────────
+
+    def run_ingest(self, deals, sector_ids):
+        a = self.args
+        seed = {'sectors': sector_seed(sector_ids)}
+        step_paths = {'ingest-steps', 'ingest-resume', 'patch-rounds'}
+        with tempfile.TemporaryDirectory() as tmp:
+            client = None
+
+            def ingest(use_rpc, journal_path):
+                journal = IngestJournal(journal_path)
+                try:
+                    ingestor = DealIngestor(client=client, resolver=EntityResolver(client),
+                                            sector_ids=sector_ids, concurrency=a.concurrency,
+                                            journal=journal, use_rpc=use_rpc)
+                    results = []
+                    for i in range(0, len(deals), a.batch_size):
+                        results += ingestor.run(deals[i:i + a.batch_size])
+                    return results
+                finally:
+                    journal.close()
+
+            if step_paths & set(a.path):
+                server = self.server(seed)
+                try:
+                    client = self.client(server)
+                    journal_path = os.path.join(tmp, 'steps.jsonl')
+                    results = self.measure('ingest-steps', server, len(deals),
+                                           lambda: ingest(False, journal_path))
+                    self.check(results, 'ingest-steps')
+                    self.measure('ingest-resume', server, len(deals), lambda: ingest(False, journal_path))
+
+                    round_ids = [rid for r in results for rid in r.round_ids]
+                    patches = {rid: {'notes': f'benchmark note {n}'} for n, rid in enumerate(round_ids)}
+                    self.measure('patch-rounds', server, len(patches),
+                                 lambda: patch_rounds(client, patches))
+                finally:
+                    server.stop()
+
+            if 'ingest-rpc' in a.path:
+                server = self.server(seed)
+                try:
+                    client = self.client(server)
+                    results = self.measure('ingest-rpc', server, len(deals),
+                                           lambda: ingest(True, os.path.join(tmp, 'rpc.jsonl')))
+                    self.check(results, 'ingest-rpc')
+                finally:
+                    server.stop()
+
+    def run_cleanup(self, scale, rng):
+        if 'cleanup' not in self.args.path:
+            return
+        script = load_script('cleanup-investors-cat4.py')
+        operations, deletes = script['OPERATIONS'], script['DELETES']
+        suffixes = [''] + [f' {k}' for k in range(1, scale)]
+        ops = [(d + s, c + s) for s in suffixes for d, c in operations]
+        dels = [n + s for s in suffixes for n in deletes]
+
+        # Every dirty name exists; about half the clean ones do (→ merges, the rest renames)
+        names = {d for d, _ in ops} | set(dels)
+        names |= {c for _, c in ops if rng.random() < 0.5}
+        server = self.server({'investors': [{'name': n} for n in sorted(names)]})
+        try:
+            db = server.db
+            company = db.insert('companies', [{'name': 'Benchmark Co'}])[0]
+            rounds = db.insert('funding_rounds', [{'company_id': company['id']} for _ in range(50)])
+            investor_ids = [r['id'] for r in db.rows['investors'].values()]
+            db.insert('funding_round_investors', [
+                {'funding_round_id': rounds[i % len(rounds)]['id'], 'investor_id': inv_id, 'is_lead': i % 3 == 0}
+                for i, inv_id in enumerate(investor_ids)])
+
+            self.client(server)
+            main = script['main']
+            main.__globals__['OPERATIONS'] = ops
+            main.__globals__['DELETES'] = dels
+
+            def cleanup():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    try:
+                        main()
+                    except SystemExit as e:
+                        if e.code:
+                            raise RuntimeError('cleanup reported errors')
+            self.measure('cleanup', server, len(ops) + len(dels), cleanup)
+        finally:
+            server.stop()
+
+    @staticmethod
+    def check(results, path):
+        failed = [r for r in results if not r.ok]
+        if failed:
+            raise RuntimeError(f'{path}: {len(failed)} deals failed, e.g. {failed[0].name}: {failed[0].error}')
+
+    # ── Report ───────────────────────────────────────────────────────────────
+
+    def print(self):
+        a = self.args
+        print(f'\nlatency {a.latency * 1000:.0f}ms (+{a.jitter * 1000:.0f}ms jitter), '
+              f'error rate {a.error_rate:.0%}, concurrency {a.concurrency}, scale x{a.scale}\n')
+        print(f'  {"path":<15} {"units":>6} {"secs":>7} {"units/s":>8} {"requests":>9} '
+              f'{"req/unit":>9} {"budget":>7}')
+        for r in self.results:
+            verdict = 'ok' if r['ok'] else 'OVER BUDGET'
+            print(f'  {r["path"]:<15} {r["units"]:>6} {r["seconds"]:>7.2f} {r["units_per_s"] or 0:>8.1f} '
+                  f'{r["requests"]:>9} {r["requests_per_unit"]:>9.3f} {r["budget"]:>7.2f}  {verdict}')
+        print()
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Benchmark ingest and cleanup round trips.')
+    p.add_argument('--scale', type=int, default=10, help='copies of every template deal (default 10)')
+    p.add_argument('--latency', type=float, default=0.02, help='simulated seconds per request (default 0.02)')
+    p.add_argument('--jitter', type=float, default=0.0, help='extra random latency, seconds')
+    p.add_argument('--error-rate', type=float, default=0.0, help='share of requests failing with 503')
+    p.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    p.add_argument('--batch-size', type=int, default=100, help='deals per DealIngestor.run (default 100)')
+    p.add_argument('--path', action='append', choices=sorted(BUDGETS),
+                   help='run only this path (repeatable; default all)')
+    p.add_argument('--seed', type=int, default=1, help='random seed for names and failures')
+    p.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = p.parse_args()
+    args.path = args.path or list(BUDGETS)
+    return args
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    templates, sector_ids = template_deals()
+    deals = scale_deals(templates, args.scale, rng)
+
+    bench = Bench(args)
+    bench.run_ingest(deals, sector_ids)
+    bench.run_cleanup(args.scale, rng)
+    bench.print()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(bench.results, f, indent=2)
+    over = [r['path'] for r in bench.results if not r['ok']]
+    if over:
+        print(f'Over budget: {", ".join(over)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Size and parse-time benchmark of the compact deal format.
+
+Compares, for funding-data.json and (if present) deals-snapshot.json:
+
+  json      the file as deployed (funding-data.json is indented)
+  minified  the same records without whitespace
+  compact   compact_snapshot.encode() of the records
+
+with raw and gzip sizes (Vercel serves the files compressed) and the time
+to parse each (json.loads, plus decode() for the compact form, median of
+--repeat runs). Every compact document is decoded and checked against its
+input first. The growth table then encodes the first 25/50/75/100 % of the
+records, to show how bytes per deal evolve as data is added. On
+funding-data.json they rise for both forms (compact 349 → 479 B/deal,
+gzipped 143 → 182), because later records carry more text and more new
+names. The growth is not sublinear.
+
+Usage:
+  python3 migration/benchmark-snapshot.py
+  python3 migration/benchmark-snapshot.py --repeat 50 --snapshot /tmp/deals-snapshot.json
+"""
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+
+from compact_snapshot import decode, dumps, encode
+from snapshot import DEFAULT_PATH as SNAPSHOT_PATH
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FUNDING_DATA_PATH = os.path.join(HERE, '..', 'funding-data.json')
+
+
+def median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def measure(name, text, repeat, decoder=None):
+    data = text.encode('utf-8')
+
+    def parse():
+        value = json.loads(data)
+        return decoder(value) if decoder else value
+    return {'name': name, 'bytes': len(data), 'gzip_bytes': len(gzip.compress(data, 9)),
+            'parse_ms': round(median_time(parse, repeat) * 1000, 2)}
+
+
+def compare(label, raw_text, deals, extra, repeat):
+    compact = encode(deals, **extra)
+    if decode(compact) != deals:
+        sys.exit(f'{label}: decode(encode(deals)) differs from the input')
+    minified = json.dumps(json.loads(raw_text), ensure_ascii=False, separators=(',', ':'))
+    rows = [measure('json', raw_text, repeat), measure('minified', minified, repeat),
+            measure('compact', dumps(compact), repeat, decoder=decode)]
+    print(f'\n{label}: {len(deals)} deals, '
+          + ', '.join(f'{len(t)} {name}' for name, t in compact['strings'].items()))
+    print(f'  {"form":<9} {"bytes":>9} {"gzip":>8} {"parse ms":>9} {"vs json":>8}')
+    for r in rows:
+        print(f'  {r["name"]:<9} {r["bytes"]:>9} {r["gzip_bytes"]:>8} {r["parse_ms"]:>9.2f} '
+              f'{r["bytes"] / rows[0]["bytes"]:>8.0%}')
+    return {'label': label, 'deals': len(deals), 'forms': rows}
+
+
+def growth(deals, repeat):
+    print('\nGrowth (funding-data.json prefixes)')
+    print(f'  {"deals":>6} {"minified B/deal":>16} {"compact B/deal":>15} {"vs minified":>12} '
+          f'{"tables B/deal":>14} {"gzip B/deal":>12} {"parse µs/deal":>14}')
+    out = []
+    for share in (0.25, 0.5, 0.75, 1.0):
+        part = deals[:max(1, round(len(deals) * share))]
+        minified = json.dumps(part, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        document = encode(part)
+        tables = len(json.dumps(document['strings'], ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        compact = measure('compact', dumps(document), repeat, decoder=decode)
+        n = len(part)
+        row = {'deals': n, 'minified_per_deal': round(len(minified) / n, 1),
+               'compact_per_deal': round(compact['bytes'] / n, 1),
+               'string_tables_per_deal': round(tables / n, 1),
+               'compact_gzip_per_deal': round(compact['gzip_bytes'] / n, 1),
+               'parse_us_per_deal': round(compact['parse_ms'] * 1000 / n, 2)}
+        out.append(row)
+        print(f'  {n:>6} {row["minified_per_deal"]:>16} {row["compact_per_deal"]:>15} '
+              f'{compact["bytes"] / len(minified):>12.0%} {row["string_tables_per_deal"]:>14} '
+              f'{row["compact_gzip_per_deal"]:>12} {row["parse_us_per_deal"]:>14}')
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark the compact deal format against the JSON files.')
+    p.add_argument('--repeat', type=int, default=20, help='parse runs per measurement (default 20)')
+    p.add_argument('--snapshot', default=SNAPSHOT_PATH, help='deals snapshot to include if it exists')
+    p.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = p.parse_args()
+
+    results = {'files': []}
+    with open(FUNDING_DATA_PATH, encoding='utf-8') as f:
+        raw = f.read()
+    funding = json.loads(raw)
+    results['files'].append(compare('funding-data.json', raw, funding, {}, args.repeat))
+
+    if os.path.exists(args.snapshot):
+        with open(args.snapshot, encoding='utf-8') as f:
+            raw = f.read()
+        snapshot = json.loads(raw)
+        extra = {k: v for k, v in snapshot.items() if k not in ('format', 'version', 'deals')}
+        results['files'].append(compare(os.path.basename(args.snapshot), raw, snapshot['deals'],
+                                        extra, args.repeat))
+
+    results['growth'] = growth(funding, args.repeat)
+    print()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Build deals-snapshot.json, the precomputed deal list the site loads.
+
+Reads the eight tables once (paged, see snapshot.py), joins them into one
+deal per funding round exactly like index.html's loadData() and writes
+the snapshot next to index.html. Deploy it with the site: index.html
+loads it in one request and only falls back to querying Supabase when it
+is missing or older than a week.
+
+Needs the 20261017000300_snapshot_changes.sql migration, for full builds
+too: every table is read with its updated_at column, which sectors, cities
+and the junction tables only have from that migration on.
+
+When the output file already holds a snapshot, only the rows written or
+deleted since its watermark are read and merged into it, so a weekly
+refresh costs about as much as the week's changes. --full rebuilds from every row, as
+does a missing, unreadable or too old (TOMBSTONE_RETENTION_DAYS) snapshot.
+
+Run it after every ingest or update batch.
+
+Usage:
+  export SUPABASE_SERVICE_KEY="..."
+  python3 migration/build-snapshot.py
+  python3 migration/build-snapshot.py --full
+  python3 migration/build-snapshot.py --output /tmp/deals-snapshot.json
+  python3 migration/build-snapshot.py --compact     # also deals-snapshot.compact.json
+
+Next to the output it also writes deals-snapshot.search.json, the search
+index the site queries (search_index.py), deals-snapshot.cube.json, the
+aggregate cube its charts and leaderboards read (aggregate_cube.py), and
+with --compact the dictionary-encoded form (compact_snapshot.py).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from aggregate_cube import build_cube, cube_path, write_cube
+from compact_snapshot import compact_path, encode, write_compact
+from search_index import build_index, index_path, write_index
+from snapshot import (COLUMNS, DEFAULT_PATH, build_deals, load_tables, read_snapshot,
+                      refresh_deals, watermark_expired, watermark_of, write_snapshot)
+from supabase_rest import SERVICE_KEY, SupabaseError, get_client
+
+if not SERVICE_KEY:
+    print('Error: SUPABASE_SERVICE_KEY required'); sys.exit(1)
+
+
+def previous_snapshot(path):
+    """The snapshot at `path` if it can be refreshed incrementally, else None (with the reason)."""
+    if not os.path.exists(path):
+        return None, 'no previous snapshot'
+    try:
+        snapshot = read_snapshot(path)
+    except ValueError as e:
+        return None, str(e)
+    if not snapshot.get('watermark'):
+        return None, 'previous snapshot has no watermark'
+    if watermark_expired(snapshot['watermark']):
+        return None, f'watermark {snapshot["watermark"]} is older than the deletion log'
+    return snapshot, None
+
+
+def full_build(client):
+    print(f'Loading {len(COLUMNS)} tables...')
+    tables = load_tables(client)
+    for table, rows in tables.items():
+        print(f'  {table:<24} {len(rows)}')
+    return build_deals(tables), watermark_of(tables)
+
+
+def incremental(client, previous):
+    print(f'Reading changes since {previous["watermark"]}...')
+    deals, watermark, stats = refresh_deals(client, previous['deals'], previous['watermark'])
+    for table, n in stats['changed'].items():
+        if n:
+            print(f'  {table:<24} {n} changed')
+    print(f'  {"deleted_rows":<24} {stats["tombstones"]}')
+    print(f'  {stats["companies"]} companies touched: {stats["removed"]} deals dropped, '
+          f'{stats["rejoined"]} re-joined')
+    return deals, watermark
+
+
+def main():
+    p = argparse.ArgumentParser(description='Build or refresh the deals snapshot for the site.')
+    p.add_argument('--output', default=DEFAULT_PATH,
+                   help='snapshot path (default deals-snapshot.json at the repo root)')
+    p.add_argument('--full', action='store_true', help='rebuild from every row instead of the changes')
+    p.add_argument('--compact', action='store_true',
+                   help='also write the dictionary-encoded form (<output>.compact.json, '
+                        'experimental: nothing reads it yet)')
+    args = p.parse_args()
+
+    start = time.monotonic()
+    client = get_client()
+    previous, reason = (None, '--full') if args.full else previous_snapshot(args.output)
+    try:
+        if previous:
+            deals, watermark = incremental(client, previous)
+        else:
+            print(f'Full build ({reason})')
+            deals, watermark = full_build(client)
+    except SupabaseError as e:
+        print(f'  ERROR: {e}'); sys.exit(1)
+
+    snapshot = write_snapshot(args.output, deals, watermark=watermark)
+    size = os.path.getsize(args.output)
+    unchanged = ' (unchanged)' if previous and previous['data_version'] == snapshot['data_version'] else ''
+    print(f'\nWrote {snapshot["count"]} deals to {args.output} '
+          f'({size / 1024:.0f} KB, data version {snapshot["data_version"]}{unchanged}) '
+          f'in {time.monotonic() - start:.1f}s, {client.metrics.requests} requests')
+
+    path = index_path(args.output)
+    index = build_index(deals, data_version=snapshot['data_version'])
+    write_index(path, index)
+    print(f'Wrote {path} ({len(index["tokens"])} tokens, {os.path.getsize(path) / 1024:.0f} KB)')
+
+    path = cube_path(args.output)
+    cube = build_cube(deals, data_version=snapshot['data_version'])
+    write_cube(path, cube)
+    print(f'Wrote {path} ({len(cube["cells"])} cells, {os.path.getsize(path) / 1024:.0f} KB)')
+
+    if args.compact:
+        path = compact_path(args.output)
+        extra = {k: v for k, v in snapshot.items() if k not in ('format', 'version', 'deals')}
+        write_compact(path, encode(deals, **extra))
+        print(f'Wrote {path} ({os.path.getsize(path) / 1024:.0f} KB)')
+
+
+if __name__ == '__main__':
+    main()
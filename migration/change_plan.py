@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Plan-then-apply support for the batch update scripts.
+
+A script loads the current state of everything it touches in bulk, records
+the desired state into a ChangePlan (which keeps only the differences),
+prints the plan, and then applies just that delta. Re-running a batch that
+already went through costs the reads and nothing else.
+
+  plan = ChangePlan()
+  plan.diff_row('funding_rounds', {'id': rid}, current_row, {'notes': notes}, label='FineHeart')
+  plan.diff_links('company_people', 'company_id', 'person_id', company_id,
+                  current_links, desired_links, key_extra={'role': 'founder'})
+  plan.print()
+  if not dry_run:
+      plan.apply(client, resolver)
+
+Rows can reference entities that do not exist yet with Ref(table, name);
+plan.create() queues them and apply() creates them in bulk first.
+
+Junction tables (funding_round_investors, company_people, company_sectors)
+are reconciled by diff: load_links() fetches the current rows of many
+parents at once, diff_links() compares them with the desired children, and
+apply() writes the delta as three batched requests per table — a DELETE by
+id=in.(...) for removed rows, an upsert on id for changed ones (e.g. an
+is_lead flip) and an array insert for new ones. Untouched rows keep their
+id and created_at.
+"""
+
+import json
+import urllib.parse
+
+from entity_resolver import LINK_TABLES, in_list_chunks, insert_links, select_in
+
+SYMBOLS = {'create': '+', 'insert': '+', 'update': '~', 'delete': '-'}
+
+
+class Ref:
+    """Id of an entity row (table, name) that may only exist after apply()."""
+
+    def __init__(self, table, name):
+        self.table = table
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, Ref) and (self.table, self.name) == (other.table, other.name)
+
+    def __hash__(self):
+        return hash((self.table, self.name))
+
+    def __repr__(self):
+        return f'<new {self.table[:-1]} "{self.name}">'
+
+
+def load_links(client, table, parent_col, child_col, parent_ids, columns=(), filters=None):
+    """
+    Return {parent_id: {child_id: row}} for many parents in a few requests.
+
+    Each row holds the link's `id` plus `columns`, which is what diff_links()
+    needs to delete or update it by id.
+    """
+    links = {pid: {} for pid in parent_ids}
+    select = ','.join(['id', parent_col, child_col, *columns])
+    for r in select_in(client, table, select, parent_col, parent_ids, filters=filters):
+        links[r[parent_col]][r[child_col]] = {'id': r['id'], **{c: r[c] for c in columns}}
+    return links
+
+
+def _eq(value):
+    return 'eq.' + urllib.parse.quote(str(value).lower() if isinstance(value, bool) else str(value), safe='')
+
+
+class ChangePlan:
+    """Inserts / updates / deletes per table, plus entities to create first."""
+
+    def __init__(self):
+        self.creates = {}   # table → {name}
+        self.inserts = {}   # table → [row]
+        self.updates = {}   # table → [(key, changes)]
+        self.upserts = {}   # table → [row with id], written as one upsert on id
+        self.deletes = {}   # table → [key]
+        self.lines = []     # (symbol, table, label) for printing
+
+    # ── Recording ────────────────────────────────────────────────────────────
+
+    def create(self, table, name, label=None):
+        """Queue an entity for bulk get-or-create; returns a Ref to use in rows."""
+        names = self.creates.setdefault(table, set())
+        if name not in names:
+            names.add(name)
+            self.lines.append(('+', table, label or name))
+        return Ref(table, name)
+
+    def insert(self, table, row, label=None):
+        self.inserts.setdefault(table, []).append(row)
+        self.lines.append(('+', table, label or row))
+
+    def update(self, table, key, changes, label=None):
+        self.updates.setdefault(table, []).append((key, changes))
+        self.lines.append(('~', table, label or f'{key} {changes}'))
+
+    def upsert(self, table, row, label=None):
+        self.upserts.setdefault(table, []).append(row)
+        self.lines.append(('~', table, label or row))
+
+    def delete(self, table, key, label=None):
+        self.deletes.setdefault(table, []).append(key)
+        self.lines.append(('-', table, label or key))
+
+    def diff_row(self, table, key, current, desired, label=None):
+        """Update only the columns of `desired` that differ from `current`."""
+        changes = {k: v for k, v in desired.items() if (current or {}).get(k) != v}
+        if changes:
+            self.update(table, key, changes, label=f'{label}: {", ".join(changes)}' if label else None)
+        return bool(changes)
+
+    def diff_links(self, table, parent_col, child_col, parent_id, current, desired,
+                   key_extra=None, label=None, child_labels=None):
+        """
+        Reconcile one parent's junction rows.
+
+        `current` and `desired` map child id → {column: value}; children only
+        in `desired` are inserted, only in `current` deleted, and rows in both
+        are updated if any desired column differs. Current rows from
+        load_links() carry their `id`, so they are deleted and updated by id.
+        """
+        child_labels = child_labels or {}
+
+        def describe(child):
+            name = child_labels.get(child, child.name if isinstance(child, Ref) else child)
+            return f'{label} ↔ {name}' if label else None
+
+        for child, attrs in desired.items():
+            key = {parent_col: parent_id, **(key_extra or {}), child_col: child}
+            row = current.get(child)
+            if row is None:
+                self.insert(table, {**key, **attrs}, label=describe(child))
+            elif 'id' in row:
+                changes = {k: v for k, v in attrs.items() if row.get(k) != v}
+                if changes:
+                    # The full row, so the upsert's insert arm satisfies NOT NULLs
+                    self.upsert(table, {'id': row['id'], **key, **attrs},
+                                label=f'{describe(child)}: {", ".join(changes)}' if label else None)
+            else:
+                self.diff_row(table, key, row, attrs, label=describe(child))
+        for child, row in current.items():
+            if child not in desired:
+                key = ({'id': row['id']} if 'id' in row else
+                       {parent_col: parent_id, **(key_extra or {}), child_col: child})
+                self.delete(table, key, label=describe(child))
+
+    # ── Reporting ────────────────────────────────────────────────────────────
+
+    def size(self):
+        return len(self.lines)
+
+    def is_empty(self):
+        return not self.lines
+
+    def counts(self):
+        """{table: {'+': n, '~': n, '-': n}}"""
+        out = {}
+        for symbol, table, _ in self.lines:
+            per = out.setdefault(table, {'+': 0, '~': 0, '-': 0})
+            per[symbol] += 1
+        return out
+
+    def print(self, verbose=True):
+        print('\n--- Change plan ---\n')
+        if self.is_empty():
+            print('  No changes — database already matches.\n')
+            return
+        if verbose:
+            for symbol, table, label in self.lines:
+                print(f'  {symbol} {table:<24} {label}')
+            print()
+        for table, per in sorted(self.counts().items()):
+            print(f'  {table:<24} +{per["+"]} ~{per["~"]} -{per["-"]}')
+        print()
+
+    # ── Applying ─────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _grouped(keys_and_payloads):
+        """
+        Group (key, payload) pairs that differ only in the key's last column,
+        so each group becomes one request with `last=in.(...)`.
+        """
+        groups = {}
+        for key, payload in keys_and_payloads:
+            cols = list(key)
+            fixed = tuple((c, key[c]) for c in cols[:-1])
+            sig = (fixed, cols[-1], json.dumps(payload, sort_keys=True, default=str))
+            groups.setdefault(sig, (payload, []))[1].append(key[cols[-1]])
+        for (fixed, last_col, _), (payload, values) in groups.items():
+            for in_list in in_list_chunks([str(v) for v in values]):
+                filters = '&'.join([f'{c}={_eq(v)}' for c, v in fixed] + [f'{last_col}=in.{in_list}'])
+                yield filters, payload
+
+    def apply(self, client, resolver=None):
+        """Write the plan: entity creates, then deletes, updates, upserts and inserts."""
+        ids = {}
+        for table, names in self.creates.items():
+            for name, id_ in resolver.get_or_create_many(table, names).items():
+                ids[Ref(table, name)] = id_
+
+        def resolve(value):
+            return ids[value] if isinstance(value, Ref) else value
+
+        for table, keys in self.deletes.items():
+            for filters, _ in self._grouped((k, None) for k in keys):
+                client.request('DELETE', f'{table}?{filters}', prefer='return=minimal')
+
+        for table, items in self.updates.items():
+            for filters, changes in self._grouped(items):
+                client.request('PATCH', f'{table}?{filters}', body=changes, prefer='return=minimal')
+
+        for table, rows in self.upserts.items():
+            rows = [{k: resolve(v) for k, v in row.items()} for row in rows]
+            client.insert(table, rows, on_conflict='id', resolution='merge-duplicates',
+                          returning='minimal')
+
+        for table, rows in self.inserts.items():
+            rows = [{k: resolve(v) for k, v in row.items()} for row in rows]
+            if table in LINK_TABLES:
+                insert_links(client, table, rows)
+            else:
+                client.insert(table, rows, returning='minimal')
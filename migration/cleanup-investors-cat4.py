@@ -5,131 +5,63 @@ Category 4 Investor Cleanup Script
 Cleans up dirty investor records:
   - MERGE: dirty record → existing clean record (reassign round links, delete dirty)
   - RENAME: dirty record with no clean version (rename in-place)
-  - DELETE: pure junk/fragment records (remove links + delete)
+  - DELETE: pure junk/fragment records (links go with ON DELETE CASCADE)
+
+Every name is resolved up front with a few chunked name=in.() reads and
+each entry is classified locally; then all renames are one bulk upsert,
+all merges one merge_investors_batch RPC
+(supabase/migrations/20261017000100_merge_investors.sql) and all deletes
+one id=in.() request.
 
 Usage:
   export SUPABASE_SERVICE_KEY="your-service-role-key"
   python3 migration/cleanup-investors-cat4.py
 """
 
-import json
-import os
 import sys
-import urllib.request
-import urllib.parse
 
-SUPABASE_URL = os.environ.get('SUPABASE_URL', 'https://tlwqkglfyjydwsgjrclx.supabase.co')
-SERVICE_KEY = os.environ.get('SUPABASE_SERVICE_KEY', '')
+from entity_resolver import in_list_chunks, select_in
+from supabase_rest import SERVICE_KEY, get_client
 
 if not SERVICE_KEY:
     print('Error: SUPABASE_SERVICE_KEY environment variable is required.')
     sys.exit(1)
 
-HEADERS = {
-    'apikey': SERVICE_KEY,
-    'Authorization': f'Bearer {SERVICE_KEY}',
-    'Content-Type': 'application/json',
-    'Prefer': 'return=representation',
-}
-
 
 def api_request(method, path, body=None, prefer=None):
-    url = f'{SUPABASE_URL}/rest/v1/{path}'
-    headers = dict(HEADERS)
-    if prefer:
-        headers['Prefer'] = prefer
-    data = json.dumps(body).encode('utf-8') if body is not None else None
-    req = urllib.request.Request(url, data=data, headers=headers, method=method)
-    try:
-        with urllib.request.urlopen(req) as resp:
-            content = resp.read()
-            if content:
-                return json.loads(content)
-            return None
-    except urllib.error.HTTPError as e:
-        err_body = e.read().decode('utf-8')
-        raise RuntimeError(f'HTTP {e.code} {method} {url}: {err_body}')
-
-
-def lookup_investor(name):
-    """Return investor dict {id, name} or None."""
-    encoded = urllib.parse.quote(name, safe='')
-    results = api_request('GET', f'investors?select=id,name&name=eq.{encoded}')
-    if results:
-        return results[0]
-    return None
-
-
-def get_round_links(investor_id):
-    """Return list of {funding_round_id, is_lead, investment_amount_eur} for an investor."""
-    results = api_request(
-        'GET',
-        f'funding_round_investors?select=funding_round_id,is_lead,investment_amount_eur&investor_id=eq.{investor_id}'
-    )
-    return results or []
-
-
-def get_existing_link(funding_round_id, investor_id):
-    """Return existing link row {is_lead, investment_amount_eur} or None."""
-    results = api_request(
-        'GET',
-        f'funding_round_investors?select=is_lead,investment_amount_eur'
-        f'&funding_round_id=eq.{funding_round_id}&investor_id=eq.{investor_id}'
-    )
-    return results[0] if results else None
-
-
-def promote_lead(funding_round_id, investor_id):
-    """Set is_lead=true on an existing link."""
-    api_request(
-        'PATCH',
-        f'funding_round_investors?funding_round_id=eq.{funding_round_id}&investor_id=eq.{investor_id}',
-        body={'is_lead': True},
-        prefer='return=minimal',
-    )
-
-
-def insert_link(funding_round_id, investor_id, is_lead, investment_amount_eur=None):
-    body = {'funding_round_id': funding_round_id, 'investor_id': investor_id, 'is_lead': is_lead}
-    if investment_amount_eur is not None:
-        body['investment_amount_eur'] = investment_amount_eur
-    api_request('POST', 'funding_round_investors', body=body, prefer='return=minimal')
-
-
-def delete_links_for_investor(investor_id):
-    api_request('DELETE', f'funding_round_investors?investor_id=eq.{investor_id}',
-                prefer='return=minimal')
-
-
-def delete_investor_record(investor_id):
-    api_request('DELETE', f'investors?id=eq.{investor_id}', prefer='return=minimal')
-
-
-def rename_investor(investor_id, new_name):
-    api_request('PATCH', f'investors?id=eq.{investor_id}',
-                body={'name': new_name}, prefer='return=minimal')
-
-
-def merge_investor(dirty_id, clean_id, dirty_name):
-    """Reassign all round links from dirty to clean, then delete dirty."""
-    links = get_round_links(dirty_id)
-    for link in links:
-        rid = link['funding_round_id']
-        existing = get_existing_link(rid, clean_id)
-        if existing is None:
-            insert_link(rid, clean_id, link['is_lead'], link.get('investment_amount_eur'))
-        else:
-            # Clean link already present — promote to lead if dirty link was lead and clean isn't
-            if link['is_lead'] and not existing['is_lead']:
-                promote_lead(rid, clean_id)
-    delete_links_for_investor(dirty_id)
-    delete_investor_record(dirty_id)
+    return get_client().request(method, path, body=body, prefer=prefer)
+
+
+def resolve_investors(names):
+    """Return {name: id} for the names that exist, in a few chunked name=in.() reads."""
+    rows = select_in(get_client(), 'investors', 'id,name', 'name', names)
+    return {r['name']: r['id'] for r in rows}
+
+
+def rename_investors(renames):
+    """Apply {investor_id: new_name} as one bulk upsert on id."""
+    rows = [{'id': inv_id, 'name': name} for inv_id, name in renames.items()]
+    get_client().insert('investors', rows, on_conflict='id',
+                        resolution='merge-duplicates', returning='minimal')
+
+
+def merge_investors(merges):
+    """
+    Fold dirty investors into clean ones in one transaction.
+
+    `merges` maps clean_id → [dirty_id, ...]. Round links are moved or
+    combined server-side (is_lead OR'ed, investment_amount_eur kept), then
+    the dirty records are deleted.
+    """
+    body = {'merges': [{'clean_id': clean_id, 'dirty_ids': dirty_ids}
+                       for clean_id, dirty_ids in merges.items()]}
+    return api_request('POST', 'rpc/merge_investors_batch', body=body)
 
 
-def delete_investor(investor_id, name):
-    """Delete links and investor record."""
-    delete_links_for_investor(investor_id)
-    delete_investor_record(investor_id)
+def delete_investors(investor_ids):
+    """Delete investor records by id; their round links go with ON DELETE CASCADE."""
+    for in_list in in_list_chunks(investor_ids):
+        api_request('DELETE', f'investors?id=in.{in_list}', prefer='return=minimal')
 
 
 # ======================================================================
@@ -282,6 +214,42 @@ DELETES = [
 ]
 
 
+def classify(ids):
+    """
+    Decide every entry locally from the prefetched {name: id} map.
+
+    Entries are walked in order and the map is updated as the script would
+    have changed the table (a rename moves the name, a merge or delete drops
+    it), so later entries see the effect of earlier ones exactly as when each
+    entry was looked up and applied one by one.
+
+    Returns (actions, deletes): actions is [(kind, dirty_name, clean_name,
+    dirty_id, clean_id)] for OPERATIONS, deletes is [(name, id)].
+    """
+    ids = dict(ids)
+    actions = []
+    for dirty_name, clean_name in OPERATIONS:
+        dirty_id = ids.get(dirty_name)
+        clean_id = ids.get(clean_name)
+        if not dirty_id:
+            kind = 'SKIP_MISSING'
+        elif not clean_id:
+            kind = 'RENAME'
+            del ids[dirty_name]
+            ids[clean_name] = dirty_id
+        elif clean_id == dirty_id:
+            kind = 'SKIP_CLEAN'
+        else:
+            kind = 'MERGE'
+            del ids[dirty_name]
+        actions.append((kind, dirty_name, clean_name, dirty_id, clean_id))
+
+    deletes = []
+    for name in DELETES:
+        deletes.append((name, ids.pop(name, None)))
+    return actions, deletes
+
+
 def main():
     print('==============================================')
     print('Category 4 Investor Cleanup')
@@ -289,52 +257,75 @@ def main():
 
     merged = renamed = deleted = skipped = errors = 0
 
-    print('--- Processing merge/rename operations ---\n')
-
-    for dirty_name, clean_name in OPERATIONS:
-        try:
-            dirty_rec = lookup_investor(dirty_name)
+    names = [n for pair in OPERATIONS for n in pair] + DELETES
+    try:
+        ids = resolve_investors(names)
+    except Exception as e:
+        print(f'  ERROR resolving investor names: {e}')
+        sys.exit(1)
+    actions, deletes = classify(ids)
 
-            if not dirty_rec:
-                print(f'  SKIP  (not found): "{dirty_name}"')
-                skipped += 1
-                continue
+    print('--- Processing merge/rename operations ---\n')
 
-            clean_rec = lookup_investor(clean_name)
+    renames = {a[3]: a[2] for a in actions if a[0] == 'RENAME'}
+    merges = {}         # clean_id → [dirty_id]
+    for kind, _, _, dirty_id, clean_id in actions:
+        if kind == 'MERGE' and dirty_id not in merges.setdefault(clean_id, []):
+            merges[clean_id].append(dirty_id)
 
-            if not clean_rec:
-                # No clean version exists — rename in-place
-                rename_investor(dirty_rec['id'], clean_name)
+    rename_error = merge_error = None
+    if renames:
+        try:
+            rename_investors(renames)
+        except Exception as e:
+            rename_error = e
+    if merges:
+        try:
+            merge_investors(merges)
+        except Exception as e:
+            merge_error = e
+
+    for kind, dirty_name, clean_name, _, _ in actions:
+        if kind == 'SKIP_MISSING':
+            print(f'  SKIP  (not found): "{dirty_name}"')
+            skipped += 1
+        elif kind == 'SKIP_CLEAN':
+            print(f'  SKIP  (already clean): "{dirty_name}"')
+            skipped += 1
+        elif kind == 'RENAME':
+            if rename_error:
+                print(f'  ERROR processing "{dirty_name}": {rename_error}')
+                errors += 1
+            else:
                 print(f'  RENAMED: "{dirty_name}"\n           → "{clean_name}"')
                 renamed += 1
-            elif clean_rec['id'] == dirty_rec['id']:
-                print(f'  SKIP  (already clean): "{dirty_name}"')
-                skipped += 1
-            else:
-                # Merge dirty into clean
-                merge_investor(dirty_rec['id'], clean_rec['id'], dirty_name)
-                print(f'  MERGED: "{dirty_name}"\n          → "{clean_name}"')
-                merged += 1
-
-        except Exception as e:
-            print(f'  ERROR processing "{dirty_name}": {e}')
+        elif merge_error:
+            print(f'  ERROR processing "{dirty_name}": {merge_error}')
             errors += 1
+        else:
+            print(f'  MERGED: "{dirty_name}"\n          → "{clean_name}"')
+            merged += 1
 
     print('\n--- Deleting junk records ---\n')
 
-    for name in DELETES:
+    delete_error = None
+    found = [inv_id for _, inv_id in deletes if inv_id]
+    if found:
         try:
-            rec = lookup_investor(name)
-            if not rec:
-                print(f'  SKIP  (not found): "{name}"')
-                skipped += 1
-                continue
-            delete_investor(rec['id'], name)
-            print(f'  DELETED: "{name}"')
-            deleted += 1
+            delete_investors(found)
         except Exception as e:
-            print(f'  ERROR deleting "{name}": {e}')
+            delete_error = e
+
+    for name, inv_id in deletes:
+        if not inv_id:
+            print(f'  SKIP  (not found): "{name}"')
+            skipped += 1
+        elif delete_error:
+            print(f'  ERROR deleting "{name}": {delete_error}')
             errors += 1
+        else:
+            print(f'  DELETED: "{name}"')
+            deleted += 1
 
     print('\n==============================================')
     print('CLEANUP COMPLETE')
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Compact, dictionary-encoded form of a deal list.
+
+funding-data.json and deals-snapshot.json repeat investor, founder, city,
+sector, round type and month names as free text in every record, and store
+every record as a keyed object. The compact form keeps each distinct name
+once in a string table (most frequent first, so common names get short
+numbers), stores records as arrays in a shared field order, and refers to
+names by index:
+
+  {
+    "format": "ftj-deals-compact",
+    "version": 1,
+    ... other top-level snapshot fields (generated_at, data_version, ...) ...
+    "fields": [["company", "text"], ["hq", "ref", "cities"],
+               ["sectors", "refs", "sectors"], ["investors", "joined", "investors"],
+               ["foundersData", "records", "people"], ["founders", "derived", "foundersData"], ...],
+    "strings": {"cities": ["Paris", "Lyon", ...], "people": [["Jane Doe", "https://..."], ...], ...},
+    "deals": [["Acme", 0, [3, 7], [12, 40], [5], ...], ...]
+  }
+
+Field kinds:
+  text      the value as is
+  ref       index into a string table (null stays null)
+  refs      list of indexes (a list of names, e.g. sectors)
+  joined    ', '-joined names (investors, founders) as a list of indexes;
+            '' is [] and null stays null
+  records   list of {full_name, linkedin_url} as indexes into a table of
+            [full_name, linkedin_url] pairs
+  derived   not stored: ', '.join of the full_name of another records field
+            (founders of deals-snapshot.json, always equal to foundersData's)
+
+decode(encode(deals)) == deals for both files.
+
+The gain is mostly in raw bytes. On funding-data.json the compact form is
+68% of the indented file and 78% of minified JSON. Gzipped, it is only
+about 5% smaller than minified JSON, because gzip already removes most of
+the repetition. decode() also makes it roughly twice as slow to load. Its
+size per deal does not shrink as data is added either: it rises, like
+minified JSON's, because the later deals carry more text and more new
+names (see benchmark-snapshot.py). Nothing reads the format yet. It is
+written only with build-snapshot.py --compact and is, for now, a net loss
+on the wire compared with serving the minified snapshot gzipped.
+
+  from compact_snapshot import encode, decode
+  compact = encode(deals, generated_at=..., data_version=...)
+  assert decode(compact) == deals
+"""
+
+import json
+import os
+from collections import Counter
+
+FORMAT = 'ftj-deals-compact'
+VERSION = 1
+
+# deal field → (kind, string table); any other field is text
+CODECS = {
+    'hq': ('ref', 'cities'),
+    'round': ('ref', 'rounds'),
+    'month': ('ref', 'months'),
+    'sectors': ('refs', 'sectors'),
+    'investors': ('joined', 'investors'),
+    'founders': ('joined', 'founders'),
+    'foundersData': ('records', 'people'),
+}
+
+SEPARATOR = ', '
+
+
+def _split(value):
+    return value.split(SEPARATOR) if value else []
+
+
+def _person(record):
+    return (record.get('full_name'), record.get('linkedin_url'))
+
+
+def _names(value, kind):
+    """The string-table entries one field value uses."""
+    if value is None:
+        return []
+    if kind == 'ref':
+        return [value]
+    if kind == 'refs':
+        return value
+    if kind == 'joined':
+        return _split(value)
+    return [_person(r) for r in value]
+
+
+def layout(deals):
+    """[(field, kind, table)] for the deals' fields, in their order."""
+    fields = list(deals[0]) if deals else []
+    for i, deal in enumerate(deals):
+        if list(deal) != fields:
+            raise ValueError(f'deal {i} has fields {list(deal)}, expected {fields}')
+    out = [(f, *CODECS.get(f, ('text', None))) for f in fields]
+    if 'founders' in fields and 'foundersData' in fields and all(
+            d['founders'] == SEPARATOR.join(p['full_name'] for p in d['foundersData'] or []) for d in deals):
+        out = [(f, 'derived', 'foundersData') if f == 'founders' else (f, kind, table)
+               for f, kind, table in out]
+    return out
+
+
+def _string_tables(deals, fields):
+    counts = {}
+    for field, kind, table in fields:
+        if kind in ('text', 'derived'):
+            continue
+        counter = counts.setdefault(table, Counter())
+        for deal in deals:
+            counter.update(_names(deal[field], kind))
+    # Most frequent first; ties keep first-seen order (Counter preserves insertion)
+    return {table: [name for name, _ in counter.most_common()] for table, counter in counts.items()}
+
+
+def encode(deals, **extra):
+    """The compact document for `deals`; `extra` top-level fields are kept as is."""
+    fields = layout(deals)
+    strings = _string_tables(deals, fields)
+    index = {table: {name: i for i, name in enumerate(names)} for table, names in strings.items()}
+
+    def encode_value(value, kind, table):
+        if value is None:
+            return None
+        refs = index[table]
+        if kind == 'ref':
+            return refs[value]
+        if kind == 'refs':
+            return [refs[v] for v in value]
+        if kind == 'joined':
+            return [refs[v] for v in _split(value)]
+        return [refs[_person(r)] for r in value]
+
+    rows = [[encode_value(deal[field], kind, table) if kind not in ('text', 'derived') else deal[field]
+             for field, kind, table in fields if kind != 'derived']
+            for deal in deals]
+    return {
+        'format': FORMAT,
+        'version': VERSION,
+        **extra,
+        'fields': [[f, kind] + ([table] if table else []) for f, kind, table in fields],
+        'strings': {table: [list(n) if isinstance(n, tuple) else n for n in names]
+                    for table, names in strings.items()},
+        'deals': rows,
+    }
+
+
+def decode(compact):
+    """The deal list of a compact document (the exact input of encode())."""
+    if compact.get('format') != FORMAT or compact.get('version') != VERSION:
+        raise ValueError(f'not a version {VERSION} {FORMAT} document')
+    strings = compact['strings']
+    fields = [(f[0], f[1], f[2] if len(f) > 2 else None) for f in compact['fields']]
+    stored = [(field, kind, strings.get(table)) for field, kind, table in fields if kind != 'derived']
+    derived = [(field, source) for field, kind, source in fields if kind == 'derived']
+    order = [field for field, _, _ in fields]
+
+    def decode_value(value, kind, names):
+        if value is None or kind == 'text':
+            return value
+        if kind == 'ref':
+            return names[value]
+        if kind == 'refs':
+            return [names[i] for i in value]
+        if kind == 'joined':
+            return SEPARATOR.join(names[i] for i in value)
+        return [{'full_name': names[i][0], 'linkedin_url': names[i][1]} for i in value]
+
+    deals = []
+    for row in compact['deals']:
+        deal = {field: decode_value(value, kind, names) for (field, kind, names), value in zip(stored, row)}
+        for field, source in derived:
+            deal[field] = SEPARATOR.join(p['full_name'] for p in deal[source] or [])
+        deals.append({field: deal[field] for field in order} if derived else deal)
+    return deals
+
+
+def dumps(compact):
+    return json.dumps(compact, ensure_ascii=False, separators=(',', ':'))
+
+
+def write_compact(path, compact):
+    """Write a compact document atomically (temp file + rename)."""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(dumps(compact))
+    os.replace(tmp, path)
+
+
+def compact_path(snapshot_path):
+    """deals-snapshot.json → deals-snapshot.compact.json"""
+    root, ext = os.path.splitext(snapshot_path)
+    return f'{root}.compact{ext or ".json"}'
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Concurrent deal ingestion engine.
+
+A weekly batch is latency-bound: every deal is a chain of small PostgREST
+calls. The engine works in two phases:
+
+  1. Prepare (whole batch, a handful of requests):
+       cities, investors and founders are resolved with bulk get-or-create,
+       then every company is resolved/created the same way.
+  2. Per deal (up to `concurrency` deals in flight):
+       company id known → sector links + founder links + each round, in parallel
+       round id known   → that round's investor links
+
+Blocking client calls run in worker threads via asyncio.to_thread; the
+shared client's connection pool is thread-safe.
+
+Deals use the nested shape of insert-deals-march2026.py:
+  {'company': {...}, 'sectors': [...], 'rounds': [{..., 'investors': [...]}], 'founders': [...]}
+Flat deals (insert-jan16-2026-curl.py) can be converted with from_flat().
+Sector labels missing from sector_ids are not linked; each one is reported
+in the deal's DealResult.warnings ('Unknown sector: X'), as the weekly
+scripts used to print it.
+
+With use_rpc (or INGEST_RPC=1) the per-deal graph runs server-side instead:
+deals are sent in batches to the ingest_deals Postgres function
+(supabase/migrations/20261017000000_ingest_deal_rpc.sql), one request per
+batch, and each deal commits or rolls back as a whole.
+
+Each finished deal is counted in the client's run metrics (run_metrics.py),
+which prints deals/sec and an ETA while the batch runs.
+
+With a journal (ingest_journal.py) every finished step is checkpointed, so
+a re-run skips completed deals without any request and finishes half-done
+ones from the recorded company / round ids instead of creating them again.
+
+Usage:
+  from deal_ingest import DealIngestor
+  results = DealIngestor(sector_ids=SECTORS).run(DEALS, on_result=print_result)
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from entity_resolver import EntityResolver, insert_links
+from ingest_journal import DealState, deal_key
+from supabase_rest import get_client
+
+DEFAULT_CONCURRENCY = int(os.environ.get('INGEST_CONCURRENCY', '8'))
+USE_RPC = os.environ.get('INGEST_RPC') == '1'
+RPC_BATCH_SIZE = int(os.environ.get('INGEST_RPC_BATCH', '50'))
+
+
+@dataclass
+class DealResult:
+    index: int
+    name: str
+    ok: bool = False
+    error: str = None
+    company_id: str = None
+    round_ids: list = field(default_factory=list)
+    skipped: bool = False   # already complete in the journal
+    warnings: list = field(default_factory=list)    # e.g. 'Unknown sector: X' (not linked)
+
+
+class StepError(Exception):
+    """Failure of one step of a deal, e.g. 'round Series A: HTTP 400 ...'."""
+
+    def __init__(self, step, cause):
+        super().__init__(f'{step}: {cause}')
+        self.step = step
+        self.cause = cause
+
+
+def from_flat(deal, announced_month, announced_year, source='ftj'):
+    """Convert a flat weekly deal ('company'/'hq'/'round'/'amount') to the nested shape."""
+    return {
+        'company': {
+            'name': deal['company'],
+            'description': deal.get('description'),
+            'website': deal.get('website'),
+            'hq_city_name': deal.get('hq'),
+        },
+        'sectors': deal.get('sectors', []),
+        'rounds': [{
+            'round_type': deal.get('round'),
+            'amount_eur': deal.get('amount'),
+            'announced_month': announced_month,
+            'announced_year': announced_year,
+            'source': source,
+            'investors': deal.get('investors', []),
+        }],
+        'founders': deal.get('founders', []),
+    }
+
+
+class DealIngestor:
+    """Ingest a batch of nested deals with bounded concurrency."""
+
+    def __init__(self, client=None, resolver=None, sector_ids=None,
+                 concurrency=DEFAULT_CONCURRENCY, link_city=False, journal=None,
+                 use_rpc=USE_RPC, rpc_batch_size=RPC_BATCH_SIZE):
+        self.client = client or get_client()
+        self.resolver = resolver or EntityResolver(self.client)
+        self.sector_ids = sector_ids or {}
+        self.concurrency = concurrency
+        # Also fill companies.hq_city_id from the cities table (flat scripts did)
+        self.link_city = link_city
+        self.journal = journal
+        self.use_rpc = use_rpc
+        self.rpc_batch_size = rpc_batch_size
+
+    def _checkpoint(self, key, step, **fields):
+        if self.journal:
+            self.journal.record(key, step, **fields)
+
+    def _state(self, key):
+        return self.journal.state(key) if self.journal else DealState()
+
+    # ── Phase 1: batch-wide entity resolution ────────────────────────────────
+
+    def prepare(self, deals, keys=None):
+        tables = ('cities', 'investors', 'people') if self.link_city else ('investors', 'people')
+        self.resolver.resolve_deals(deals, tables=tables)
+
+        companies = {}
+        for deal, key in zip(deals, keys or [None] * len(deals)):
+            # A company created by an interrupted run is reused, never re-created
+            journaled = self._state(key).company_id
+            if journaled:
+                self.resolver.ids['companies'].setdefault(deal['company']['name'], journaled)
+                continue
+            data = dict(deal['company'])
+            if self.link_city and data.get('hq_city_name'):
+                data['hq_city_id'] = self.resolver.get('cities', data['hq_city_name'])
+            companies.setdefault(data['name'], data)
+        self.resolver.get_or_create_many('companies', companies, extra=companies)
+
+    # ── Phase 2: per-deal dependency graph ───────────────────────────────────
+
+    async def _step(self, name, fn, *args):
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except Exception as e:
+            raise StepError(name, e) from e
+
+    async def _gather(self, *aws):
+        """Run steps in parallel, wait for all of them, then raise the first failure."""
+        results = await asyncio.gather(*aws, return_exceptions=True)
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+        return results
+
+    def _create_round(self, company_id, rnd):
+        body = {k: v for k, v in rnd.items() if k != 'investors'}
+        body['company_id'] = company_id
+        return self.client.request('POST', 'funding_rounds', body=body)[0]['id']
+
+    async def _ingest_round(self, key, n, company_id, rnd):
+        label = f"round {rnd.get('round_type') or ''}".strip()
+        state = self._state(key)
+        round_id = state.round_ids.get(n)
+        if not round_id:
+            round_id = await self._step(label, self._create_round, company_id, rnd)
+            self._checkpoint(key, 'round', n=n, id=round_id)
+        if ('round_investors', n) not in state.steps:
+            inv_ids = [self.resolver.get('investors', name) for name in rnd.get('investors', [])]
+            rows = [{'funding_round_id': round_id, 'investor_id': inv_id, 'is_lead': i == 0}
+                    for i, inv_id in enumerate(inv_ids)]
+            await self._step(f'{label} investors', insert_links, self.client,
+                             'funding_round_investors', rows)
+            self._checkpoint(key, 'round_investors', n=n)
+        return round_id
+
+    async def _links(self, key, step, table, rows):
+        if step in self._state(key).steps:
+            return
+        await self._step(step, insert_links, self.client, table, rows)
+        self._checkpoint(key, step)
+
+    def unknown_sectors(self, deal):
+        """Sector labels of a deal with no id in sector_ids; they are not linked."""
+        return [name for name in deal.get('sectors', []) if not self.sector_ids.get(name)]
+
+    def _warnings(self, deal):
+        return [f'Unknown sector: {name}' for name in self.unknown_sectors(deal)]
+
+    def _sector_rows(self, company_id, deal):
+        rows, seen = [], set()
+        for name in deal.get('sectors', []):
+            sid = self.sector_ids.get(name)
+            # Several labels can share one id (e.g. HealthTech / BioTech)
+            if sid and sid not in seen:
+                seen.add(sid)
+                rows.append({'company_id': company_id, 'sector_id': sid, 'is_primary': not rows})
+        return rows
+
+    async def _ingest_deal(self, index, deal, key=None):
+        name = deal['company']['name']
+        result = DealResult(index=index, name=name, warnings=self._warnings(deal))
+        company_id = self.resolver.get('companies', name)
+        if not company_id:
+            raise StepError('company', 'not resolved')
+        result.company_id = company_id
+        if not self._state(key).company_id:
+            self._checkpoint(key, 'company', id=company_id)
+
+        founder_rows = [{'company_id': company_id, 'person_id': self.resolver.get('people', f),
+                         'role': 'founder', 'is_current': True}
+                        for f in deal.get('founders', [])]
+        outcomes = await self._gather(
+            self._links(key, 'sectors', 'company_sectors', self._sector_rows(company_id, deal)),
+            self._links(key, 'founders', 'company_people', founder_rows),
+            *(self._ingest_round(key, n, company_id, rnd) for n, rnd in enumerate(deal['rounds'])),
+        )
+        result.round_ids = outcomes[2:]
+        result.ok = True
+        self._checkpoint(key, 'done')
+        return result
+
+    # ── Server-side path: ingest_deals RPC ───────────────────────────────────
+
+    def rpc_document(self, deal):
+        """The deal document ingest_deal() expects, with sectors resolved to ids."""
+        return {
+            'company': deal['company'],
+            'link_city': self.link_city,
+            'sector_ids': [r['sector_id'] for r in self._sector_rows(None, deal)],
+            'founders': deal.get('founders', []),
+            'rounds': deal['rounds'],
+        }
+
+    def _run_rpc(self, deals, keys, indexes, emit):
+        """Send deals `indexes` to ingest_deals in batches; one request per batch."""
+        for start in range(0, len(indexes), self.rpc_batch_size):
+            chunk = indexes[start:start + self.rpc_batch_size]
+            try:
+                outcomes = self.client.request(
+                    'POST', 'rpc/ingest_deals',
+                    body={'deals': [self.rpc_document(deals[i]) for i in chunk]})
+            except Exception as e:
+                for i in chunk:
+                    emit(DealResult(index=i, name=deals[i]['company']['name'], error=f'rpc: {e}'))
+                continue
+            for i, out in zip(chunk, outcomes):
+                result = DealResult(index=i, name=deals[i]['company']['name'],
+                                    warnings=self._warnings(deals[i]))
+                if out.get('ok'):
+                    result.ok = True
+                    result.company_id = out['company_id']
+                    result.round_ids = out['round_ids']
+                    self._checkpoint(keys[i], 'company', id=result.company_id)
+                    for n, round_id in enumerate(result.round_ids):
+                        self._checkpoint(keys[i], 'round', n=n, id=round_id)
+                    self._checkpoint(keys[i], 'done')
+                else:
+                    result.error = out.get('error')
+                emit(result)
+
+    async def ingest(self, deals, on_result=None, keys=None):
+        """Ingest deals concurrently; `on_result(DealResult)` fires as each deal finishes."""
+        sem = asyncio.Semaphore(self.concurrency)
+        # A deal fans out to ~4 parallel steps; size the worker pool to match
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.concurrency * 4))
+
+        async def run_one(index, deal, key):
+            async with sem:
+                try:
+                    result = await self._ingest_deal(index, deal, key)
+                except Exception as e:
+                    result = DealResult(index=index, name=deal['company']['name'], error=str(e))
+            if on_result:
+                on_result(result)
+            return result
+
+        keys = keys or [None] * len(deals)
+        return await asyncio.gather(*(run_one(i, d, k) for i, (d, k) in enumerate(zip(deals, keys))))
+
+    def run(self, deals, on_result=None):
+        """Prepare the batch, then ingest it. Returns DealResults in input order."""
+        results = [None] * len(deals)
+        keys = [deal_key(d) if self.journal else None for d in deals]
+        # Live deals/sec, ETA and requests per deal (run_metrics.py)
+        metrics = getattr(self.client, 'metrics', None)
+        if metrics:
+            metrics.expect(len(deals))
+
+        def emit(result):
+            results[result.index] = result
+            if metrics:
+                metrics.deal_done(skipped=result.skipped)
+            if on_result:
+                on_result(result)
+
+        # Deals the journal marks complete are reported without touching the network
+        pending = []
+        for i, (deal, key) in enumerate(zip(deals, keys)):
+            state = self._state(key)
+            if state.done:
+                emit(DealResult(index=i, name=deal['company']['name'], ok=True, skipped=True,
+                                company_id=state.company_id,
+                                round_ids=[state.round_ids[n] for n in sorted(state.round_ids)]))
+            else:
+                pending.append(i)
+
+        if self.use_rpc:
+            # Deals half-done by an earlier step-by-step run finish on that path,
+            # so their recorded company and rounds are not created again
+            partial = [i for i in pending if self._state(keys[i]).company_id]
+            self._run_rpc(deals, keys, [i for i in pending if i not in partial], emit)
+            pending = partial
+        if not pending:
+            return results
+
+        todo = [deals[i] for i in pending]
+        todo_keys = [keys[i] for i in pending]
+        try:
+            self.prepare(todo, todo_keys)
+        except Exception as e:
+            for i in pending:
+                emit(DealResult(index=i, name=deals[i]['company']['name'], error=f'prepare: {e}'))
+            return results
+
+        def emit_pending(result):
+            result.index = pending[result.index]
+            emit(result)
+
+        asyncio.run(self.ingest(todo, on_result=emit_pending, keys=todo_keys))
+        return results
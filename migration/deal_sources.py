@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Deal data files → normalized deals, as lazy generator stages.
+
+Readers yield one raw record at a time, so a backfill of thousands of
+deals never sits in memory at once:
+
+  read_deals(path)        .jsonl / .csv / .yaml|.yml (one deal per document)
+  normalize(records)      any known shape → nested deal (see below)
+  batched(deals, size)    lists of `size` deals for bulk resolve + write
+
+Recognised record shapes:
+  nested  {'company': {'name', ...}, 'sectors', 'rounds': [{..., 'investors'}], 'founders'}
+          (insert-deals-march2026.py)
+  flat    {'company': 'Name', 'hq', 'round', 'amount', 'investors', 'founders', 'sectors'}
+          (insert-jan16-2026-curl.py; funding-data.json, where 'month' holds the
+          month name and investors/founders are comma-joined strings)
+
+CSV files use the flat shape; list columns (investors, founders, sectors)
+are separated with ';' because investor names can contain commas.
+"""
+
+import csv
+import json
+import os
+import re
+
+from deal_ingest import from_flat
+
+LIST_FIELDS = ('investors', 'founders', 'sectors')
+
+# "Jane Doe (https://www.linkedin.com/in/janedoe/)" → "Jane Doe"
+_LINK_SUFFIX = re.compile(r'\s*\(https?://[^)]*\)\s*$')
+
+
+class DealFormatError(ValueError):
+    """Record that cannot be turned into a deal."""
+
+
+# ── Stage 1: read ────────────────────────────────────────────────────────────
+
+def _read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                # Yielded, not raised: one bad line must not end the file
+                record = DealFormatError(f'invalid JSON: {e.msg} (column {e.colno})')
+            yield f'{path}:{line_no}', record
+
+
+def _read_csv(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        for line_no, row in enumerate(csv.DictReader(f), 2):
+            record = {k: (v if v != '' else None) for k, v in row.items()}
+            for key in LIST_FIELDS:
+                if record.get(key):
+                    record[key] = [p.strip() for p in record[key].split(';') if p.strip()]
+            yield f'{path}:{line_no}', record
+
+
+def _read_yaml(path):
+    try:
+        import yaml
+    except ImportError:
+        raise SystemExit('YAML input needs PyYAML: pip install pyyaml')
+    with open(path, encoding='utf-8') as f:
+        for doc_no, doc in enumerate(yaml.safe_load_all(f), 1):
+            # A document may hold a single deal or a list of deals
+            for i, record in enumerate(doc if isinstance(doc, list) else [doc]):
+                yield f'{path}#{doc_no}.{i}', record
+
+
+READERS = {
+    '.jsonl': _read_jsonl,
+    '.ndjson': _read_jsonl,
+    '.csv': _read_csv,
+    '.yaml': _read_yaml,
+    '.yml': _read_yaml,
+}
+
+
+def read_deals(path):
+    """Yield (location, raw record) pairs from one data file.
+
+    A record that cannot be parsed (malformed JSONL line) is yielded as a
+    DealFormatError instead, so normalize() reports it and reading goes on.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise SystemExit(f'Unsupported deal file type "{ext}" ({path})')
+    yield from READERS[ext](path)
+
+
+# ── Stage 2: normalize ───────────────────────────────────────────────────────
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [p.strip() for p in value.split(',') if p.strip()]
+    return [v for v in value if v]
+
+
+def normalize_deal(record, defaults=None):
+    """Return the nested deal for a raw record, or raise DealFormatError."""
+    defaults = defaults or {}
+    if isinstance(record, DealFormatError):
+        raise record
+    if not isinstance(record, dict):
+        raise DealFormatError('record is not an object')
+
+    if isinstance(record.get('company'), dict):
+        deal = dict(record)
+        deal['sectors'] = _as_list(record.get('sectors'))
+        deal['founders'] = _as_list(record.get('founders'))
+        deal['rounds'] = [dict(r, investors=_as_list(r.get('investors')))
+                          for r in record.get('rounds') or []]
+    elif isinstance(record.get('company'), str):
+        flat = dict(record)
+        for key in LIST_FIELDS:
+            flat[key] = _as_list(record.get(key))
+        flat['founders'] = [_LINK_SUFFIX.sub('', f) for f in flat['founders']]
+        deal = from_flat(flat,
+                         announced_month=record.get('month') or defaults.get('announced_month'),
+                         announced_year=record.get('year') or defaults.get('announced_year'))
+        if record.get('news'):
+            deal['rounds'][0]['news_url'] = record['news']
+    else:
+        raise DealFormatError('missing company')
+
+    if not deal['company'].get('name'):
+        raise DealFormatError('missing company name')
+    if not deal['rounds']:
+        raise DealFormatError('no funding round')
+    return deal
+
+
+def normalize(records, defaults=None, on_error=None):
+    """Yield nested deals; bad records go to `on_error(location, message)` and are skipped."""
+    for location, record in records:
+        try:
+            yield normalize_deal(record, defaults)
+        except DealFormatError as e:
+            if on_error:
+                on_error(location, str(e))
+
+
+# ── Stage 3: batch ───────────────────────────────────────────────────────────
+
+def batched(deals, size):
+    """Group a deal stream into lists of `size`; pulls from upstream only as needed."""
+    batch = []
+    for deal in deals:
+        batch.append(deal)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
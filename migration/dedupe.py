@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Fuzzy duplicate detection for investor and people names.
+
+Comparing every name with every other one is quadratic, so candidates are
+generated by blocking: each record is filed under a few keys derived from
+its normalized name, and only records sharing a key are compared.
+
+  core name    "Elaia (lead)" → "elaia"; text in parentheses and a dangling
+               "(..." tail are dropped, then name_key() folds case, accents
+               and punctuation
+  keys         the core with spaces removed ("50 partners" / "50partners"),
+               and a 5-letter prefix of every token of 3+ letters
+               ("irdi", "capit", "inves" for "IRDI Capital Investment")
+
+Keys shared by more than `max_block` records ("capit", "partn", ...) are
+dropped as uninformative, which bounds the work at about
+records × keys × max_block comparisons.
+
+A candidate pair is scored from
+  name similarity  difflib ratio of the core names, or 0.9 when one name's
+                   tokens (4+ letters in all) are the leading tokens of the other
+  context overlap  Jaccard of the companies each record is linked to
+                   (investors through their rounds, people directly)
+as score = 0.9 × name + 0.1 × overlap.
+
+Pairs come out as (dirty, clean) — the same shape as OPERATIONS in
+cleanup-investors-cat4.py. The clean side is the one whose raw name needs
+no cleanup (no brackets, stray punctuation or invisible characters), then
+the one with more links, then the one with fewer ALL-CAPS words.
+
+Usage:
+  from dedupe import find_duplicates
+  for pair in find_duplicates(records, links, min_score=0.8):
+      print(pair.dirty, '→', pair.clean, pair.score)
+"""
+
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+from name_key import name_key
+
+DEFAULT_MAX_BLOCK = 200
+PREFIX_LEN = 5
+
+NAME_WEIGHT = 0.9
+OVERLAP_WEIGHT = 0.1
+
+_PARENS = re.compile(r'\([^)]*\)?|\)')
+_DIRTY = re.compile(r'[()\[\]]|[\u200b\u200c\u200d\u2011\ufeff]|^\W|[,;:(]\s*$')
+
+
+def core_name(name):
+    """Folded name without bracketed asides: 'Elaia (lead)' → 'elaia'."""
+    core = name_key(_PARENS.sub(' ', name))
+    # A name that is only an aside ('lead)') keeps its words
+    return core or name_key(name)
+
+
+def blocking_keys(core):
+    keys = {'=' + core.replace(' ', '')}
+    for token in core.split():
+        if len(token) >= 3:
+            keys.add(token[:PREFIX_LEN])
+    return keys
+
+
+def name_similarity(a, b):
+    if a == b:
+        return 1.0
+    ta, tb = a.split(), b.split()
+    short, long_ = (ta, tb) if len(ta) <= len(tb) else (tb, ta)
+    if short and long_[:len(short)] == short and len(''.join(short)) >= 4:
+        return 0.9
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def overlap(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def dirtiness(name):
+    """How much cleanup a raw name needs; 0 for a presentable name."""
+    return len(_DIRTY.findall(name)) + (name != name.strip()) + (name.isupper() and len(name) > 4)
+
+
+def _caps(name):
+    return sum(1 for w in name.split() if len(w) > 3 and w.isupper())
+
+
+@dataclass
+class DuplicatePair:
+    dirty: str
+    clean: str
+    score: float
+    name_score: float
+    overlap: float
+    dirty_id: str = None
+    clean_id: str = None
+
+    def as_operation(self):
+        return (self.dirty, self.clean)
+
+
+def candidate_pairs(cores, max_block=DEFAULT_MAX_BLOCK):
+    """Yield index pairs (i, j), i < j, of records sharing a usable blocking key."""
+    blocks = {}
+    for i, core in enumerate(cores):
+        for key in blocking_keys(core):
+            blocks.setdefault(key, []).append(i)
+    seen = set()
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > max_block:
+            continue
+        for x, i in enumerate(members):
+            for j in members[x + 1:]:
+                if (i, j) not in seen:
+                    seen.add((i, j))
+                    yield i, j
+
+
+def find_duplicates(records, links=None, min_score=0.8, max_block=DEFAULT_MAX_BLOCK):
+    """
+    Return DuplicatePairs scoring at least `min_score`, best first.
+
+    `records` is [(id, name)]; `links` maps id → set of company ids the
+    record is connected to.
+    """
+    links = links or {}
+    records = [(rid, name) for rid, name in records if name and name.strip()]
+    cores = [core_name(name) for _, name in records]
+
+    pairs = []
+    for i, j in candidate_pairs(cores, max_block):
+        name_score = name_similarity(cores[i], cores[j])
+        if name_score * NAME_WEIGHT + OVERLAP_WEIGHT < min_score:
+            continue    # cannot reach the threshold whatever the overlap
+        (id_a, a), (id_b, b) = records[i], records[j]
+        ctx = overlap(links.get(id_a), links.get(id_b))
+        score = NAME_WEIGHT * name_score + OVERLAP_WEIGHT * ctx
+        if score < min_score:
+            continue
+        # Clean side: needs no cleanup, has more links, fewer shouted words, is shorter
+        rank_a = (dirtiness(a), -len(links.get(id_a) or ()), _caps(a), len(a))
+        rank_b = (dirtiness(b), -len(links.get(id_b) or ()), _caps(b), len(b))
+        if rank_b < rank_a:
+            (id_a, a), (id_b, b) = (id_b, b), (id_a, a)
+        pairs.append(DuplicatePair(dirty=b, clean=a, score=round(score, 3),
+                                   name_score=round(name_score, 3), overlap=round(ctx, 3),
+                                   dirty_id=id_b, clean_id=id_a))
+    return _collapse(pairs)
+
+
+def _collapse(pairs):
+    """
+    Keep each dirty record's best pair and point it at the end of its chain
+    (A → B and B → C become A → C and B → C), so merges can run in any order.
+
+    A record that is the clean side of a stronger pair is not also made the
+    dirty side of a weaker one: "Blast.club" → "Blast Club" (1.0) stops
+    "Blast Club" → "Blast" (0.9) from pulling both onto the wrong name.
+    """
+    best, clean_score = {}, {}
+    for p in sorted(pairs, key=lambda p: -p.score):
+        if p.dirty_id in best or clean_score.get(p.dirty_id, 0) > p.score:
+            continue
+        if best.get(p.clean_id, p).clean_id == p.dirty_id:
+            continue
+        best[p.dirty_id] = p
+        clean_score[p.clean_id] = max(clean_score.get(p.clean_id, 0), p.score)
+    out = []
+    for p in best.values():
+        target, seen = p, {p.dirty_id}
+        while target.clean_id in best and target.clean_id not in seen:
+            seen.add(target.clean_id)
+            target = best[target.clean_id]
+        out.append(DuplicatePair(dirty=p.dirty, clean=target.clean, score=p.score,
+                                 name_score=p.name_score, overlap=p.overlap,
+                                 dirty_id=p.dirty_id, clean_id=target.clean_id))
+    out.sort(key=lambda p: (-p.score, p.clean, p.dirty))
+    return out
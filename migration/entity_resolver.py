@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Bulk name → id resolution for investors, people, cities and companies.
+
+Instead of one `?name=eq.` GET per investor/founder/city of every deal, the
+resolver collects every name a batch references, fetches the existing ids in
+a few chunked `name_key=in.(...)` requests (the indexed normalized name, see
+name_key.py; cities still match `name` exactly), and keeps the map in memory
+for the rest of the run. Names that are genuinely missing are created together in
+one multi-row POST per table; where the table has a unique constraint the POST
+is an upsert (`resolution=merge-duplicates`), so a row created concurrently
+by another run comes back with its id instead of failing with 23505.
+
+Link rows (funding_round_investors, company_sectors, company_people) go
+through `insert_links()`, one array POST per table that ignores rows already
+present.
+
+Usage:
+  from entity_resolver import EntityResolver
+  resolver = EntityResolver()
+  resolver.prefetch_deals(DEALS)
+  inv_id = resolver.get_or_create('investors', 'Bpifrance')
+"""
+
+import threading
+import urllib.parse
+
+from name_key import name_key
+from supabase_rest import get_client
+
+# table → how rows are looked up and created. `on_conflict` is only set where
+# 001_schema.sql declares a matching unique constraint; `key` is the indexed
+# normalized-name column (see name_key.py) used for lookups where it exists.
+TABLES = {
+    'investors': {'field': 'name', 'key': 'name_key', 'on_conflict': 'name'},
+    'people':    {'field': 'full_name', 'key': 'name_key'},
+    'companies': {'field': 'name', 'key': 'name_key'},
+    # cities are unique on (name, country); the scripts only ever add French ones
+    'cities':    {'field': 'name', 'filter': 'country=eq.France', 'extra': {'country': 'France'},
+                  'on_conflict': 'name,country'},
+}
+
+# junction table → its unique key
+LINK_TABLES = {
+    'funding_round_investors': 'funding_round_id,investor_id',
+    'company_sectors':         'company_id,sector_id',
+    'company_people':          'company_id,person_id,role',
+}
+
+# Keep each GET comfortably under the ~8 KB URL limit of the Supabase gateway
+MAX_IN_LIST_CHARS = 4000
+MAX_IN_LIST_ITEMS = 150
+
+
+def quote_in_value(value):
+    """Quote one value for a PostgREST `in.(...)` list (handles commas, parens, quotes)."""
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    return urllib.parse.quote(f'"{escaped}"', safe='')
+
+
+def in_list_chunks(values):
+    """Yield encoded `(v1,v2,...)` lists, split so each stays within the URL budget."""
+    chunk, size = [], 0
+    for value in values:
+        enc = quote_in_value(value)
+        if chunk and (size + len(enc) + 1 > MAX_IN_LIST_CHARS or len(chunk) >= MAX_IN_LIST_ITEMS):
+            yield '(' + ','.join(chunk) + ')'
+            chunk, size = [], 0
+        chunk.append(enc)
+        size += len(enc) + 1
+    if chunk:
+        yield '(' + ','.join(chunk) + ')'
+
+
+def select_in(client, table, select, column, values, filters=None, page_size=1000):
+    """
+    GET every row whose `column` is in `values`, chunking the in-list and
+    paging past the Supabase 1000-row response cap.
+    """
+    rows = []
+    for in_list in in_list_chunks(sorted({str(v) for v in values if v is not None})):
+        base = f'{table}?select={select}&{column}=in.{in_list}&order={column},id'
+        if filters:
+            base += '&' + filters
+        offset = 0
+        while True:
+            page = client.request('GET', f'{base}&limit={page_size}&offset={offset}') or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            offset += page_size
+    return rows
+
+
+def select_all(client, table, select, filters=None, page_size=1000):
+    """GET a whole table (or the rows matching `filters`), page by page."""
+    base = f'{table}?select={select}&order=id'
+    if filters:
+        base += '&' + filters
+    rows, offset = [], 0
+    while True:
+        page = client.request('GET', f'{base}&limit={page_size}&offset={offset}') or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+
+def collect_names(deals):
+    """
+    Return {table: set(names)} for every entity a batch of deals references.
+
+    Accepts both deal shapes used by the weekly scripts:
+      - nested:  {'company': {'name', 'hq_city_name', ...}, 'rounds': [{'investors'}], 'founders'}
+      - flat:    {'company': 'Name', 'hq': 'City', 'investors': [...], 'founders': [...]}
+    """
+    names = {table: set() for table in TABLES}
+    for deal in deals:
+        company = deal.get('company')
+        if isinstance(company, dict):
+            names['companies'].add(company['name'])
+            if company.get('hq_city_name'):
+                names['cities'].add(company['hq_city_name'])
+            for rnd in deal.get('rounds', []):
+                names['investors'].update(rnd.get('investors', []))
+        else:
+            names['companies'].add(company)
+            if deal.get('hq'):
+                names['cities'].add(deal['hq'])
+            names['investors'].update(deal.get('investors', []))
+        names['people'].update(deal.get('founders', []))
+    return names
+
+
+class EntityResolver:
+    """In-memory name → id map per table, filled by chunked bulk lookups."""
+
+    def __init__(self, client=None):
+        self.client = client or get_client()
+        self.ids = {table: {} for table in TABLES}
+        self._looked_up = {table: set() for table in TABLES}
+        self._lock = threading.Lock()
+
+    def prefetch(self, table, names):
+        """
+        Load ids for every name not already known, a few `in.(...)` requests at
+        a time. Tables with a name_key column are matched on the key, so
+        "ROB’OCC" finds "Rob'Occ"; where several rows share a key the one
+        spelled exactly like the name wins.
+        """
+        spec = TABLES[table]
+        field, key_col = spec['field'], spec.get('key')
+        known = self.ids[table]
+        wanted = sorted({n for n in names if n and n not in self._looked_up[table]})
+
+        by_key = {}
+        if key_col:
+            for n in wanted:
+                by_key.setdefault(name_key(n), []).append(n)
+            by_key.pop('', None)    # nothing to normalize: exact match below
+        exact = [n for n in wanted if not key_col or not name_key(n)]
+
+        if by_key:
+            rows = select_in(self.client, table, f'id,{field},{key_col}', key_col, by_key,
+                             filters=spec.get('filter'))
+            with self._lock:
+                for row in rows:
+                    for n in by_key.get(row[key_col], ()):
+                        if n not in known or row[field] == n:
+                            known[n] = row['id']
+        if exact:
+            rows = select_in(self.client, table, f'id,{field}', field, exact,
+                             filters=spec.get('filter'))
+            with self._lock:
+                for row in rows:
+                    known.setdefault(row[field], row['id'])
+        self._looked_up[table].update(wanted)
+
+    def prefetch_deals(self, deals, tables=None):
+        """Prefetch every investor, founder, city and company referenced by a batch."""
+        for table, names in collect_names(deals).items():
+            if tables is None or table in tables:
+                self.prefetch(table, names)
+
+    def get(self, table, name):
+        """Return the cached id for a name, or None (only meaningful after prefetch)."""
+        return self.ids[table].get(name)
+
+    def get_or_create_many(self, table, names, extra=None):
+        """
+        Resolve many names at once and return {name: id}.
+
+        Existing ids come from one prefetch; all missing names are created in a
+        single multi-row POST. `extra` maps a name to additional columns for
+        its row if it has to be created.
+        """
+        spec = TABLES[table]
+        field = spec['field']
+        names = {n for n in names if n}
+        self.prefetch(table, names)
+        with self._lock:
+            missing = sorted(n for n in names if n not in self.ids[table])
+            # Variants of one new name ("KIMA Ventures", "Kima Ventures") share a row
+            variants = {}
+            for n in missing:
+                variants.setdefault(name_key(n) if spec.get('key') else n, []).append(n)
+            if missing:
+                extra = extra or {}
+                rows = [{field: group[0], **spec.get('extra', {}), **extra.get(group[0], {})}
+                        for group in variants.values()]
+                on_conflict = spec.get('on_conflict')
+                created = self.client.insert(
+                    table, rows, on_conflict=on_conflict,
+                    resolution='merge-duplicates' if on_conflict else None)
+                for row in created:
+                    self.ids[table][row[field]] = row['id']
+                for group in variants.values():
+                    for n in group[1:]:
+                        self.ids[table][n] = self.ids[table][group[0]]
+            return {n: self.ids[table][n] for n in names}
+
+    def get_or_create(self, table, name, extra=None):
+        """Return the id for a name, creating the row if it does not exist yet."""
+        existing = self.get(table, name)
+        if existing:
+            return existing
+        return self.get_or_create_many(table, [name], extra={name: extra} if extra else None)[name]
+
+    def resolve_deals(self, deals, tables=('cities', 'investors', 'people')):
+        """Get-or-create every entity of the given tables referenced by a batch."""
+        for table, names in collect_names(deals).items():
+            if table in tables:
+                self.get_or_create_many(table, names)
+
+
+def insert_links(client, table, rows):
+    """Insert junction rows as one array POST, skipping rows that already exist."""
+    if rows:
+        client.insert(table, rows, on_conflict=LINK_TABLES[table],
+                      resolution='ignore-duplicates', returning='minimal')
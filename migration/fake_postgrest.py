@@ -0,0 +1,955 @@
+#!/usr/bin/env python3
+"""
+Local in-process stand-in for the Supabase REST API (PostgREST).
+
+Serves the subset of PostgREST the migration scripts use from an in-memory
+database built from 001_schema.sql (plus the generated name_key columns
+and the RPCs of supabase/migrations/), so the scripts, the shared client
+and the benchmarks can run on a laptop without a Supabase project:
+
+  GET     table?select=a,b&col=eq.x&col=in.("x","y")&order=a,id.desc&limit=&offset=
+  POST    table[?on_conflict=a,b]   one object or an array (same keys in every object)
+  PATCH   table?<filters>
+  DELETE  table?<filters>           ON DELETE CASCADE is followed
+  POST    rpc/ingest_deals, rpc/ingest_deal, rpc/merge_investors, rpc/merge_investors_batch,
+          rpc/refresh_funding_complete
+
+  filters   eq, neq, gt, gte, lt, lte, like, ilike (* or % wildcards), in, is
+  Prefer    return=representation|minimal,
+            resolution=merge-duplicates|ignore-duplicates
+
+Constraints from the schema are enforced with PostgreSQL's error codes:
+primary keys and UNIQUE (23505, 409), NOT NULL (23502), foreign keys
+(23503), ON CONFLICT targets without a matching unique constraint (42P10),
+generated columns (428C9). Each request is atomic, and responses are
+capped at 1000 rows like the hosted API. The set_updated_at and
+log_deleted_row triggers of the migrations are applied too (updated_at on
+every write, deleted rows copied to deleted_rows).
+
+Latency and failures can be injected to exercise round-trip behavior and
+the client's retry path: every request sleeps `latency` (+ up to `jitter`)
+seconds, and a share `error_rate` of them fail with `error_status` (503)
+and an optional Retry-After, without touching the data.
+
+  with FakePostgrest(latency=0.02, error_rate=0.05, seed={'sectors': rows}) as server:
+      client = SupabaseClient(url=server.url, key='fake')
+      ...
+      print(server.calls)            # Counter of (method, table)
+
+Or as a standalone server for the scripts:
+
+  python3 migration/fake_postgrest.py --port 54321 --latency 0.03 --seed-sectors
+  export SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_SERVICE_KEY=fake
+  python3 migration/ingest-deals.py deals/2026-03.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from datetime import date, datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from name_key import name_key
+from snapshot import month_number
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(HERE, '001_schema.sql')
+MIGRATIONS_DIR = os.path.join(HERE, '..', 'supabase', 'migrations')
+
+MAX_ROWS = 1000     # Supabase's default max-rows per response
+
+_CREATE_TABLE = re.compile(r'CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\n\);', re.S)
+_GENERATED = re.compile(r'ALTER TABLE (\w+) ADD COLUMN IF NOT EXISTS (\w+) \w+\s+'
+                        r'GENERATED ALWAYS AS \(name_key\((\w+)\)\) STORED')
+_REFERENCES = re.compile(r'REFERENCES (\w+)\((\w+)\)( ON DELETE CASCADE)?')
+_DEFAULT = re.compile(r"DEFAULT ('[^']*'|\S+)")
+_ADD_COLUMN = re.compile(r'ALTER TABLE (\w+) ADD COLUMN IF NOT EXISTS (\w+) (\w+);')
+_SET_DEFAULT = re.compile(r'ALTER TABLE (\w+) ALTER COLUMN (\w+) SET DEFAULT (\S+?);')
+_TRIGGER = re.compile(r'CREATE TRIGGER \w+ \w+ [\w ]+? ON (\w+)\s+FOR EACH ROW EXECUTE FUNCTION (\w+)\(\)')
+
+
+# ── Schema ───────────────────────────────────────────────────────────────────
+
+class Column:
+    def __init__(self, name, type_, not_null=False, default=None, references=None,
+                 cascade=False, generated_from=None):
+        self.name = name
+        self.type = type_
+        self.not_null = not_null
+        self.default = default
+        self.references = references        # referenced table, or None
+        self.cascade = cascade
+        self.generated_from = generated_from
+
+
+class Table:
+    def __init__(self, name):
+        self.name = name
+        self.columns = {}
+        self.uniques = [('id',)]             # primary key first
+        self.triggers = set()                # trigger functions (set_updated_at, log_deleted_row)
+
+    def constraint_name(self, cols):
+        return f'{self.name}_pkey' if cols == ('id',) else f'{self.name}_{"_".join(cols)}_key'
+
+
+def _strip_comments(f):
+    return '\n'.join(line.split('--', 1)[0].rstrip() for line in f)
+
+
+def _create_tables(sql, tables):
+    for name, body in _CREATE_TABLE.findall(sql):
+        table = tables[name] = Table(name)
+        for line in body.split('\n'):
+            line = line.strip().rstrip(',')
+            if not line:
+                continue
+            if line.startswith('UNIQUE('):
+                table.uniques.append(tuple(c.strip() for c in line[7:-1].split(',')))
+                continue
+            col_name, type_ = line.split()[:2]
+            ref = _REFERENCES.search(line)
+            default = _DEFAULT.search(line)
+            table.columns[col_name] = Column(
+                col_name, type_.upper(),
+                not_null='NOT NULL' in line or 'PRIMARY KEY' in line,
+                default=default.group(1) if default else None,
+                references=ref.group(1) if ref else None,
+                cascade=bool(ref and ref.group(3)))
+            if ' UNIQUE' in line:
+                table.uniques.append((col_name,))
+
+
+def load_schema(schema_path=SCHEMA_PATH, migrations_dir=MIGRATIONS_DIR):
+    """
+    Parse the CREATE TABLEs of 001_schema.sql, then what the migrations add:
+    tables, plain and generated name_key columns, column defaults and the
+    set_updated_at / log_deleted_row triggers.
+    """
+    with open(schema_path, encoding='utf-8') as f:
+        sql = _strip_comments(f)
+    tables = {}
+    _create_tables(sql, tables)
+
+    if os.path.isdir(migrations_dir):
+        for fname in sorted(os.listdir(migrations_dir)):
+            with open(os.path.join(migrations_dir, fname), encoding='utf-8') as f:
+                sql = _strip_comments(f)
+            _create_tables(sql, tables)
+            for tname, col, source in _GENERATED.findall(sql):
+                if tname in tables:
+                    tables[tname].columns[col] = Column(col, 'TEXT', generated_from=source)
+            for tname, col, type_ in _ADD_COLUMN.findall(sql):
+                if tname in tables and col not in tables[tname].columns:
+                    tables[tname].columns[col] = Column(col, type_.upper())
+            for tname, col, default in _SET_DEFAULT.findall(sql):
+                if tname in tables and col in tables[tname].columns:
+                    tables[tname].columns[col].default = default
+            for tname, fn in _TRIGGER.findall(sql):
+                if tname in tables:
+                    tables[tname].triggers.add(fn)
+    return tables
+
+
+# ── Errors and value helpers ─────────────────────────────────────────────────
+
+class PostgrestError(Exception):
+    """An error response: HTTP status plus PostgREST's JSON error body."""
+
+    STATUS = {'23505': 409, '23503': 409, 'PGRST205': 404, '21000': 500}
+
+    def __init__(self, code, message, details=None, status=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.details = details
+        self.status = status or self.STATUS.get(code, 400)
+
+    def body(self):
+        return {'code': self.code, 'details': self.details, 'hint': None, 'message': self.message}
+
+
+def _text(value):
+    """Render a stored value the way PostgreSQL prints it, for filter comparison."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _coerce(column, value):
+    """Cast a JSON value to the column type, as PostgreSQL's input functions would."""
+    if value is None:
+        return None
+    kind = column.type
+    try:
+        if kind == 'UUID':
+            return str(uuid.UUID(str(value)))
+        if kind == 'INTEGER':
+            return int(value)
+        if kind.startswith('DECIMAL'):
+            return float(value)
+        if kind == 'BOOLEAN':
+            if isinstance(value, bool):
+                return value
+            return {'true': True, 't': True, 'false': False, 'f': False}[str(value).lower()]
+    except (ValueError, KeyError, TypeError):
+        raise PostgrestError('22P02', f'invalid input syntax for type {kind.lower()}: "{value}"')
+    return value
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+
+def _default(column):
+    d = column.default
+    if d is None:
+        return None
+    if d == 'gen_random_uuid()':
+        return str(uuid.uuid4())
+    if d == 'NOW()':
+        return _now()
+    if d.startswith("'"):
+        return d[1:-1]
+    if d in ('true', 'false'):
+        return d == 'true'
+    return int(d) if d.isdigit() else d
+
+
+def _pattern(value, case_insensitive):
+    """A LIKE / ILIKE pattern (PostgREST accepts * for %) as a compiled regex."""
+    parts = (re.escape(c) if c not in '*%_' else ('.' if c == '_' else '.*') for c in value)
+    return re.compile('^' + ''.join(parts) + '$', re.S | (re.I if case_insensitive else 0))
+
+
+def parse_in_list(value):
+    """'("a,b","c\\"d",e)' → ['a,b', 'c"d', 'e']"""
+    if not (value.startswith('(') and value.endswith(')')):
+        raise PostgrestError('PGRST100', f'failed to parse filter (in.{value})')
+    body, out, i = value[1:-1], [], 0
+    while i < len(body):
+        if body[i] == '"':
+            i += 1
+            item = []
+            while i < len(body) and body[i] != '"':
+                if body[i] == '\\' and i + 1 < len(body):
+                    i += 1
+                item.append(body[i])
+                i += 1
+            out.append(''.join(item))
+            i += 1                                  # closing quote
+            while i < len(body) and body[i] != ',':
+                i += 1
+        else:
+            end = body.find(',', i)
+            end = len(body) if end < 0 else end
+            out.append(body[i:end].strip())
+            i = end
+        i += 1                                      # comma
+    return out
+
+
+def _filter(column, expr):
+    """Return a predicate row → bool for one `column=op.value` query parameter."""
+    op, _, value = expr.partition('.')
+    if op == 'in':
+        wanted = set(parse_in_list(value))
+        return lambda row: _text(row.get(column)) in wanted
+    if op == 'is':
+        target = {'null': None, 'true': True, 'false': False}.get(value.lower(), ...)
+        if target is ...:
+            raise PostgrestError('PGRST100', f'failed to parse filter (is.{value})')
+        return lambda row: row.get(column) is target
+    if op in ('like', 'ilike'):
+        regex = _pattern(value, op == 'ilike')
+        return lambda row: row.get(column) is not None and bool(regex.match(_text(row[column])))
+    if op in ('eq', 'neq'):
+        equal = op == 'eq'
+        return lambda row: row.get(column) is not None and (_text(row[column]) == value) == equal
+    if op in ('gt', 'gte', 'lt', 'lte'):
+        compare = {'gt': lambda a, b: a > b, 'gte': lambda a, b: a >= b,
+                   'lt': lambda a, b: a < b, 'lte': lambda a, b: a <= b}[op]
+        target_num = _number(value)
+
+        def check(row):
+            current = row.get(column)
+            if current is None:
+                return False
+            if target_num is not None and _number(current) is not None:
+                return compare(_number(current), target_num)
+            return compare(_text(current), value)
+        return check
+    raise PostgrestError('PGRST100', f'failed to parse filter ({expr})')
+
+
+# ── Database ─────────────────────────────────────────────────────────────────
+
+class FakeDatabase:
+    """In-memory tables with the schema's keys and constraints, one lock for all."""
+
+    def __init__(self, schema=None):
+        self.schema = schema or load_schema()
+        self.rows = {name: {} for name in self.schema}             # table → {id: row}
+        self.indexes = {name: {cols: {} for cols in t.uniques}     # table → cols → key → row
+                        for name, t in self.schema.items()}
+        self.lock = threading.RLock()
+        self._undo = None
+
+    # ── Low-level row changes (indexed, undoable) ────────────────────────────
+
+    def _table(self, name):
+        if name not in self.schema:
+            raise PostgrestError('PGRST205', f"Could not find the table 'public.{name}' in the schema cache")
+        return self.schema[name]
+
+    @staticmethod
+    def _key(row, cols):
+        key = tuple(_text(row.get(c)) for c in cols)
+        return None if None in key else key         # NULLs never conflict
+
+    def _index(self, table, row, add):
+        for cols, index in self.indexes[table].items():
+            key = self._key(row, cols)
+            if key is not None:
+                if add:
+                    index[key] = row
+                elif index.get(key) is row:
+                    del index[key]
+
+    def _put(self, table, row):
+        self.rows[table][row['id']] = row
+        self._index(table, row, True)
+        self._undo.append(('put', table, row))
+
+    def _drop(self, table, row):
+        self._index(table, row, False)
+        del self.rows[table][row['id']]
+        self._undo.append(('drop', table, row))
+
+    def _replace(self, table, row, new):
+        old = dict(row)
+        self._index(table, row, False)
+        row.clear()
+        row.update(new)
+        self._index(table, row, True)
+        self._undo.append(('replace', table, row, old))
+
+    def _rollback(self, mark):
+        while len(self._undo) > mark:
+            entry = self._undo.pop()
+            op, table, row = entry[:3]
+            if op == 'put':
+                self._index(table, row, False)
+                del self.rows[table][row['id']]
+            elif op == 'drop':
+                self.rows[table][row['id']] = row
+                self._index(table, row, True)
+            else:
+                self._index(table, row, False)
+                row.clear()
+                row.update(entry[3])
+                self._index(table, row, True)
+
+    def transaction(self, fn, *args, **kwargs):
+        """Run fn atomically: any PostgrestError undoes everything it changed."""
+        with self.lock:
+            outer = self._undo is None
+            if outer:
+                self._undo = []
+            mark = len(self._undo)
+            try:
+                return fn(*args, **kwargs)
+            except BaseException:
+                self._rollback(mark)
+                raise
+            finally:
+                if outer:
+                    self._undo = None
+
+    # ── Validation ───────────────────────────────────────────────────────────
+
+    def _prepare(self, table, values, base=None):
+        """Coerce `values` over `base` (defaults for a new row), fill generated columns, check NOT NULL / FKs."""
+        spec = self._table(table)
+        row = dict(base) if base is not None else {
+            name: _default(col) for name, col in spec.columns.items() if not col.generated_from}
+        for name, value in values.items():
+            col = spec.columns.get(name)
+            if col is None:
+                raise PostgrestError('PGRST204', f"Could not find the '{name}' column of '{table}' in the schema cache")
+            if col.generated_from:
+                raise PostgrestError('428C9', f'cannot insert a non-DEFAULT value into column "{name}"',
+                                     details=f'Column "{name}" is a generated column.')
+            row[name] = _coerce(col, value)
+        if 'set_updated_at' in spec.triggers:
+            row['updated_at'] = _now()
+        for name, col in spec.columns.items():
+            if col.generated_from:
+                row[name] = name_key(row.get(col.generated_from))
+            if col.not_null and row.get(name) is None:
+                raise PostgrestError('23502', f'null value in column "{name}" of relation "{table}" '
+                                              'violates not-null constraint')
+            if col.references and row.get(name) is not None and (base is None or base.get(name) != row[name]):
+                if row[name] not in self.rows[col.references]:
+                    raise PostgrestError('23503', f'insert or update on table "{table}" violates foreign key '
+                                                  f'constraint "{table}_{name}_fkey"',
+                                         details=f'Key ({name})=({row[name]}) is not present in table '
+                                                 f'"{col.references}".')
+        return row
+
+    def _conflict(self, table, row, only=None, skip=None):
+        """First (cols, existing row) whose unique key `row` collides with."""
+        for cols, index in self.indexes[table].items():
+            if only is not None and cols != only:
+                continue
+            key = self._key(row, cols)
+            hit = index.get(key) if key is not None else None
+            if hit is not None and hit is not skip:
+                return cols, hit
+        return None
+
+    def _unique_violation(self, table, cols, row):
+        values = ', '.join(_text(row.get(c)) for c in cols)
+        return PostgrestError('23505', f'duplicate key value violates unique constraint '
+                                       f'"{self.schema[table].constraint_name(cols)}"',
+                              details=f'Key ({", ".join(cols)})=({values}) already exists.')
+
+    # ── Operations ───────────────────────────────────────────────────────────
+
+    def select(self, table, filters=(), columns=None, order=(), limit=None, offset=0):
+        spec = self._table(table)
+        for col in list(columns or ()) + [c for c, _, _ in order]:
+            if col not in spec.columns:
+                raise PostgrestError('42703', f'column {table}.{col} does not exist')
+        with self.lock:
+            rows = [r for r in self.rows[table].values() if all(f(r) for f in filters)]
+            for col, desc, nulls_first in reversed(order):
+                present = sorted((r for r in rows if r.get(col) is not None),
+                                 key=lambda r: r[col], reverse=desc)
+                missing = [r for r in rows if r.get(col) is None]
+                rows = missing + present if nulls_first else present + missing
+            rows = rows[offset:offset + limit if limit is not None else None]
+            return [{c: r.get(c) for c in columns} if columns else dict(r) for r in rows]
+
+    def insert(self, table, rows, on_conflict=None, resolution=None):
+        """INSERT rows [ON CONFLICT (on_conflict) DO UPDATE / DO NOTHING]; returns the rows written."""
+        return self.transaction(self._insert, table, rows, on_conflict, resolution)
+
+    def _insert(self, table, rows, on_conflict, resolution):
+        spec = self._table(table)
+        target = tuple(c.strip() for c in on_conflict.split(',')) if on_conflict else ('id',)
+        if resolution and target not in spec.uniques:
+            raise PostgrestError('42P10', 'there is no unique or exclusion constraint matching '
+                                          'the ON CONFLICT specification')
+        out, touched = [], set()
+        for values in rows:
+            row = self._prepare(table, values)
+            existing = self._conflict(table, row, only=target) if resolution else None
+            if existing:
+                hit = existing[1]
+                if id(hit) in touched and resolution == 'merge-duplicates':
+                    raise PostgrestError('21000', 'ON CONFLICT DO UPDATE command cannot affect row a second time')
+                if resolution == 'ignore-duplicates':
+                    continue
+                merged = self._prepare(table, values, base=hit)
+                clash = self._conflict(table, merged, skip=hit)
+                if clash:
+                    raise self._unique_violation(table, clash[0], merged)
+                self._replace(table, hit, merged)
+                touched.add(id(hit))
+                out.append(hit)
+                continue
+            clash = self._conflict(table, row)
+            if clash:
+                raise self._unique_violation(table, clash[0], row)
+            self._put(table, row)
+            touched.add(id(row))
+            out.append(row)
+        return [dict(r) for r in out]
+
+    def update(self, table, filters, changes):
+        return self.transaction(self._update, table, filters, changes)
+
+    def _update(self, table, filters, changes):
+        self._table(table)
+        out = []
+        for row in [r for r in self.rows[table].values() if all(f(r) for f in filters)]:
+            new = self._prepare(table, changes, base=row)
+            clash = self._conflict(table, new, skip=row)
+            if clash:
+                raise self._unique_violation(table, clash[0], new)
+            self._replace(table, row, new)
+            out.append(dict(row))
+        return out
+
+    def delete(self, table, filters):
+        return self.transaction(self._delete, table, filters)
+
+    def _delete(self, table, filters):
+        self._table(table)
+        doomed = [r for r in self.rows[table].values() if all(f(r) for f in filters)]
+        for row in doomed:
+            self._delete_row(table, row)
+        return [dict(r) for r in doomed]
+
+    def _delete_row(self, table, row):
+        if row['id'] not in self.rows[table]:
+            return                                  # already removed by a cascade
+        for other, spec in self.schema.items():
+            for col in spec.columns.values():
+                if col.references != table:
+                    continue
+                refs = [r for r in self.rows[other].values() if r.get(col.name) == row['id']]
+                if refs and not col.cascade:
+                    raise PostgrestError('23503', f'update or delete on table "{table}" violates foreign key '
+                                                  f'constraint "{other}_{col.name}_fkey" on table "{other}"')
+                for ref in refs:
+                    self._delete_row(other, ref)
+        self._drop(table, row)
+        if 'log_deleted_row' in self.schema[table].triggers:
+            self._put('deleted_rows', {'id': str(uuid.uuid4()), 'table_name': table, 'row_id': row['id'],
+                                       'old_row': dict(row), 'deleted_at': _now()})
+
+    def rpc(self, name, args):
+        fn = RPCS.get(name)
+        if fn is None:
+            raise PostgrestError('PGRST202', f'Could not find the function public.{name} in the schema cache',
+                                 status=404)
+        return self.transaction(fn, self, **(args or {}))
+
+    def seed(self, data):
+        """Insert {table: [row, ...]} (e.g. the sectors the scripts expect)."""
+        for table, rows in data.items():
+            self.insert(table, rows)
+
+
+# ── RPCs (Python ports of supabase/migrations/*.sql) ─────────────────────────
+
+def _find_by_key(db, table, column, name):
+    """Row matching `name` on name_key, the exact spelling first, then the lowest id."""
+    key = name_key(name)
+    rows = [r for r in db.rows[table].values()
+            if r.get('name_key') == key and (key or r.get(column) == name)]
+    return min(rows, key=lambda r: (r.get(column) != name, r['id']), default=None)
+
+
+def _get_or_insert(db, table, key_cols, values):
+    """INSERT ... ON CONFLICT (key_cols) DO NOTHING, then the row's id."""
+    existing = db._conflict(table, db._prepare(table, values), only=key_cols)
+    if existing:
+        return existing[1]['id']
+    return db._insert(table, [values], None, None)[0]['id']
+
+
+# Keys ingest_deal() accepts; anything else raises instead of being dropped
+DEAL_COMPANY_COLUMNS = ('name', 'description', 'website', 'hq_city_id', 'hq_city_name', 'hq_country',
+                        'founded_year', 'status', 'logo_url', 'siren', 'siret')
+DEAL_ROUND_COLUMNS = ('round_type', 'amount_eur', 'announced_date', 'announced_month', 'announced_year',
+                      'valuation_eur', 'news_url', 'press_release_url', 'notes', 'is_verified', 'source')
+
+
+def _check_keys(what, values, allowed):
+    unknown = [k for k in values if k not in allowed]
+    if unknown:
+        raise PostgrestError('P0001', f'unknown {what} column(s): {", ".join(unknown)}')
+
+
+def rpc_ingest_deal(db, deal):
+    company = deal.get('company') or {}
+    name = (company.get('name') or '').strip()
+    if not name:
+        raise PostgrestError('P0001', 'deal has no company name')
+    _check_keys('company', company, DEAL_COMPANY_COLUMNS)
+    city_id = None
+    if deal.get('link_city') and company.get('hq_city_name'):
+        city_id = _get_or_insert(db, 'cities', ('name', 'country'),
+                                 {'name': company['hq_city_name'], 'country': 'France'})
+    row = _find_by_key(db, 'companies', 'name', name)
+    if not row:
+        # Missing keys take the column defaults, as in a direct insert
+        values = {**company, 'name': name}
+        if city_id:
+            values['hq_city_id'] = city_id
+        row = db._insert('companies', [values], None, None)[0]
+    company_id = row['id']
+
+    for pos, sector_id in enumerate(deal.get('sector_ids') or []):
+        db._insert('company_sectors', [{'company_id': company_id, 'sector_id': sector_id,
+                                        'is_primary': pos == 0}],
+                   'company_id,sector_id', 'ignore-duplicates')
+    for founder in dict.fromkeys(f.strip() for f in deal.get('founders') or [] if f.strip()):
+        person = _find_by_key(db, 'people', 'full_name', founder)
+        person_id = person['id'] if person else db._insert('people', [{'full_name': founder}],
+                                                           None, None)[0]['id']
+        db._insert('company_people', [{'company_id': company_id, 'person_id': person_id,
+                                       'role': 'founder', 'is_current': True}],
+                   'company_id,person_id,role', 'ignore-duplicates')
+
+    round_ids = []
+    for rnd in deal.get('rounds') or []:
+        values = {k: v for k, v in rnd.items() if k != 'investors'}
+        _check_keys('funding round', values, DEAL_ROUND_COLUMNS)
+        round_id = db._insert('funding_rounds', [{**values, 'company_id': company_id}], None, None)[0]['id']
+        round_ids.append(round_id)
+        investors = [i.strip() for i in rnd.get('investors') or [] if i.strip()]
+        for pos, investor in enumerate(investors):
+            found = _find_by_key(db, 'investors', 'name', investor)
+            investor_id = found['id'] if found else db._insert('investors', [{'name': investor}],
+                                                               None, None)[0]['id']
+            db._insert('funding_round_investors', [{'funding_round_id': round_id,
+                                                    'investor_id': investor_id, 'is_lead': pos == 0}],
+                       'funding_round_id,investor_id', 'ignore-duplicates')
+    return {'company_id': company_id, 'round_ids': round_ids}
+
+
+def rpc_ingest_deals(db, deals):
+    results = []
+    for deal in deals:
+        try:
+            results.append({**db.transaction(rpc_ingest_deal, db, deal), 'ok': True})
+        except PostgrestError as e:
+            results.append({'ok': False, 'error': e.message})
+    return results
+
+
+def rpc_merge_investors(db, dirty_ids, clean_id):
+    dirty = [d for d in dirty_ids if d != clean_id]
+    if clean_id not in db.rows['investors']:
+        raise PostgrestError('P0001', f'clean investor {clean_id} does not exist')
+    links = db.rows['funding_round_investors']
+    combined = {}
+    for link in links.values():
+        if link['investor_id'] in dirty:
+            d = combined.setdefault(link['funding_round_id'], {'is_lead': False, 'amount': None})
+            d['is_lead'] = d['is_lead'] or bool(link.get('is_lead'))
+            amount = link.get('investment_amount_eur')
+            if amount is not None and (d['amount'] is None or amount > d['amount']):
+                d['amount'] = amount
+    merged = moved = 0
+    for round_id, d in combined.items():
+        existing = db._conflict('funding_round_investors',
+                                {'funding_round_id': round_id, 'investor_id': clean_id},
+                                only=('funding_round_id', 'investor_id'))
+        if existing:
+            row = existing[1]
+            db._replace('funding_round_investors', row, {
+                **row, 'is_lead': bool(row.get('is_lead')) or d['is_lead'],
+                'investment_amount_eur': row.get('investment_amount_eur')
+                if row.get('investment_amount_eur') is not None else d['amount']})
+            merged += 1
+        else:
+            db._insert('funding_round_investors', [{'funding_round_id': round_id, 'investor_id': clean_id,
+                                                    'is_lead': d['is_lead'],
+                                                    'investment_amount_eur': d['amount']}], None, None)
+            moved += 1
+    deleted = 0
+    for investor_id in dirty:
+        row = db.rows['investors'].get(investor_id)
+        if row:
+            db._delete_row('investors', row)
+            deleted += 1
+    return {'links_moved': moved, 'links_merged': merged, 'investors_deleted': deleted}
+
+
+def rpc_refresh_funding_complete(db, company_ids=None):
+    wanted = None if company_ids is None else set(company_ids)
+    rounds = [r for r in db.rows['funding_rounds'].values() if wanted is None or r['company_id'] in wanted]
+    round_ids = {r['id'] for r in rounds}
+    db._delete('funding_complete', [lambda r: wanted is None or r['company_id'] in wanted or r['id'] in round_ids])
+
+    sectors, founders, investors = {}, {}, {}
+    for link in db.rows['company_sectors'].values():
+        s = db.rows['sectors'][link['sector_id']]
+        sectors.setdefault(link['company_id'], []).append(
+            (not link.get('is_primary'), s['name'] or '',
+             {'id': s['id'], 'name': s['name'], 'slug': s.get('slug'), 'color': s.get('color')}))
+    for link in db.rows['company_people'].values():
+        p = db.rows['people'][link['person_id']]
+        founders.setdefault(link['company_id'], []).append(
+            (p['full_name'] or '', {'id': p['id'], 'name': p['full_name'], 'linkedin': p.get('linkedin_url'),
+                                    'role': link.get('role')}))
+    for link in db.rows['funding_round_investors'].values():
+        if link['funding_round_id'] in round_ids:
+            i = db.rows['investors'][link['investor_id']]
+            investors.setdefault(link['funding_round_id'], []).append(
+                (not link.get('is_lead'), i['name'] or '',
+                 {'id': i['id'], 'name': i['name'], 'is_lead': link.get('is_lead')}))
+
+    def ordered(entries):
+        return [entry[-1] for entry in sorted(entries, key=lambda e: e[:-1])]
+
+    rows = []
+    for r in rounds:
+        c = db.rows['companies'][r['company_id']]
+        month = month_number(r.get('announced_month'))
+        sort_date = r.get('announced_date')
+        if sort_date is None and r.get('announced_year'):
+            sort_date = date(r['announced_year'], month or 1, 1).isoformat()
+        rows.append({
+            'id': r['id'], 'company_id': c['id'], 'company_name': c['name'],
+            'company_description': c.get('description'), 'company_website': c.get('website'),
+            'hq_city_name': c.get('hq_city_name'), 'round_type': r.get('round_type'),
+            'amount_eur': r.get('amount_eur'), 'announced_date': r.get('announced_date'),
+            'announced_month': r.get('announced_month'), 'announced_year': r.get('announced_year'),
+            'month_number': month, 'sort_date': sort_date, 'news_url': r.get('news_url'),
+            'sectors': ordered(sectors.get(c['id'], [])), 'founders': ordered(founders.get(c['id'], [])),
+            'investors': ordered(investors.get(r['id'], []))})
+    if rows:
+        db._insert('funding_complete', rows, None, None)
+    return {'rows': len(rows), 'as_of': _now()}
+
+
+def rpc_merge_investors_batch(db, merges):
+    return [rpc_merge_investors(db, m['dirty_ids'], m['clean_id']) for m in merges]
+
+
+RPCS = {
+    'ingest_deal': rpc_ingest_deal,
+    'ingest_deals': rpc_ingest_deals,
+    'merge_investors': rpc_merge_investors,
+    'merge_investors_batch': rpc_merge_investors_batch,
+    'refresh_funding_complete': rpc_refresh_funding_complete,
+}
+
+
+# ── HTTP front end ───────────────────────────────────────────────────────────
+
+def parse_query(db, table, query):
+    """Split a PostgREST query string into (filters, columns, order, limit, offset, on_conflict)."""
+    filters, columns, order, limit, offset, on_conflict = [], None, [], None, 0, None
+    for key, value in urllib.parse.parse_qsl(query, keep_blank_values=True):
+        if key == 'select':
+            if '(' in value:
+                raise PostgrestError('PGRST200', 'embedded resources are not supported by the fake server')
+            columns = None if value in ('', '*') else [c.strip() for c in value.split(',')]
+        elif key == 'order':
+            for term in value.split(','):
+                parts = term.split('.')
+                desc = 'desc' in parts[1:]
+                nulls_first = 'nullsfirst' in parts[1:] or (desc and 'nullslast' not in parts[1:])
+                order.append((parts[0], desc, nulls_first))
+        elif key == 'limit':
+            limit = int(value)
+        elif key == 'offset':
+            offset = int(value)
+        elif key == 'on_conflict':
+            on_conflict = value
+        else:
+            if table in db.schema and key not in db.schema[table].columns:
+                raise PostgrestError('42703', f'column {table}.{key} does not exist')
+            filters.append(_filter(key, value))
+    return filters, columns, order, limit, offset, on_conflict
+
+
+def parse_prefer(header):
+    prefer = {}
+    for part in (header or '').split(','):
+        key, _, value = part.strip().partition('=')
+        if key:
+            prefer[key] = value
+    return prefer
+
+
+class FakePostgrest:
+    """FakeDatabase behind a threaded HTTP server on 127.0.0.1 (see module docstring)."""
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 retry_after=None, seed=None, schema=None, random_seed=None, max_rows=MAX_ROWS):
+        self.db = FakeDatabase(schema)
+        if seed:
+            self.db.seed(seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.max_rows = max_rows
+        self.random = random.Random(random_seed)
+        self.calls = Counter()          # (method, table) → requests, injected failures included
+        self.failures = 0
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    @property
+    def requests(self):
+        return sum(self.calls.values())
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.calls.clear()
+            self.failures = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    # ── Request handling ─────────────────────────────────────────────────────
+
+    def handle(self, method, path, headers, body):
+        """Return (status, extra headers, JSON-able body or None)."""
+        resource, _, query = path.partition('?')
+        resource = resource[len('/rest/v1/'):] if resource.startswith('/rest/v1/') else resource.lstrip('/')
+        with self._stats_lock:
+            self.calls[(method, resource)] += 1
+            fail = self.error_rate and self.random.random() < self.error_rate
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if fail:
+                self.failures += 1
+        if delay:
+            time.sleep(delay)
+        if fail:
+            extra = {'Retry-After': str(self.retry_after)} if self.retry_after is not None else {}
+            return self.error_status, extra, {'message': 'injected failure'}
+        if not headers.get('apikey'):
+            return 401, {}, {'message': 'No API key found in request'}
+
+        prefer = parse_prefer(headers.get('Prefer'))
+        representation = prefer.get('return') == 'representation'
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            return 400, {}, PostgrestError('PGRST102', 'Empty or invalid json').body()
+
+        try:
+            if resource.startswith('rpc/'):
+                if method != 'POST':
+                    raise PostgrestError('PGRST101', 'Only POST is supported for this fake RPC', status=405)
+                return 200, {}, self.db.rpc(resource[4:], payload)
+
+            filters, columns, order, limit, offset, on_conflict = parse_query(self.db, resource, query)
+            if method == 'GET':
+                limit = self.max_rows if limit is None else min(limit, self.max_rows)
+                return 200, {}, self.db.select(resource, filters, columns, order, limit, offset)
+            if method == 'POST':
+                rows = payload if isinstance(payload, list) else [payload]
+                if any(not isinstance(r, dict) for r in rows):
+                    raise PostgrestError('PGRST102', 'Empty or invalid json')
+                if len({tuple(sorted(r)) for r in rows}) > 1:
+                    raise PostgrestError('PGRST102', 'All object keys must match')
+                written = self.db.insert(resource, rows, on_conflict, prefer.get('resolution'))
+                return 201, {}, self._shape(written, columns) if representation else None
+            if method == 'PATCH':
+                if not isinstance(payload, dict):
+                    raise PostgrestError('PGRST102', 'Empty or invalid json')
+                written = self.db.update(resource, filters, payload)
+            elif method == 'DELETE':
+                written = self.db.delete(resource, filters)
+            else:
+                return 405, {}, {'message': f'{method} not supported'}
+            return (200, {}, self._shape(written, columns)) if representation else (204, {}, None)
+        except PostgrestError as e:
+            return e.status, {}, e.body()
+
+    @staticmethod
+    def _shape(rows, columns):
+        return [{c: r.get(c) for c in columns} for r in rows] if columns else rows
+
+
+def _handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Buffer the response so headers and body leave in one segment
+        wbufsize = 1 << 16
+
+        def log_message(self, *args):
+            pass
+
+        def _respond(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            status, extra, payload = server.handle(self.command, self.path, self.headers, body)
+            data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+            self.send_response(status)
+            if data:
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+            for key, value in extra.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = _respond
+
+    return Handler
+
+
+def sector_seed(names):
+    """Sector rows for the given names, slugged like migrate.js."""
+    return [{'name': n, 'slug': name_key(n).replace(' ', '-')} for n in names]
+
+
+def funding_data_sectors(path=os.path.join(HERE, '..', 'funding-data.json')):
+    with open(path, encoding='utf-8') as f:
+        return sorted({s for rec in json.load(f) for s in rec.get('sectors') or []})
+
+
+def main():
+    p = argparse.ArgumentParser(description='Serve a local fake Supabase REST API.')
+    p.add_argument('--port', type=int, default=54321)
+    p.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    p.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds, random')
+    p.add_argument('--error-rate', type=float, default=0.0, help='share of requests failing (0-1)')
+    p.add_argument('--error-status', type=int, default=503)
+    p.add_argument('--retry-after', type=float, help='Retry-After seconds sent with failures')
+    p.add_argument('--seed', metavar='JSON', help='initial rows, {table: [row, ...]}')
+    p.add_argument('--seed-sectors', action='store_true',
+                   help='create the sectors used in funding-data.json')
+    args = p.parse_args()
+
+    seed = {}
+    if args.seed:
+        with open(args.seed, encoding='utf-8') as f:
+            seed = json.load(f)
+    if args.seed_sectors:
+        seed = {'sectors': sector_seed(funding_data_sectors()), **seed}
+    server = FakePostgrest(port=args.port, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, error_status=args.error_status,
+                           retry_after=args.retry_after, seed=seed)
+    print(f'Fake PostgREST on {server.url}')
+    print(f'  export SUPABASE_URL={server.url} SUPABASE_SERVICE_KEY=fake')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f'\n{server.requests} requests ({server.failures} injected failures)')
+
+
+if __name__ == '__main__':
+    main()
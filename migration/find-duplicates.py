@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Find likely duplicate investors and people.
+
+Dumps the table and its links, generates candidate pairs by blocking on
+normalized name tokens (see dedupe.py) and prints them best first as
+(dirty, clean) entries ready to review and paste into OPERATIONS in
+cleanup-investors-cat4.py. Nothing is written to the database.
+
+Usage:
+  export SUPABASE_SERVICE_KEY="..."
+  python3 migration/find-duplicates.py
+  python3 migration/find-duplicates.py --table people --min-score 0.9
+  python3 migration/find-duplicates.py --json investors-dupes.json
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import asdict
+
+from dedupe import DEFAULT_MAX_BLOCK, find_duplicates
+from entity_resolver import select_all
+from supabase_rest import SERVICE_KEY, get_client
+
+if not SERVICE_KEY:
+    print('Error: SUPABASE_SERVICE_KEY required'); sys.exit(1)
+
+
+def load_investors(client):
+    """[(id, name)], and investor id → ids of the companies it backed."""
+    records = [(r['id'], r['name']) for r in select_all(client, 'investors', 'id,name')]
+    round_company = {r['id']: r['company_id']
+                     for r in select_all(client, 'funding_rounds', 'id,company_id')}
+    links = {}
+    for link in select_all(client, 'funding_round_investors', 'id,funding_round_id,investor_id'):
+        company_id = round_company.get(link['funding_round_id'])
+        if company_id:
+            links.setdefault(link['investor_id'], set()).add(company_id)
+    return records, links
+
+
+def load_people(client):
+    """[(id, full_name)], and person id → ids of their companies."""
+    records = [(r['id'], r['full_name']) for r in select_all(client, 'people', 'id,full_name')]
+    links = {}
+    for link in select_all(client, 'company_people', 'id,company_id,person_id'):
+        links.setdefault(link['person_id'], set()).add(link['company_id'])
+    return records, links
+
+
+LOADERS = {'investors': load_investors, 'people': load_people}
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Find likely duplicate investors / people.')
+    p.add_argument('--table', choices=sorted(LOADERS), action='append',
+                   help='table to scan (repeatable; default both)')
+    p.add_argument('--min-score', type=float, default=0.8,
+                   help='lowest score to report, 0-1 (default 0.8)')
+    p.add_argument('--max-block', type=int, default=DEFAULT_MAX_BLOCK,
+                   help=f'ignore blocking keys shared by more records (default {DEFAULT_MAX_BLOCK})')
+    p.add_argument('--json', metavar='PATH', help='also write all pairs with scores and ids')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    client = get_client()
+    report = {}
+
+    for table in args.table or sorted(LOADERS):
+        records, links = LOADERS[table](client)
+        pairs = find_duplicates(records, links, min_score=args.min_score,
+                                max_block=args.max_block)
+        report[table] = pairs
+
+        print(f'# {table}: {len(records)} records, {len(pairs)} candidate pairs '
+              f'(score >= {args.min_score})')
+        print(f'{table.upper()}_OPERATIONS = [')
+        for p in pairs:
+            print(f'    ({p.dirty!r}, {p.clean!r}),  '
+                  f'# {p.score:.2f} (name {p.name_score:.2f}, overlap {p.overlap:.2f})')
+        print(']\n')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({t: [asdict(p) for p in pairs] for t, pairs in report.items()},
+                      f, ensure_ascii=False, indent=2)
+        print(f'Wrote {args.json}')
+
+
+if __name__ == '__main__':
+    main()
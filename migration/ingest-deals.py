@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Ingest deals from data files instead of a per-week copy of a script.
+
+Streams deals through parse → normalize → resolve → write. Files are read
+lazily and deals are handled `--batch-size` at a time: each batch is
+resolved in bulk and written concurrently before the next one is read, so
+memory stays flat however large the backfill is.
+
+Finished steps are checkpointed in migration/.journal/ingest-deals.jsonl
+(or --journal PATH), so re-running the same files after a failure skips
+completed deals and finishes half-done ones.
+
+With --rpc each batch is written by the ingest_deals Postgres function
+(one request per batch, each deal atomic); deploy
+supabase/migrations/20261017000000_ingest_deal_rpc.sql first.
+
+Supported inputs: .jsonl, .csv, .yaml/.yml (see deal_sources.py for the
+record shapes). Sectors are matched by name against the sectors table.
+
+Usage:
+  export SUPABASE_SERVICE_KEY="..."
+  python3 migration/ingest-deals.py deals/2026-03.jsonl
+  python3 migration/ingest-deals.py --year 2025 --batch-size 200 backfill/*.csv
+  python3 migration/ingest-deals.py --rpc deals/2026-03.jsonl
+  python3 migration/ingest-deals.py --metrics ingest.prom deals/2026-03.jsonl
+"""
+
+import argparse
+import sys
+
+from deal_ingest import DEFAULT_CONCURRENCY, USE_RPC, DealIngestor
+from deal_sources import batched, normalize, read_deals
+from entity_resolver import EntityResolver
+from ingest_journal import IngestJournal, default_path
+from supabase_rest import SERVICE_KEY, get_client
+
+if not SERVICE_KEY:
+    print('Error: SUPABASE_SERVICE_KEY required'); sys.exit(1)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description='Ingest deals from JSONL/CSV/YAML files.')
+    p.add_argument('files', nargs='+', help='deal files, read in order')
+    p.add_argument('--batch-size', type=int, default=100,
+                   help='deals resolved and written together (default 100)')
+    p.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                   help=f'deals in flight within a batch (default {DEFAULT_CONCURRENCY})')
+    p.add_argument('--month', help='announced_month for flat records without one')
+    p.add_argument('--year', type=int, help='announced_year for flat records without one')
+    p.add_argument('--link-city', action='store_true',
+                   help='also resolve cities and set companies.hq_city_id')
+    p.add_argument('--rpc', action='store_true', default=USE_RPC,
+                   help='write each batch through the ingest_deals RPC (or INGEST_RPC=1)')
+    p.add_argument('--journal', default=default_path(__file__),
+                   help='checkpoint journal (default migration/.journal/ingest-deals.jsonl)')
+    p.add_argument('--no-journal', action='store_true', help='do not checkpoint or resume')
+    p.add_argument('--metrics', metavar='PATH',
+                   help='write a request/latency report (.json, or OpenMetrics for .prom)')
+    return p.parse_args()
+
+
+def records(files):
+    for path in files:
+        yield from read_deals(path)
+
+
+def main():
+    args = parse_args()
+    print('==============================================')
+    print('Ingesting Deals')
+    print('==============================================\n')
+
+    client = get_client()
+    sectors = {s['name']: s['id'] for s in client.request('GET', 'sectors?select=id,name')}
+    # One resolver for the whole run: names seen in earlier batches cost nothing later
+    journal = None if args.no_journal else IngestJournal(args.journal)
+    ingestor = DealIngestor(client=client, resolver=EntityResolver(client), sector_ids=sectors,
+                            concurrency=args.concurrency, link_city=args.link_city,
+                            journal=journal, use_rpc=args.rpc, rpc_batch_size=args.batch_size)
+
+    ok = err = skipped = 0
+
+    def bad_record(location, message):
+        nonlocal err
+        print(f'  ERROR {location}: {message}')
+        err += 1
+
+    def report(result):
+        nonlocal ok, err, skipped
+        for warning in result.warnings:
+            print(f'  {result.name}: {warning}')
+        if result.skipped:
+            skipped += 1
+        elif result.ok:
+            print(f'  ✓ {result.name}')
+            ok += 1
+        else:
+            print(f'  ERROR {result.name}: {result.error}')
+            err += 1
+
+    defaults = {'announced_month': args.month, 'announced_year': args.year}
+    deals = normalize(records(args.files), defaults, on_error=bad_record)
+    try:
+        for batch in batched(deals, args.batch_size):
+            ingestor.run(batch, on_result=report)
+    finally:
+        if journal:
+            journal.close()
+
+    print(f'\n  Done — {ok} inserted, {skipped} already done, {err} errors')
+    client.metrics.print_summary()
+    print()
+    if args.metrics:
+        client.metrics.write(args.metrics)
+        print(f'  Metrics written to {args.metrics}\n')
+    if err:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
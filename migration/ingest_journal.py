@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Append-only checkpoint journal for deal ingestion.
+
+Each deal is keyed by a hash of its content. As the ingestor finishes a
+step it appends one JSON line:
+
+  {"deal": "<sha256>", "step": "company", "id": "<uuid>"}
+  {"deal": "<sha256>", "step": "round", "n": 0, "id": "<uuid>"}
+  {"deal": "<sha256>", "step": "round_investors", "n": 0}
+  {"deal": "<sha256>", "step": "sectors"}
+  {"deal": "<sha256>", "step": "founders"}
+  {"deal": "<sha256>", "step": "done"}
+
+On restart, deals with a "done" line are skipped without any request, and
+half-done deals reuse the recorded company / round ids and redo only the
+steps that have no line yet. Lines are flushed and fsynced one at a time,
+so a crash loses at most the step that was in flight. A torn last line
+(killed mid-write) is ignored.
+
+Editing a deal changes its hash, so the edited deal is ingested again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.journal')
+
+
+def deal_key(deal):
+    """Stable content hash of a deal (key order does not matter)."""
+    canonical = json.dumps(deal, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def default_path(name):
+    """Journal file for a script or data file, under migration/.journal/."""
+    base = os.path.splitext(os.path.basename(name))[0]
+    return os.path.join(DEFAULT_DIR, f'{base}.jsonl')
+
+
+class DealState:
+    """What the journal knows about one deal."""
+
+    def __init__(self):
+        self.company_id = None
+        self.round_ids = {}     # round index → id
+        self.steps = set()      # 'sectors', 'founders', ('round_investors', n), 'done'
+
+    @property
+    def done(self):
+        return 'done' in self.steps
+
+
+class IngestJournal:
+    """Per-deal checkpoints read from / appended to one JSONL file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.deals = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            text = f.read()
+        if text and not text.endswith('\n'):
+            # Torn last line: terminate it so the next entry starts cleanly
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n')
+        for line in text.splitlines():
+            if line:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._apply(entry)
+
+    def _apply(self, entry):
+        state = self.deals.setdefault(entry['deal'], DealState())
+        step = entry['step']
+        if step == 'company':
+            state.company_id = entry['id']
+        elif step == 'round':
+            state.round_ids[entry['n']] = entry['id']
+        elif step == 'round_investors':
+            state.steps.add((step, entry['n']))
+        else:
+            state.steps.add(step)
+
+    def state(self, key):
+        return self.deals.get(key) or DealState()
+
+    def is_done(self, key):
+        return self.state(key).done
+
+    def record(self, key, step, **fields):
+        """Append one checkpoint line and make it durable before returning."""
+        entry = {'deal': key, 'step': step, **fields}
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._apply(entry)
+
+    def close(self):
+        self._file.close()
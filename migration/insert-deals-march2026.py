@@ -15,80 +15,15 @@ Usage:
   python3 migration/insert-deals-march2026.py
 """
 
-import json, os, sys, urllib.request, urllib.parse
+import sys
 
-SUPABASE_URL = os.environ.get('SUPABASE_URL', 'https://tlwqkglfyjydwsgjrclx.supabase.co')
-SERVICE_KEY  = os.environ.get('SUPABASE_SERVICE_KEY', '')
+from deal_ingest import DealIngestor
+from ingest_journal import IngestJournal, default_path
+from supabase_rest import SERVICE_KEY
 
 if not SERVICE_KEY:
     print('Error: SUPABASE_SERVICE_KEY required'); sys.exit(1)
 
-HEADERS = {
-    'apikey': SERVICE_KEY,
-    'Authorization': f'Bearer {SERVICE_KEY}',
-    'Content-Type': 'application/json',
-    'Prefer': 'return=representation',
-}
-
-def req(method, path, body=None, prefer=None):
-    url = f'{SUPABASE_URL}/rest/v1/{path}'
-    h = dict(HEADERS)
-    if prefer: h['Prefer'] = prefer
-    data = json.dumps(body).encode() if body is not None else None
-    r = urllib.request.Request(url, data=data, headers=h, method=method)
-    try:
-        with urllib.request.urlopen(r) as resp:
-            c = resp.read(); return json.loads(c) if c else None
-    except urllib.error.HTTPError as e:
-        raise RuntimeError(f'HTTP {e.code} {method} /{path}: {e.read().decode()}')
-
-def find_by_name(table, name_field, name):
-    enc = urllib.parse.quote(name, safe='')
-    rows = req('GET', f'{table}?select=id&{name_field}=eq.{enc}')
-    return rows[0]['id'] if rows else None
-
-def get_or_create_company(data):
-    existing_id = find_by_name('companies', 'name', data['name'])
-    if existing_id:
-        return existing_id
-    rows = req('POST', 'companies', body=data)
-    return rows[0]['id']
-
-def create_round(data):
-    rows = req('POST', 'funding_rounds', body=data)
-    return rows[0]['id']
-
-def link_sector(company_id, sector_id, is_primary=False):
-    req('POST', 'company_sectors',
-        body={'company_id': company_id, 'sector_id': sector_id, 'is_primary': is_primary},
-        prefer='resolution=ignore-duplicates,return=minimal')
-
-def get_or_create_investor(name):
-    existing_id = find_by_name('investors', 'name', name)
-    if existing_id:
-        return existing_id
-    rows = req('POST', 'investors', body={'name': name})
-    return rows[0]['id']
-
-def link_investor(round_id, investor_id, is_lead=False):
-    req('POST', 'funding_round_investors',
-        body={'funding_round_id': round_id, 'investor_id': investor_id, 'is_lead': is_lead},
-        prefer='resolution=ignore-duplicates,return=minimal')
-
-def get_or_create_person(full_name):
-    enc = urllib.parse.quote(full_name, safe='')
-    rows = req('GET', f'people?select=id&full_name=eq.{enc}')
-    if rows:
-        return rows[0]['id']
-    rows = req('POST', 'people', body={'full_name': full_name})
-    return rows[0]['id']
-
-def link_founder(company_id, person_id):
-    req('POST', 'company_people',
-        body={'company_id': company_id, 'person_id': person_id,
-              'role': 'founder', 'is_current': True},
-        prefer='resolution=ignore-duplicates,return=minimal')
-
 # ── Sector ID map ─────────────────────────────────────────────────────────────
 SECTORS = {
     'SpaceTech & Aerospace':    'c9460d00-f17f-49ba-8562-721d8ff30daf',
@@ -675,46 +610,31 @@ DEALS = [
 
 # ── Main ──────────────────────────────────────────────────────────────────────
 
+def report(result):
+    for warning in result.warnings:
+        print(f'  {result.name}: {warning}')
+    if result.skipped:
+        print(f'  - {result.name} (already done)')
+    elif result.ok:
+        inv_list = ', '.join(DEALS[result.index]['rounds'][0]['investors'])
+        print(f'  \u2713 {result.name}: {inv_list}')
+    else:
+        print(f'  ERROR {result.name}: {result.error}')
+
 def main():
     print('==============================================')
     print('Inserting Deals — March 2026')
     print('==============================================\n')
 
-    ok = err = 0
-
-    for deal in DEALS:
-        name = deal['company']['name']
-        try:
-            # 1. Get or create company
-            company_id = get_or_create_company(deal['company'])
-
-            # 2. Link sectors (skip if already linked)
-            for i, sector_name in enumerate(deal.get('sectors', [])):
-                sid = SECTORS.get(sector_name)
-                if sid:
-                    link_sector(company_id, sid, is_primary=(i == 0))
-
-            # 3. Create funding round(s)
-            for rnd in deal['rounds']:
-                round_body = {k: v for k, v in rnd.items() if k != 'investors'}
-                round_body['company_id'] = company_id
-                round_id = create_round(round_body)
-                for i, inv_name in enumerate(rnd['investors']):
-                    inv_id = get_or_create_investor(inv_name)
-                    link_investor(round_id, inv_id, is_lead=(i == 0))
-
-            # 4. Link founders
-            for founder in deal.get('founders', []):
-                pid = get_or_create_person(founder)
-                link_founder(company_id, pid)
-
-            inv_list = ', '.join(deal['rounds'][0]['investors'])
-            print(f'  \u2713 {name}: {inv_list}')
-            ok += 1
-
-        except Exception as e:
-            print(f'  ERROR {name}: {e}')
-            err += 1
+    # Deals run concurrently (INGEST_CONCURRENCY, default 8); lines print as each finishes
+    # Checkpointed in .journal/: a re-run resumes instead of duplicating
+    journal = IngestJournal(default_path(__file__))
+    try:
+        results = DealIngestor(sector_ids=SECTORS, journal=journal).run(DEALS, on_result=report)
+    finally:
+        journal.close()
+    ok = sum(r.ok for r in results)
+    err = len(results) - ok
 
     print(f'\n  Done \u2014 {ok} inserted, {err} errors\n')
     if err:
@@ -1,32 +1,26 @@
 #!/usr/bin/env python3
 """
 Insert 16 deals from week ending January 16, 2026 into Supabase.
-Uses curl via subprocess to avoid Node.js DNS resolution issues.
+Uses the shared pooled Python client (supabase_rest) to avoid Node.js DNS resolution issues.
+
+Progress is checkpointed in migration/.journal/insert-jan16-2026-curl.jsonl:
+re-running after a failure skips finished deals and completes the rest
+without duplicating companies or rounds.
 
 Usage:
     SUPABASE_SERVICE_KEY=your-key python3 insert-jan16-2026-curl.py
 """
 
-import json
-import os
-import subprocess
 import sys
-import time
 
-SUPABASE_URL = os.environ.get("SUPABASE_URL", "https://tlwqkglfyjydwsgjrclx.supabase.co")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY", "")
+from deal_ingest import DealIngestor, from_flat
+from ingest_journal import IngestJournal, default_path
+from supabase_rest import SERVICE_KEY as SUPABASE_KEY
 
 if not SUPABASE_KEY:
     print("Error: SUPABASE_SERVICE_KEY environment variable is required.")
     sys.exit(1)
 
-HEADERS = {
-    "apikey": SUPABASE_KEY,
-    "Authorization": f"Bearer {SUPABASE_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "return=representation"
-}
-
 # Known sector IDs from existing Supabase data
 # Note: Individual sector IDs will be created by update-sectors-db.js migration.
 SECTOR_IDS = {
@@ -235,173 +229,16 @@ DEALS = [
 ]
 
 
-def api_call(method, table, data=None, query_params="", retries=3):
-    """Make a Supabase REST API call via curl with retries."""
-    url = f"{SUPABASE_URL}/rest/v1/{table}{query_params}"
-    cmd = ["curl", "-s", "-w", "\n__HTTP_STATUS:%{http_code}__"]
-
-    if method == "POST":
-        cmd += ["-X", "POST"]
-        cmd += ["-H", "Prefer: return=representation,resolution=merge-duplicates"]
-    elif method == "GET":
-        pass
-    elif method == "DELETE":
-        cmd += ["-X", "DELETE"]
-
-    cmd += [
-        "-H", f"apikey: {SUPABASE_KEY}",
-        "-H", f"Authorization: Bearer {SUPABASE_KEY}",
-        "-H", "Content-Type: application/json",
-    ]
-
-    if data is not None:
-        cmd += ["-d", json.dumps(data)]
-
-    cmd.append(url)
-
-    for attempt in range(retries):
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        output = result.stdout.strip()
-
-        # Parse HTTP status
-        status = 0
-        body = output
-        if "__HTTP_STATUS:" in output:
-            parts = output.rsplit("__HTTP_STATUS:", 1)
-            body = parts[0].strip()
-            status = int(parts[1].replace("__", ""))
-
-        if status >= 200 and status < 300:
-            if body:
-                return json.loads(body), status
-            return None, status
-
-        if status == 503 or status == 0:
-            wait = 2 ** (attempt + 1)
-            print(f"    Retry {attempt+1}/{retries} after {wait}s (status={status})")
-            time.sleep(wait)
-            continue
-
-        # Non-retryable error
-        print(f"    API error {status}: {body}")
-        return None, status
-
-    print(f"    Failed after {retries} retries")
-    return None, 0
-
-
-def get_or_create_city(name):
-    """Look up existing city first, create only if not found."""
-    from urllib.parse import quote
-    data, status = api_call("GET", "cities",
-        query_params=f"?name=eq.{quote(name)}&country=eq.France&select=id&limit=1")
-    if data and isinstance(data, list) and len(data) > 0:
-        return data[0]["id"]
-    data, status = api_call("POST", "cities", {"name": name, "country": "France"})
-    if data and isinstance(data, list) and len(data) > 0:
-        return data[0]["id"]
-    return None
-
-
-def get_or_create_investor(name):
-    """Look up existing investor first, create only if not found."""
-    from urllib.parse import quote
-    data, status = api_call("GET", "investors",
-        query_params=f"?name=eq.{quote(name)}&select=id&limit=1")
-    if data and isinstance(data, list) and len(data) > 0:
-        return data[0]["id"]
-    data, status = api_call("POST", "investors", {"name": name})
-    if data and isinstance(data, list) and len(data) > 0:
-        return data[0]["id"]
-    return None
-
-
-def get_or_create_person(full_name):
-    """Look up existing person first, create only if not found."""
-    from urllib.parse import quote
-    data, status = api_call("GET", "people",
-        query_params=f"?full_name=eq.{quote(full_name)}&select=id&limit=1")
-    if data and isinstance(data, list) and len(data) > 0:
-        return data[0]["id"]
-    data, status = api_call("POST", "people", {"full_name": full_name})
-    if data and isinstance(data, list) and len(data) > 0:
-        return data[0]["id"]
-    return None
-
-
-def insert_deal(deal, index):
-    total = len(DEALS)
-    tag = f"[{index+1}/{total}]"
-    print(f"{tag} Processing: {deal['company']}")
-
-    # 1. City
-    city_id = get_or_create_city(deal["hq"])
-    if not city_id:
-        print(f"  Failed to upsert city {deal['hq']}")
-
-    # 2. Company
-    company_payload = {
-        "name": deal["company"],
-        "description": deal["description"],
-        "website": deal["website"],
-        "hq_city_id": city_id,
-        "hq_city_name": deal["hq"],
-    }
-    data, status = api_call("POST", "companies", company_payload)
-    if not data or not isinstance(data, list) or len(data) == 0:
-        print(f"  FAILED to insert company")
-        return False
-    company_id = data[0]["id"]
-
-    # 3. Funding round
-    round_payload = {
-        "company_id": company_id,
-        "round_type": deal["round"],
-        "amount_eur": deal["amount"],
-        "announced_month": "January",
-        "announced_year": 2026,
-        "source": "ftj",
-    }
-    data, status = api_call("POST", "funding_rounds", round_payload)
-    if not data or not isinstance(data, list) or len(data) == 0:
-        print(f"  FAILED to insert funding round")
-        return False
-    funding_round_id = data[0]["id"]
-
-    # 4. Link sectors
-    for i, sector_name in enumerate(deal["sectors"]):
-        sector_id = SECTOR_IDS.get(sector_name)
-        if not sector_id:
-            print(f"  Unknown sector: {sector_name}")
-            continue
-        api_call("POST", "company_sectors", {
-            "company_id": company_id,
-            "sector_id": sector_id,
-            "is_primary": i == 0,
-        })
-
-    # 5. Founders
-    for founder_name in deal["founders"]:
-        person_id = get_or_create_person(founder_name)
-        if person_id:
-            api_call("POST", "company_people", {
-                "company_id": company_id,
-                "person_id": person_id,
-                "role": "founder",
-            })
-
-    # 6. Investors
-    for i, inv_name in enumerate(deal["investors"]):
-        investor_id = get_or_create_investor(inv_name)
-        if investor_id:
-            api_call("POST", "funding_round_investors", {
-                "funding_round_id": funding_round_id,
-                "investor_id": investor_id,
-                "is_lead": i == 0,
-            })
-
-    print(f"  OK: {deal['company']}")
-    return True
+def report(result):
+    tag = f"[{result.index+1}/{len(DEALS)}]"
+    for warning in result.warnings:
+        print(f"  {warning}")
+    if result.skipped:
+        print(f"{tag} SKIP (already done): {result.name}")
+    elif result.ok:
+        print(f"{tag} OK: {result.name}")
+    else:
+        print(f"{tag} FAILED {result.name}: {result.error}")
 
 
 def main():
@@ -410,19 +247,16 @@ def main():
     print("=" * 50)
     print()
 
-    success = 0
-    failed = 0
-
-    for i, deal in enumerate(DEALS):
-        try:
-            ok = insert_deal(deal, i)
-            if ok:
-                success += 1
-            else:
-                failed += 1
-        except Exception as e:
-            print(f"  Unexpected error: {e}")
-            failed += 1
+    # Deals run concurrently (INGEST_CONCURRENCY, default 8); lines print as each finishes
+    deals = [from_flat(d, announced_month="January", announced_year=2026) for d in DEALS]
+    journal = IngestJournal(default_path(__file__))
+    try:
+        results = DealIngestor(sector_ids=SECTOR_IDS, link_city=True,
+                               journal=journal).run(deals, on_result=report)
+    finally:
+        journal.close()
+    success = sum(r.ok for r in results)
+    failed = len(results) - success
 
     print()
     print("=" * 50)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Normalized name key, identical to the name_key() SQL function.
+
+companies, investors and people carry a generated `name_key` column
+(supabase/migrations/20261017000200_name_key.sql) with a btree index, so
+a lookup by key is an indexed equality probe that also matches case,
+accent and punctuation variants:
+
+  "ROB’OCC"          → "rob occ"
+  "Rob'Occ"          → "rob occ"
+  "Crédit Agricole"  → "credit agricole"
+  "Bpifrance\\u200b"  → "bpifrance"
+
+The steps, in this order on both sides:
+  1. ligatures Œ/œ → oe, Æ/æ → ae, ß → ss
+  2. accented Latin letters → their base letter (ACCENTS_FROM → ACCENTS_TO)
+  3. every run of characters other than A-Z, a-z, 0-9 → one space
+  4. lowercase, trim
+
+Steps 3-4 leave only ASCII before lowercasing, so the result does not
+depend on the database locale. ACCENTS_FROM / ACCENTS_TO are copied
+verbatim into the SQL function; change both together, and recompute the
+column (drop and re-add it) after changing the function.
+"""
+
+import re
+
+LIGATURES = (('Œ', 'oe'), ('œ', 'oe'), ('Æ', 'ae'), ('æ', 'ae'), ('ß', 'ss'))
+
+ACCENTS_FROM = ('ÀÁÂÃÄÅÇÈÉÊËÌÍÎÏÑÒÓÔÕÖÙÚÛÜÝàáâãäåçèéêëìíîïñòóôõöùúûüýÿ'
+                'ĀāĂăĄąĆćĈĉĊċČčĎďĒēĔĕĖėĘęĚěĜĝĞğĠġĢģĤĥĨĩĪīĬĭĮįİĴĵĶķĹĺĻļĽľ'
+                'ŃńŅņŇňŌōŎŏŐőŔŕŖŗŘřŚśŜŝŞşŠšŢţŤťŨũŪūŬŭŮůŰűŲųŴŵŶŷŸŹźŻżŽž'
+                'ȘșȚțØøĐđĦħŁłıŦŧ')
+ACCENTS_TO = ('aaaaaaceeeeiiiinooooouuuuyaaaaaaceeeeiiiinooooouuuuyy'
+              'aaaaaaccccccccddeeeeeeeeeegggggggghhiiiiiiiiijjkkllllll'
+              'nnnnnnoooooorrrrrrssssssssttttuuuuuuuuuuuuwwyyyzzzzzz'
+              'ssttooddhhllitt')
+
+_ACCENTS = str.maketrans(ACCENTS_FROM, ACCENTS_TO)
+_NON_ALNUM = re.compile(r'[^A-Za-z0-9]+')
+
+
+def name_key(name):
+    """Casefolded, accent-stripped, punctuation-collapsed key for a name."""
+    if name is None:
+        return None
+    for lig, repl in LIGATURES:
+        name = name.replace(lig, repl)
+    return _NON_ALNUM.sub(' ', name.translate(_ACCENTS)).lower().strip()
@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
-"""Patch news/notes onto 16 Jan 16, 2026 funding rounds in Supabase."""
+"""
+Patch news/notes onto 16 Jan 16, 2026 funding rounds in Supabase.
 
-import subprocess, json, time, sys, os
+Current notes are read in one request and only rounds whose notes differ are
+written, as one bulk upsert (see round_patch.py); pass --dry-run to print
+the report without applying it.
+"""
+
+import sys
+
+from round_patch import patch_rounds
+from supabase_rest import SERVICE_KEY as SKEY, SupabaseError, get_client
 
-SKEY = os.environ.get("SUPABASE_SERVICE_KEY", "")
 if not SKEY:
     print("Error: SUPABASE_SERVICE_KEY required")
     sys.exit(1)
 
-BASE = "https://tlwqkglfyjydwsgjrclx.supabase.co/rest/v1"
-
 # Funding round ID -> news text
 NEWS = {
     "47c2b138-fe1b-47cd-94a0-c4b694226c76": "Harmattan AI raised a $200M Series B led by Dassault Aviation as part of a strategic partnership to integrate controlled, sovereign AI into next-generation combat aviation systems. The funding will support global scaling, expansion into new operational domains, and industrial-scale manufacturing of AI-enabled ISR, electronic warfare, and autonomous defense platforms, with applications across Rafale F5 and future UCAS programs. | Les Echos, Reuters",
@@ -31,57 +37,43 @@ NEWS = {
 }
 
 
-def api_patch(round_id, notes, retries=4):
-    for attempt in range(retries):
-        r = subprocess.run(
-            ["curl", "-s", "-w", "\n__HTTP:%{http_code}__",
-             "-X", "PATCH",
-             f"{BASE}/funding_rounds?id=eq.{round_id}",
-             "-H", f"apikey: {SKEY}",
-             "-H", f"Authorization: Bearer {SKEY}",
-             "-H", "Content-Type: application/json",
-             "-H", "Prefer: return=minimal",
-             "-d", json.dumps({"notes": notes})],
-            capture_output=True, text=True, timeout=15
-        )
-        out = r.stdout.strip()
-        status = 0
-        if "__HTTP:" in out:
-            parts = out.rsplit("__HTTP:", 1)
-            status = int(parts[1].replace("__", ""))
-        if 200 <= status < 300:
-            return True
-        time.sleep(2 ** (attempt + 1))
-    return False
+# Funding round ID -> company name, for display
+ROUND_COMPANIES = {
+    "47c2b138-fe1b-47cd-94a0-c4b694226c76": "Harmattan AI",
+    "65c6128f-14fb-452b-bb13-005ea3dca95f": "FineHeart",
+    "291cf707-48ae-49f6-8491-a23872ec8423": "SunLib",
+    "31e8b128-5667-4784-b622-01cf04052401": "Enodia Therapeutics",
+    "32a53a46-3efb-46f2-9b5d-4edc91e9a9da": "MYCOPHYTO",
+    "67e963b6-3c2e-44cf-8a05-1642e38eed4d": "Equitable Earth",
+    "ba1cbe26-ba27-405e-9e71-d702be935ecc": "Kepplair Evolution",
+    "cd026777-c2f4-4bf1-8855-65b6b2451232": "Cementic",
+    "70b14ced-4223-4531-8536-93b1ca31af0e": "Revox",
+    "c41c757a-fc39-4737-84ee-ccd4bfc6f970": "Sweetech",
+    "69863b18-a582-499f-8a9d-5460264099a2": "Viti-Tunnel",
+    "805ae9ca-db14-4f6a-aaa0-408f97b6ca33": "Campsider",
+    "58aa7691-d8dc-4cc0-a817-273586e111a0": "Gamevestor",
+    "1aad26dd-1dfb-4920-8241-bfd36213ec42": "Smartphone iD",
+    "08bda53b-71dd-4f54-a053-f376821df21c": "BW Ideol",
+    "d3ab8bcb-327a-453a-bab6-6e35ad1060be": "Abbelight",
+}
 
 
+client = get_client()
 print("Patching news/notes onto 16 funding rounds...")
-success = 0
-for round_id, notes in NEWS.items():
-    ok = api_patch(round_id, notes)
-    status = "OK" if ok else "FAIL"
-    # Find company name for display
-    company = next((k for k, v in {
-        "Harmattan AI": "47c2b138-fe1b-47cd-94a0-c4b694226c76",
-        "FineHeart": "65c6128f-14fb-452b-bb13-005ea3dca95f",
-        "SunLib": "291cf707-48ae-49f6-8491-a23872ec8423",
-        "Enodia Therapeutics": "31e8b128-5667-4784-b622-01cf04052401",
-        "MYCOPHYTO": "32a53a46-3efb-46f2-9b5d-4edc91e9a9da",
-        "Equitable Earth": "67e963b6-3c2e-44cf-8a05-1642e38eed4d",
-        "Kepplair Evolution": "ba1cbe26-ba27-405e-9e71-d702be935ecc",
-        "Cementic": "cd026777-c2f4-4bf1-8855-65b6b2451232",
-        "Revox": "70b14ced-4223-4531-8536-93b1ca31af0e",
-        "Sweetech": "c41c757a-fc39-4737-84ee-ccd4bfc6f970",
-        "Viti-Tunnel": "69863b18-a582-499f-8a9d-5460264099a2",
-        "Campsider": "805ae9ca-db14-4f6a-aaa0-408f97b6ca33",
-        "Gamevestor": "58aa7691-d8dc-4cc0-a817-273586e111a0",
-        "Smartphone iD": "1aad26dd-1dfb-4920-8241-bfd36213ec42",
-        "BW Ideol": "08bda53b-71dd-4f54-a053-f376821df21c",
-        "Abbelight": "d3ab8bcb-327a-453a-bab6-6e35ad1060be",
-    }.items() if v == round_id), round_id)
-    print(f"  {status}: {company}")
-    if ok:
-        success += 1
+try:
+    results = patch_rounds(client, {rid: {"notes": notes} for rid, notes in NEWS.items()},
+                           dry_run="--dry-run" in sys.argv)
+except SupabaseError as e:
+    print(f"  ERROR reading current notes: {e}")
+    sys.exit(1)
+
+for r in results:
+    company = ROUND_COMPANIES.get(r.round_id, r.round_id)
+    print(f"  {r.status}: {company}{f' ({r.error})' if r.error else ''}")
+if "--dry-run" in sys.argv:
+    sys.exit(0)
 
-print(f"\nDone: {success}/16 patched")
-sys.exit(0 if success == 16 else 1)
+done = sum(1 for r in results if r.status in ("PATCH", "SAME"))
+patched = sum(1 for r in results if r.status == "PATCH")
+print(f"\nDone: {done}/16 up to date ({patched} patched)")
+sys.exit(0 if done == 16 else 1)
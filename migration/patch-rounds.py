@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Patch funding round columns in bulk from a JSON file.
+
+The file maps round id → the columns to set:
+
+  {
+    "47c2b138-fe1b-47cd-94a0-c4b694226c76": {"notes": "...", "news_url": "https://..."},
+    "65c6128f-14fb-452b-bb13-005ea3dca95f": {"amount_eur": 35000000}
+  }
+
+Only columns that differ from the database are sent, as chunked upserts
+on id (see round_patch.py), and every round is reported as PATCH, SAME,
+MISSING, INVALID or ERROR. Re-running a file that already went through
+makes no writes. Pass --dry-run to see the report without writing.
+
+Usage:
+  export SUPABASE_SERVICE_KEY="..."
+  python3 migration/patch-rounds.py news-2026-03.json
+  python3 migration/patch-rounds.py --dry-run --chunk-size 100 news-2026-03.json
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+
+from entity_resolver import select_in
+from round_patch import DEFAULT_CHUNK_SIZE, patch_rounds
+from supabase_rest import SERVICE_KEY, SupabaseError, get_client
+
+if not SERVICE_KEY:
+    print('Error: SUPABASE_SERVICE_KEY required'); sys.exit(1)
+
+
+def load_patches(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(isinstance(v, dict) for v in data.values()):
+        raise ValueError(f'{path}: expected {{round_id: {{column: value}}}}')
+    return data
+
+
+def company_names(client, results):
+    """Round id → company name for the report (one extra chunked read)."""
+    names = {c['id']: c['name'] for c in select_in(
+        client, 'companies', 'id,name', 'id', {r.company_id for r in results if r.company_id})}
+    return {r.round_id: names.get(r.company_id, '') for r in results}
+
+
+def main():
+    p = argparse.ArgumentParser(description='Patch funding round columns in bulk.')
+    p.add_argument('file', help='JSON {round_id: {column: value}}')
+    p.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                   help=f'rows per upsert request (default {DEFAULT_CHUNK_SIZE})')
+    p.add_argument('--dry-run', action='store_true', help='report the changes, write nothing')
+    args = p.parse_args()
+
+    try:
+        patches = load_patches(args.file)
+    except (OSError, ValueError) as e:
+        print(f'Error: {e}'); sys.exit(1)
+
+    client = get_client()
+    print(f'Patching {len(patches)} funding rounds from {args.file}'
+          f'{" (dry run)" if args.dry_run else ""}...')
+    try:
+        results = patch_rounds(client, patches, chunk_size=args.chunk_size, dry_run=args.dry_run)
+        names = company_names(client, results)
+    except SupabaseError as e:
+        print(f'  ERROR reading current rounds: {e}'); sys.exit(1)
+
+    for r in results:
+        label = f'{r.round_id} {names.get(r.round_id, "")}'.rstrip()
+        detail = f': {", ".join(r.columns)}' if r.columns and r.status == 'PATCH' else ''
+        if r.error:
+            detail = f': {r.error}'
+        print(f'  {r.status:<7} {label}{detail}')
+
+    counts = Counter(r.status for r in results)
+    print(f'\nDone — {counts["PATCH"]} patched, {counts["SAME"]} unchanged, '
+          f'{counts["MISSING"]} missing, {counts["INVALID"] + counts["ERROR"]} errors')
+    sys.exit(1 if counts['MISSING'] or counts['INVALID'] or counts['ERROR'] else 0)
+
+
+if __name__ == '__main__':
+    main()
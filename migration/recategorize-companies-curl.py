@@ -1,21 +1,30 @@
 #!/usr/bin/env python3
 """
 Recategorize companies in Supabase database.
-Uses curl via subprocess to avoid Node.js DNS resolution issues.
+Uses the shared pooled Python client (supabase_rest) to avoid Node.js DNS resolution issues.
+
+Every company is resolved with a few chunked name_key=in.(...) reads, the
+current sector links are loaded in bulk and only the difference is written
+(one DELETE, one upsert and one insert at most), so a few hundred companies
+take a handful of requests. Pass --dry-run to print the change plan without
+applying it.
+
+After a taxonomy change, pass the new assignments as a JSON file instead of
+editing RECATEGORIZATIONS: either {"Company": ["Sector", ...], ...} or
+[["Company", ["Sector", ...]], ...].
 
 Usage:
-    SUPABASE_SERVICE_KEY=your-key python3 recategorize-companies-curl.py
+    SUPABASE_SERVICE_KEY=your-key python3 recategorize-companies-curl.py [--dry-run] [--file recats.json]
 """
 
+import argparse
 import json
-import os
-import subprocess
 import sys
-import time
-from urllib.parse import quote
 
-SUPABASE_URL = os.environ.get("SUPABASE_URL", "https://tlwqkglfyjydwsgjrclx.supabase.co")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY", "")
+from change_plan import ChangePlan, load_links
+from entity_resolver import select_in
+from name_key import name_key
+from supabase_rest import SERVICE_KEY as SUPABASE_KEY, SupabaseError, get_client
 
 if not SUPABASE_KEY:
     print("Error: SUPABASE_SERVICE_KEY environment variable is required.")
@@ -190,60 +199,50 @@ RECATEGORIZATIONS = [
 
 
 def api_call(method, table, data=None, query_params="", retries=3):
-    """Make a Supabase REST API call via curl with retries."""
-    url = f"{SUPABASE_URL}/rest/v1/{table}{query_params}"
-    cmd = ["curl", "-s", "-w", "\n__HTTP_STATUS:%{http_code}__"]
-
-    if method == "POST":
-        cmd += ["-X", "POST"]
-        cmd += ["-H", "Prefer: return=representation,resolution=merge-duplicates"]
-    elif method == "GET":
-        pass
-    elif method == "DELETE":
-        cmd += ["-X", "DELETE"]
-        cmd += ["-H", "Prefer: return=representation"]
-
-    cmd += [
-        "-H", f"apikey: {SUPABASE_KEY}",
-        "-H", f"Authorization: Bearer {SUPABASE_KEY}",
-        "-H", "Content-Type: application/json",
-    ]
-
-    if data is not None:
-        cmd += ["-d", json.dumps(data)]
-
-    cmd.append(url)
-
-    for attempt in range(retries):
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        output = result.stdout.strip()
-
-        status = 0
-        body = output
-        if "__HTTP_STATUS:" in output:
-            parts = output.rsplit("__HTTP_STATUS:", 1)
-            body = parts[0].strip()
-            status = int(parts[1].replace("__", ""))
-
-        if 200 <= status < 300:
-            if body:
-                return json.loads(body), status
-            return None, status
-
-        if status == 503 or status == 0:
-            wait = 2 ** (attempt + 1)
-            print(f"    Retry {attempt+1}/{retries} after {wait}s (status={status})")
-            time.sleep(wait)
-            continue
-
-        print(f"    API error {status}: {body}")
+    """Make a Supabase REST API call over the shared pooled client, with retries."""
+    prefer = {
+        "POST": "return=representation,resolution=merge-duplicates",
+        "DELETE": "return=representation",
+    }.get(method)
+    status, body = get_client().send(method, f"{table}{query_params}", data,
+                                     prefer=prefer, retries=retries)
+
+    if 200 <= status < 300:
+        if body:
+            return json.loads(body), status
         return None, status
 
-    print(f"    Failed after {retries} retries")
-    return None, 0
+    if status == 503 or status == 0:
+        print(f"    Failed after {retries} retries")
+        return None, 0
+
+    # Non-retryable error
+    print(f"    API error {status}: {body}")
+    return None, status
+
+
+def load_recategorizations(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return list(data.items()) if isinstance(data, dict) else [tuple(e) for e in data]
+
+
+def find_companies(client, names):
+    """Return {name_key: [company, ...]} for all names, in a few chunked reads."""
+    found = {}
+    for row in select_in(client, "companies", "id,name,name_key", "name_key",
+                         {name_key(n) for n in names}):
+        found.setdefault(row["name_key"], []).append({"id": row["id"], "name": row["name"]})
+    return found
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Recategorize companies.")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan, write nothing")
+    parser.add_argument("--file", help="JSON assignments to use instead of RECATEGORIZATIONS")
+    args = parser.parse_args()
+    recategorizations = load_recategorizations(args.file) if args.file else RECATEGORIZATIONS
+
     print("=" * 55)
     print("Recategorizing Companies in Supabase Database")
     print("=" * 55)
@@ -261,7 +260,7 @@ def main():
 
     # Verify all needed sectors exist
     needed = set()
-    for _, sectors in RECATEGORIZATIONS:
+    for _, sectors in recategorizations:
         needed.update(sectors)
 
     missing = needed - set(sector_map.keys())
@@ -270,71 +269,77 @@ def main():
         print("  These will need to be created first.")
         sys.exit(1)
 
-    # Step 2: Process each company
-    print("\nStep 2: Recategorizing companies...")
+    # Step 2: Look up every company at once by normalized name (case, accents, punctuation)
+    print("\nStep 2: Looking up companies...")
     success = 0
     not_found = 0
     errors = 0
+    matches = {}
+    client = get_client()
+
+    # Entries naming the same company (by key) take the last one, as when run in order
+    entries = {name_key(name): (name, sectors) for name, sectors in recategorizations}
+    recategorizations = list(entries.values())
+    try:
+        found = find_companies(client, [name for name, _ in recategorizations])
+    except SupabaseError as e:
+        print(f"  ERROR looking up companies: {e}")
+        sys.exit(1)
 
-    for company_name, new_sectors in RECATEGORIZATIONS:
-        # Look up company by name (case-insensitive)
-        data, status = api_call(
-            "GET", "companies",
-            query_params=f"?name=ilike.{quote(company_name)}&select=id,name"
-        )
+    for company_name, _ in recategorizations:
+        data = found.get(name_key(company_name))
 
-        if not data or len(data) == 0:
+        if not data:
             print(f"  NOT FOUND: \"{company_name}\"")
             not_found += 1
             continue
 
         if len(data) > 1:
             print(f"  NOTE: {len(data)} matches for \"{company_name}\" - updating all")
+        matches[company_name] = data
+
+    # Step 3: Plan sector changes against the current links
+    print("\nStep 3: Planning sector changes...")
+    company_ids = [comp["id"] for data in matches.values() for comp in data]
+    try:
+        current = load_links(client, "company_sectors", "company_id", "sector_id", company_ids,
+                             columns=("is_primary",))
+    except SupabaseError as e:
+        print(f"  ERROR loading current sectors: {e}")
+        sys.exit(1)
+
+    sector_names = {v: k for k, v in sector_map.items()}
+    plan = ChangePlan()
+    for company_name, new_sectors in recategorizations:
+        data = matches.get(company_name)
+        if not data:
+            continue
 
         # Update ALL matching companies (handles duplicates)
-        all_ok = True
+        desired = {}
+        for i, sector_name in enumerate(new_sectors):
+            desired.setdefault(sector_map[sector_name], {"is_primary": i == 0})
+        before = plan.size()
         for comp in data:
-            company_id = comp["id"]
-
-            # Delete existing sector associations
-            _, del_status = api_call(
-                "DELETE", "company_sectors",
-                query_params=f"?company_id=eq.{company_id}"
-            )
-
-            if del_status < 200 or del_status >= 300:
-                print(f"  ERROR deleting sectors for \"{comp['name']}\" ({company_id})")
-                all_ok = False
-                continue
-
-            # Insert new sector associations
-            records = []
-            for i, sector_name in enumerate(new_sectors):
-                sector_id = sector_map.get(sector_name)
-                if not sector_id:
-                    print(f"  ERROR: sector \"{sector_name}\" not found")
-                    continue
-                records.append({
-                    "company_id": company_id,
-                    "sector_id": sector_id,
-                    "is_primary": i == 0,
-                })
-
-            if records:
-                _, ins_status = api_call("POST", "company_sectors", records)
-                if ins_status < 200 or ins_status >= 300:
-                    print(f"  ERROR inserting sectors for \"{comp['name']}\" ({company_id})")
-                    all_ok = False
-
-        if not all_ok:
-            errors += 1
-            continue
+            plan.diff_links("company_sectors", "company_id", "sector_id", comp["id"],
+                            current[comp["id"]], desired, label=comp["name"],
+                            child_labels=sector_names)
 
         suffix = f" (x{len(data)})" if len(data) > 1 else ""
         sector_str = ", ".join(new_sectors)
-        print(f"  OK: {data[0]['name']}{suffix} -> {sector_str}")
+        unchanged = "" if plan.size() > before else " (unchanged)"
+        print(f"  OK: {data[0]['name']}{suffix} -> {sector_str}{unchanged}")
         success += 1
 
+    plan.print()
+    if not args.dry_run and not plan.is_empty():
+        try:
+            plan.apply(client)
+            print("  Plan applied.")
+        except SupabaseError as e:
+            print(f"  ERROR applying plan: {e}")
+            errors += 1
+
     print()
     print("=" * 55)
     print("RECATEGORIZATION COMPLETE")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Refresh funding_complete, the materialized table behind v_funding_complete.
+
+Only the companies touched since the last run are recomputed: the rows
+written or deleted after the watermark kept in refresh_state are read
+(updated_at / deleted_rows, as build-snapshot.py does), mapped to their
+companies, and refresh_funding_complete() rebuilds those companies' rows
+in chunks. The first run, --full, or a watermark older than the deletion
+log (TOMBSTONE_RETENTION_DAYS) rebuilds the whole table in one call.
+
+Needs the 20261017000300_snapshot_changes.sql and
+20261017000400_funding_complete.sql migrations. Run it after every ingest
+or update batch, next to build-snapshot.py.
+
+Usage:
+  export SUPABASE_SERVICE_KEY="..."
+  python3 migration/refresh-funding-complete.py
+  python3 migration/refresh-funding-complete.py --full
+  python3 migration/refresh-funding-complete.py --dry-run    # list the companies, refresh nothing
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+
+from snapshot import affected_companies, load_changes, watermark_expired, watermark_of
+from supabase_rest import SERVICE_KEY, SupabaseError, get_client
+
+if not SERVICE_KEY:
+    print('Error: SUPABASE_SERVICE_KEY required'); sys.exit(1)
+
+STATE_ID = 'funding_complete'
+DEFAULT_CHUNK_SIZE = 500
+
+
+def read_watermark(client):
+    rows = client.request('GET', f'refresh_state?select=watermark&id=eq.{STATE_ID}')
+    return rows[0]['watermark'] if rows else None
+
+
+def save_watermark(client, watermark):
+    client.insert('refresh_state', [{'id': STATE_ID, 'watermark': watermark,
+                                     'refreshed_at': datetime.now(timezone.utc).isoformat()}],
+                  on_conflict='id', resolution='merge-duplicates', returning='minimal')
+
+
+def refresh(client, company_ids=None):
+    """One refresh_funding_complete() call → {'rows': n, 'as_of': ...}."""
+    body = {} if company_ids is None else {'company_ids': company_ids}
+    return client.request('POST', 'rpc/refresh_funding_complete', body)
+
+
+def main():
+    p = argparse.ArgumentParser(description='Refresh the funding_complete table from the latest changes.')
+    p.add_argument('--full', action='store_true', help='rebuild every row instead of the changed companies')
+    p.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                   help=f'companies per refresh call (default {DEFAULT_CHUNK_SIZE})')
+    p.add_argument('--dry-run', action='store_true', help='list the companies to refresh, write nothing')
+    args = p.parse_args()
+
+    start = time.monotonic()
+    client = get_client()
+    try:
+        watermark = None if args.full else read_watermark(client)
+        if watermark and watermark_expired(watermark):
+            print(f'Watermark {watermark} is older than the deletion log')
+            watermark = None
+
+        if watermark is None:
+            print(f'Full refresh ({"--full" if args.full else "no usable watermark"})')
+            if args.dry_run:
+                return
+            result = refresh(client)
+            rows, new_watermark = result['rows'], result['as_of']
+        else:
+            print(f'Reading changes since {watermark}...')
+            changed, tombstones = load_changes(client, watermark)
+            for table, changes in changed.items():
+                if changes:
+                    print(f'  {table:<24} {len(changes)} changed')
+            print(f'  {"deleted_rows":<24} {len(tombstones)}')
+            companies, _ = affected_companies(client, [], changed, tombstones)
+            companies = sorted(companies)
+            print(f'  {len(companies)} companies touched')
+            if args.dry_run:
+                for company_id in companies:
+                    print(f'    {company_id}')
+                return
+
+            rows, as_of = 0, None
+            for i in range(0, len(companies), args.chunk_size):
+                result = refresh(client, companies[i:i + args.chunk_size])
+                rows, as_of = rows + result['rows'], result['as_of']
+            new_watermark = watermark_of(changed, tombstones, previous=as_of or watermark)
+
+        save_watermark(client, new_watermark)
+    except SupabaseError as e:
+        print(f'  ERROR: {e}'); sys.exit(1)
+
+    print(f'\nRefreshed {rows} funding_complete rows in {time.monotonic() - start:.1f}s, '
+          f'{client.metrics.requests} requests (watermark {new_watermark})')
+
+
+if __name__ == '__main__':
+    main()
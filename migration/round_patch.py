@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Bulk patches of funding_rounds columns by round id.
+
+A patch set maps round id → {column: value}. The current rows are read in
+a few chunked `id=in.(...)` requests, each patch is reduced to the columns
+that actually differ, and the changed rows are written as upserts on `id`
+(`resolution=merge-duplicates`), chunk_size rows per POST instead of one
+PATCH per round.
+
+PostgREST needs every object of an array to have the same keys, so rows are
+grouped by their set of changed columns: 200 rounds getting new notes and
+30 getting notes + news_url are two requests. Each row also carries its
+current company_id — the column is NOT NULL, and the upsert's insert arm
+is checked even when the row already exists.
+
+  results = patch_rounds(client, {'47c2b138-...': {'notes': '...'}})
+  for r in results:
+      print(r.status, r.round_id, r.columns)
+
+Every round gets a RoundPatch result: PATCH (written), SAME (nothing to
+change), MISSING (no such round), INVALID (unknown column) or ERROR (its
+chunk was rejected; `error` holds the reason).
+"""
+
+from dataclasses import dataclass, field
+
+from entity_resolver import select_in
+from supabase_rest import SupabaseError
+
+# Columns of funding_rounds (001_schema.sql) a patch may set
+PATCHABLE = {
+    'company_id', 'round_type', 'amount_eur', 'announced_date', 'announced_month',
+    'announced_year', 'valuation_eur', 'news_url', 'press_release_url', 'notes',
+    'is_verified', 'source',
+}
+
+DEFAULT_CHUNK_SIZE = 200
+
+
+@dataclass
+class RoundPatch:
+    round_id: str
+    status: str
+    columns: list = field(default_factory=list)
+    error: str = None
+    company_id: str = None
+
+
+def diff_patches(current, patches):
+    """
+    Split patches into RoundPatch results and {changed columns: [row]}.
+
+    `current` maps round id → its current row (with company_id and every
+    patched column). Rows hold id, company_id and the changed columns.
+    """
+    results, groups = {}, {}
+    for round_id, desired in patches.items():
+        unknown = sorted(set(desired) - PATCHABLE)
+        if unknown:
+            results[round_id] = RoundPatch(round_id, 'INVALID', unknown,
+                                           error=f'unknown column(s): {", ".join(unknown)}')
+            continue
+        row = current.get(round_id)
+        if row is None:
+            results[round_id] = RoundPatch(round_id, 'MISSING')
+            continue
+        changes = {k: v for k, v in desired.items() if row.get(k) != v}
+        if not changes:
+            results[round_id] = RoundPatch(round_id, 'SAME', company_id=row['company_id'])
+            continue
+        cols = tuple(sorted(changes))
+        results[round_id] = RoundPatch(round_id, 'PATCH', list(cols), company_id=row['company_id'])
+        groups.setdefault(cols, []).append(
+            {'id': round_id, 'company_id': row['company_id'], **changes})
+    return results, groups
+
+
+def patch_rounds(client, patches, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Apply {round_id: {column: value}} and return a RoundPatch per round, in
+    input order. A rejected chunk marks its rows ERROR and the rest go on.
+    """
+    columns = sorted({c for desired in patches.values() for c in desired} & PATCHABLE)
+    select = ','.join(['id', 'company_id', *(c for c in columns if c != 'company_id')])
+    current = {r['id']: r for r in select_in(client, 'funding_rounds', select, 'id', patches)}
+
+    results, groups = diff_patches(current, patches)
+    if not dry_run:
+        for rows in groups.values():
+            for i in range(0, len(rows), chunk_size):
+                chunk = rows[i:i + chunk_size]
+                try:
+                    client.insert('funding_rounds', chunk, on_conflict='id',
+                                  resolution='merge-duplicates', returning='minimal')
+                except SupabaseError as e:
+                    for row in chunk:
+                        results[row['id']].status = 'ERROR'
+                        results[row['id']].error = str(e)
+    return [results[round_id] for round_id in patches]
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Per-request instrumentation and end-of-run performance report.
+
+The shared client (supabase_rest.py) records every HTTP attempt it makes
+into its RunMetrics: table (or rpc/<function>), method, status, bytes sent
+and received (on the wire, i.e. gzip-compressed) and latency. The deal
+engine reports each finished deal, which drives a live progress line
+
+  … 120/300 deals, 4.2 deals/s, 3.1 requests/deal, ETA 43s
+
+and the round-trips-per-deal figure of the report. At exit the summary is
+written as JSON, or as OpenMetrics text when the path ends in .prom/.txt:
+
+  run:    wall time, requests, retries, errors, bytes, deals, requests/deal
+  tables: per table and method, count, statuses, bytes, p50/p95/p99 latency
+
+Set SUPABASE_METRICS=path (any script using get_client()), or pass
+--metrics PATH to ingest-deals.py. That tells a slow run apart: high
+latency percentiles point at the network or PostgREST, many requests per
+deal at the call pattern.
+
+  metrics = get_client().metrics
+  metrics.write('ingest-metrics.json')
+"""
+
+import json
+import math
+import sys
+import threading
+import time
+
+PROGRESS_INTERVAL = 5.0     # seconds between live progress lines
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list (0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(p / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def table_of(path):
+    """'funding_rounds?select=id' → 'funding_rounds', 'rpc/ingest_deals' stays as is."""
+    return path.split('?', 1)[0]
+
+
+class RunMetrics:
+    """Thread-safe request log plus deal progress for one run."""
+
+    def __init__(self, progress=True, interval=PROGRESS_INTERVAL):
+        self.started = time.monotonic()
+        self.progress = progress
+        self.interval = interval
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.deals = 0
+        self.deals_skipped = 0
+        self.deals_expected = 0
+        self._calls = {}            # (table, method) → {'latencies', 'statuses', 'sent', 'received'}
+        self._last_progress = self.started
+        self._lock = threading.Lock()
+
+    # ── Recording ────────────────────────────────────────────────────────────
+
+    def record(self, method, path, status, sent, received, latency, attempt=0):
+        """Record one HTTP attempt (attempt > 0 is a retry)."""
+        with self._lock:
+            entry = self._calls.setdefault((table_of(path), method), {
+                'latencies': [], 'statuses': {}, 'sent': 0, 'received': 0})
+            entry['latencies'].append(latency)
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+            entry['sent'] += sent
+            entry['received'] += received
+            self.requests += 1
+            self.retries += attempt > 0
+            self.errors += not 200 <= status < 300
+
+    def expect(self, n):
+        """Announce `n` more deals, for the ETA."""
+        with self._lock:
+            self.deals_expected += n
+
+    def deal_done(self, skipped=False):
+        """Count a finished deal and print a progress line every `interval` seconds."""
+        with self._lock:
+            self.deals += 1
+            self.deals_skipped += skipped
+            now = time.monotonic()
+            if not self.progress or now - self._last_progress < self.interval:
+                return
+            self._last_progress = now
+            line = self._progress_line(now)
+        print(line, file=sys.stderr)
+
+    def _progress_line(self, now):
+        elapsed = now - self.started
+        rate = self.deals / elapsed if elapsed else 0.0
+        worked = self.deals - self.deals_skipped
+        line = f'  … {self.deals}'
+        if self.deals_expected:
+            line += f'/{self.deals_expected}'
+        line += f' deals, {rate:.1f} deals/s'
+        if worked:
+            line += f', {self.requests / worked:.1f} requests/deal'
+        if self.deals_expected and rate:
+            line += f', ETA {_duration((self.deals_expected - self.deals) / rate)}'
+        return line
+
+    # ── Reporting ────────────────────────────────────────────────────────────
+
+    def summary(self):
+        """The report as a dict (see the module docstring)."""
+        with self._lock:
+            wall = time.monotonic() - self.started
+            worked = self.deals - self.deals_skipped
+            tables = {}
+            for (table, method), entry in sorted(self._calls.items()):
+                lat = sorted(entry['latencies'])
+                tables.setdefault(table, {})[method] = {
+                    'count': len(lat),
+                    'statuses': {str(s): n for s, n in sorted(entry['statuses'].items())},
+                    'bytes_sent': entry['sent'],
+                    'bytes_received': entry['received'],
+                    'latency_ms': {f'p{p}': round(percentile(lat, p) * 1000, 1) for p in (50, 95, 99)},
+                }
+            return {
+                'run': {
+                    'wall_time_s': round(wall, 3),
+                    'requests': self.requests,
+                    'retries': self.retries,
+                    'errors': self.errors,
+                    'bytes_sent': sum(e['sent'] for e in self._calls.values()),
+                    'bytes_received': sum(e['received'] for e in self._calls.values()),
+                    'deals': self.deals,
+                    'deals_skipped': self.deals_skipped,
+                    'deals_per_s': round(self.deals / wall, 2) if wall else 0.0,
+                    'requests_per_deal': round(self.requests / worked, 2) if worked else None,
+                },
+                'tables': tables,
+            }
+
+    def openmetrics(self):
+        """The report in OpenMetrics text format."""
+        report = self.summary()
+        run = report['run']
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'# HELP {name} {help_text}')
+            suffix = '_total' if kind == 'counter' else ''
+            for labels, value in samples:
+                label_str = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f'{name}{suffix}{{{label_str}}} {value}' if label_str
+                             else f'{name}{suffix} {value}')
+
+        family('migration_wall_time_seconds', 'gauge', 'Wall time of the run.',
+               [({}, run['wall_time_s'])])
+        family('migration_retries', 'counter', 'HTTP attempts that were retries.',
+               [({}, run['retries'])])
+        family('migration_deals', 'counter', 'Deals finished (including skipped).',
+               [({}, run['deals'])])
+        family('migration_requests_per_deal', 'gauge', 'HTTP attempts per non-skipped deal.',
+               [({}, run['requests_per_deal'] or 0)])
+
+        requests, sent, received, latency = [], [], [], []
+        for table, methods in report['tables'].items():
+            for method, stats in methods.items():
+                base = {'table': table, 'method': method}
+                for status, n in stats['statuses'].items():
+                    requests.append(({**base, 'status': status}, n))
+                sent.append((base, stats['bytes_sent']))
+                received.append((base, stats['bytes_received']))
+                for q, ms in stats['latency_ms'].items():
+                    latency.append(({**base, 'quantile': f'0.{q[1:]}'}, ms / 1000))
+        family('migration_requests', 'counter', 'HTTP attempts by table, method and status.', requests)
+        family('migration_sent_bytes', 'counter', 'Request bytes sent.', sent)
+        family('migration_received_bytes', 'counter', 'Response bytes received.', received)
+        family('migration_request_latency_seconds', 'gauge', 'Request latency percentiles.', latency)
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the report: OpenMetrics for .prom/.txt, JSON otherwise."""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith(('.prom', '.txt')):
+                f.write(self.openmetrics())
+            else:
+                json.dump(self.summary(), f, indent=2)
+                f.write('\n')
+
+    def print_summary(self):
+        run = self.summary()['run']
+        per_deal = f', {run["requests_per_deal"]} requests/deal' if run['requests_per_deal'] else ''
+        print(f'  {run["requests"]} requests ({run["retries"]} retries, {run["errors"]} errors)'
+              f'{per_deal} in {_duration(run["wall_time_s"])}')
+
+
+def _duration(seconds):
+    seconds = int(seconds)
+    if seconds < 60:
+        return f'{seconds}s'
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f'{minutes}m{seconds:02d}s'
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}h{minutes:02d}m'
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Prebuilt inverted search index over a deal list.
+
+The site's search box used to lowercase and concatenate company,
+description, HQ, investors, founders and sectors of every deal on every
+keystroke and scan for the substring. build_index() does the text work
+once: each field is folded with name_key() (ligatures, accents and
+punctuation, so "Crédit Agricole", "credit-agricole" and "CRÉDIT
+AGRICOLE" agree, for French and English names alike), split into tokens,
+and every token maps to the deals containing it.
+
+  {
+    "format": "ftj-search-index",
+    "version": 1,
+    "data_version": "3f2a9c...",   # of the deals the positions refer to
+    "count": 1234,                  # deals indexed
+    "ids": ["uuid", ...],           # position → deal id (the position if deals have no id)
+    "tokens": ["0", "3d", "ab", "abc", ...],     # sorted
+    "postings": [[4, 1, 17], ...]   # per token, ascending positions, gap-encoded
+  }
+
+A query is folded the same way, and every query term must occur inside
+some token of the deal, like the substring search the site did before
+("agri" finds "Crédit Agricole", "tech" finds "FinTech"). Only the token
+list is scanned, which is far shorter than the deals' text. The postings
+of the matching tokens are merged, and the per-term results intersected,
+smallest first. Multi-word company names are also indexed as one word
+("ROB'OCC" is found by "robocc").
+
+Tokens shorter than MIN_TOKEN_LENGTH (the "l" of "L'Oréal") are not
+indexed. A query word that folds to such a token ("f" in "station f",
+the "e" of "e-health") or to nothing at all cannot be answered from the
+index. The index result then only gives candidates, and each candidate is
+checked with the site's former substring test of the whole query
+(search_text()): "station f" finds the deals with "station f", not every
+deal with "station". A query with no index term at all runs that test on
+every deal. Both checks need the deals, passed to SearchIndex.
+
+index.html runs the same query on the file written by build-snapshot.py;
+searchTokens(), searchText() and searchPositions() there mirror
+query_terms(), search_text() and SearchIndex.positions().
+
+  from search_index import build_index, SearchIndex
+  index = SearchIndex(build_index(deals, data_version=...), deals)
+  index.search('bpi seed')          # → matching deal ids, in deal order
+"""
+
+import json
+import os
+
+from name_key import name_key
+
+FORMAT = 'ftj-search-index'
+VERSION = 1
+
+# Deal fields searched, as in applyFilters() (sectors is a list)
+FIELDS = ('company', 'description', 'hq', 'investors', 'founders', 'sectors')
+
+MIN_TOKEN_LENGTH = 2
+
+
+def tokens(text):
+    """Folded tokens of a text, shortest dropped: "L'Oréal Paris" → ['oreal', 'paris']."""
+    key = name_key(text) if text else ''
+    return [t for t in key.split() if len(t) >= MIN_TOKEN_LENGTH]
+
+
+def query_terms(query):
+    """(index terms of a query, True if some word of it is not among them)."""
+    terms = tokens(query)
+    words = (query or '').split()
+    partial = (len(terms) < len(name_key(query or '').split())
+               or any(not name_key(w).strip() for w in words))
+    return terms, partial
+
+
+def search_text(deal):
+    """The text the site's substring search looked in, lowercased."""
+    values = [deal.get(f) for f in FIELDS if f != 'sectors'] + list(deal.get('sectors') or [])
+    return ' '.join(v for v in values if v).lower()
+
+
+def deal_tokens(deal):
+    """Every token one deal is found by."""
+    out = set()
+    for field in FIELDS:
+        value = deal.get(field)
+        for text in (value if isinstance(value, list) else [value]):
+            out.update(tokens(text))
+    company = tokens(deal.get('company'))
+    if len(company) > 1:
+        out.add(''.join(company))
+    return out
+
+
+def build_index(deals, **extra):
+    """The index document of `deals`; `extra` top-level fields are kept as is."""
+    postings = {}
+    for position, deal in enumerate(deals):
+        for token in deal_tokens(deal):
+            postings.setdefault(token, []).append(position)
+    vocabulary = sorted(postings)
+
+    def gaps(positions):
+        return [p - prev for prev, p in zip([0] + positions, positions)]
+
+    return {
+        'format': FORMAT,
+        'version': VERSION,
+        **extra,
+        'count': len(deals),
+        'ids': [deal.get('id', i) for i, deal in enumerate(deals)],
+        'tokens': vocabulary,
+        'postings': [gaps(postings[t]) for t in vocabulary],
+    }
+
+
+class SearchIndex:
+    """Query side of an index document."""
+
+    def __init__(self, document, deals=None):
+        if document.get('format') != FORMAT or document.get('version') != VERSION:
+            raise ValueError(f'not a version {VERSION} {FORMAT} document')
+        if deals is not None and len(deals) != document['count']:
+            raise ValueError(f'index has {document["count"]} deals, got {len(deals)}')
+        self.deals = deals
+        self.ids = document['ids']
+        self.tokens = document['tokens']
+        self._gapped = document['postings']
+        self._positions = {}            # token index → decoded positions
+        self._terms = {}                # term → matching positions
+        self._texts = {}                # position → search_text() of its deal
+
+    def _postings(self, i):
+        positions = self._positions.get(i)
+        if positions is None:
+            positions, total = [], 0
+            for gap in self._gapped[i]:
+                total += gap
+                positions.append(total)
+            self._positions[i] = positions
+        return positions
+
+    def term_positions(self, term):
+        """Positions of the deals with a token containing `term`."""
+        out = self._terms.get(term)
+        if out is None:
+            out = set()
+            for i, token in enumerate(self.tokens):
+                if term in token:
+                    out.update(self._postings(i))
+            self._terms[term] = out
+        return out
+
+    def _contains(self, position, text):
+        haystack = self._texts.get(position)
+        if haystack is None:
+            haystack = self._texts[position] = search_text(self.deals[position])
+        return text in haystack
+
+    def positions(self, query):
+        """
+        Sorted positions of the deals matching `query`, or None for an empty one.
+
+        Without the deals, a query the index cannot fully answer gives its
+        candidates (or None if it has no index term).
+        """
+        if not query:
+            return None
+        terms, partial = query_terms(query)
+        if terms:
+            matches = sorted((self.term_positions(t) for t in sorted(set(terms))), key=len)
+            result = matches[0]
+            for other in matches[1:]:
+                if not result:
+                    break
+                result = result & other
+        elif self.deals is None:
+            return None
+        else:
+            result = range(len(self.ids))
+        if partial and self.deals is not None:
+            text = query.lower()
+            result = [p for p in result if self._contains(p, text)]
+        return sorted(result)
+
+    def search(self, query):
+        """Ids of the matching deals in deal order (every deal for an empty query)."""
+        positions = self.positions(query)
+        if positions is None:
+            return list(self.ids)
+        return [self.ids[p] for p in positions]
+
+
+def index_path(snapshot_path):
+    """deals-snapshot.json → deals-snapshot.search.json"""
+    root, ext = os.path.splitext(snapshot_path)
+    return f'{root}.search{ext or ".json"}'
+
+
+def write_index(path, document):
+    """Write an index document atomically (temp file + rename)."""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Denormalized deals snapshot for the public site.
+
+index.html's loadData() used to page through all eight tables with the
+anon key on every page view and join them in the browser into one object
+per funding round. build_deals() performs the same join here, and
+write_snapshot() saves the result as one static file the site loads with
+a single request (cached by Vercel like funding-data.json).
+
+Snapshot file:
+  {
+    "format": "ftj-deals-snapshot",
+    "version": 1,                      # bump when the deal shape changes
+    "generated_at": "2026-10-17T09:00:00+00:00",
+    "data_version": "3f2a9c...",       # hash of the deals, changes with the data
+    "watermark": "2026-10-17T08:59:58.123456+00:00",   # newest updated_at / deleted_at read
+    "count": 1234,
+    "deals": [ {id, companyId, company, description, website, hq, sectors,
+                amount, round, month, year, announcedDate, createdAt,
+                investors, founders, foundersData, news, newsDescription}, ... ]
+  }
+
+Each deal has exactly the fields loadData() builds, in the same order (rounds,
+sector links, people links and investor links by id), so the site renders
+the same thing from either source.
+
+  from snapshot import load_tables, build_deals, write_snapshot
+  deals = build_deals(load_tables(client))
+  write_snapshot('deals-snapshot.json', deals)
+
+refresh_deals() brings a previous snapshot up to date from only the rows
+written or deleted since its watermark (the updated_at triggers and the
+deleted_rows log of 20261017000300_snapshot_changes.sql): it finds the
+companies those rows touch, re-joins just their deals and swaps them in.
+The result equals a full build_deals() of the current tables.
+"""
+
+import hashlib
+import json
+import os
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+
+from entity_resolver import select_all, select_in
+from name_key import name_key
+
+FORMAT = 'ftj-deals-snapshot'
+VERSION = 1
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'deals-snapshot.json')
+
+# table → columns the join needs (updated_at for the watermark; sectors and
+# the junction tables have it only from 20261017000300_snapshot_changes.sql
+# on, so full builds need that migration too)
+COLUMNS = {
+    'companies': 'id,name,description,website,hq_city_name,created_at,updated_at',
+    'funding_rounds': ('id,company_id,amount_eur,round_type,announced_month,announced_year,'
+                       'announced_date,created_at,news_url,notes,updated_at'),
+    'sectors': 'id,name,updated_at',
+    'company_sectors': 'id,company_id,sector_id,updated_at',
+    'company_people': 'id,company_id,person_id,updated_at',
+    'people': 'id,full_name,linkedin_url,updated_at',
+    'investors': 'id,name,updated_at',
+    'funding_round_investors': 'id,funding_round_id,investor_id,updated_at',
+}
+
+# Rows committed by a transaction that started before the watermark was read
+# carry an older updated_at; re-read this much before it
+OVERLAP = timedelta(minutes=10)
+# deleted_rows may be pruned after this; an older watermark needs a full build
+TOMBSTONE_RETENTION_DAYS = 90
+
+
+def load_tables(client):
+    """{table: rows ordered by id} for every table the snapshot joins."""
+    return {table: select_all(client, table, columns) for table, columns in COLUMNS.items()}
+
+
+MONTHS = ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december')
+MOIS = ('janvier', 'fevrier', 'mars', 'avril', 'mai', 'juin', 'juillet',
+        'aout', 'septembre', 'octobre', 'novembre', 'decembre')
+
+
+def month_number(value):
+    """
+    announced_month as 1-12: '3', 3, 'March', 'mar', 'mars', 'Février' all work;
+    else None. The month_number() SQL function gives the same results.
+    """
+    if value is None:
+        return None
+    text = name_key(str(value))
+    if text.isdigit():
+        number = int(text) if len(text) <= 2 else 0
+        return number if 1 <= number <= 12 else None
+    if len(text) >= 3:
+        for names in (MONTHS, MOIS):
+            for number, name in enumerate(names, 1):
+                if name.startswith(text):
+                    return number
+    return None
+
+
+def _number(value):
+    """JavaScript's Number(value) || 0 for a numeric column."""
+    try:
+        number = float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0
+    if number != number:            # NaN
+        return 0
+    return int(number) if number.is_integer() else number
+
+
+class Joiner:
+    """Lookup maps of loadData(): company → sectors / people, round → investors."""
+
+    def __init__(self, tables):
+        sectors = {s['id']: s['name'] for s in tables['sectors']}
+        people = {p['id']: {'full_name': p['full_name'], 'linkedin_url': p.get('linkedin_url')}
+                  for p in tables['people']}
+        investors = {i['id']: i['name'] for i in tables['investors']}
+        self.companies = {c['id']: c for c in tables['companies']}
+
+        self.company_sectors = {}
+        for link in tables['company_sectors']:
+            name = sectors.get(link['sector_id'])
+            if name is not None:
+                self.company_sectors.setdefault(link['company_id'], []).append(name)
+        self.company_people = {}
+        for link in tables['company_people']:
+            person = people.get(link['person_id'])
+            if person is not None:
+                self.company_people.setdefault(link['company_id'], []).append(person)
+        self.round_investors = {}
+        for link in tables['funding_round_investors']:
+            name = investors.get(link['investor_id'])
+            if name is not None:
+                self.round_investors.setdefault(link['funding_round_id'], []).append(name)
+
+    def deal(self, rnd):
+        """The deal object of one funding round, or None if its company is gone."""
+        company = self.companies.get(rnd['company_id'])
+        if company is None:
+            return None
+        founders = self.company_people.get(company['id'], [])
+        year = _number(rnd.get('announced_year'))
+        return {
+            'id': rnd['id'],
+            'companyId': company['id'],
+            'company': company['name'],
+            'description': company.get('description'),
+            'website': company.get('website'),
+            'hq': company.get('hq_city_name'),
+            'sectors': self.company_sectors.get(company['id'], []),
+            'amount': _number(rnd.get('amount_eur')),
+            'round': rnd.get('round_type') or '',
+            'month': rnd.get('announced_month') or '',
+            'year': year or 2025,
+            'announcedDate': rnd.get('announced_date') or None,
+            'createdAt': rnd.get('created_at') or company.get('created_at'),
+            'investors': ', '.join(self.round_investors.get(rnd['id'], [])),
+            'founders': ', '.join(f['full_name'] for f in founders),
+            'foundersData': founders,
+            'news': rnd.get('news_url') or '',
+            'newsDescription': rnd.get('notes') or '',
+        }
+
+
+def build_deals(tables):
+    """One deal per funding round, joined exactly like index.html's loadData()."""
+    joiner = Joiner(tables)
+    deals = (joiner.deal(rnd) for rnd in tables['funding_rounds'])
+    return [d for d in deals if d is not None]
+
+
+def data_version(deals):
+    """Short content hash of the deals: equal snapshots have equal versions."""
+    canonical = json.dumps(deals, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def make_snapshot(deals, **extra):
+    return {
+        'format': FORMAT,
+        'version': VERSION,
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'data_version': data_version(deals),
+        **extra,
+        'count': len(deals),
+        'deals': deals,
+    }
+
+
+def write_snapshot(path, deals, **extra):
+    """Write the snapshot atomically (temp file + rename); returns it."""
+    snapshot = make_snapshot(deals, **extra)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+    return snapshot
+
+
+def read_snapshot(path):
+    """Load a snapshot file, checking its format and version."""
+    with open(path, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    if snapshot.get('format') != FORMAT or snapshot.get('version') != VERSION:
+        raise ValueError(f'{path}: not a version {VERSION} {FORMAT} file')
+    return snapshot
+
+
+# ── Incremental refresh ──────────────────────────────────────────────────────
+
+def _timestamp(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def watermark_of(tables, tombstones=(), previous=None):
+    """Newest updated_at / deleted_at among the rows read (or `previous`), as ISO text."""
+    stamps = [_timestamp(r['updated_at']) for rows in tables.values() for r in rows if r.get('updated_at')]
+    stamps += [_timestamp(t['deleted_at']) for t in tombstones]
+    if previous:
+        stamps.append(_timestamp(previous))
+    return max(stamps).isoformat(timespec='microseconds') if stamps else None
+
+
+def watermark_expired(watermark, now=None):
+    """True if deleted_rows may already have been pruned past `watermark`."""
+    now = now or datetime.now(timezone.utc)
+    return now - _timestamp(watermark) > timedelta(days=TOMBSTONE_RETENTION_DAYS)
+
+
+def load_changes(client, watermark):
+    """({table: rows written since}, tombstones since) for the watermark minus OVERLAP."""
+    since = urllib.parse.quote((_timestamp(watermark) - OVERLAP).isoformat(timespec='microseconds'), safe='')
+    changed = {table: select_all(client, table, columns, filters=f'updated_at=gte.{since}')
+               for table, columns in COLUMNS.items()}
+    tables = ','.join(COLUMNS)
+    tombstones = select_all(client, 'deleted_rows', 'table_name,row_id,old_row,deleted_at',
+                            filters=f'deleted_at=gte.{since}&table_name=in.({tables})')
+    return changed, tombstones
+
+
+def affected_companies(client, previous_deals, changed, tombstones):
+    """(company ids whose deals must be re-joined, round ids whose old deals must go)."""
+    deleted = {}
+    for t in tombstones:
+        deleted.setdefault(t['table_name'], []).append(t['old_row'])
+
+    companies = {c['id'] for c in changed['companies']}
+    companies |= {c['id'] for c in deleted.get('companies', [])}
+    for table in ('funding_rounds', 'company_sectors', 'company_people'):
+        companies |= {r['company_id'] for r in changed[table] + deleted.get(table, [])}
+    stale_rounds = {r['id'] for r in changed['funding_rounds'] + deleted.get('funding_rounds', [])}
+
+    # Renamed sectors / people / investors reach their companies through the links
+    sector_ids = [s['id'] for s in changed['sectors']]
+    companies |= {link['company_id'] for link in select_in(
+        client, 'company_sectors', 'id,company_id', 'sector_id', sector_ids)}
+    person_ids = [p['id'] for p in changed['people']]
+    companies |= {link['company_id'] for link in select_in(
+        client, 'company_people', 'id,company_id', 'person_id', person_ids)}
+
+    investor_ids = [i['id'] for i in changed['investors']]
+    rounds = {link['funding_round_id'] for link in select_in(
+        client, 'funding_round_investors', 'id,funding_round_id', 'investor_id', investor_ids)}
+    rounds |= {link['funding_round_id']
+               for link in changed['funding_round_investors'] + deleted.get('funding_round_investors', [])}
+    round_company = {d['id']: d['companyId'] for d in previous_deals}
+    round_company.update({r['id']: r['company_id'] for r in changed['funding_rounds']})
+    unknown = [rid for rid in rounds if rid not in round_company]
+    round_company.update({r['id']: r['company_id'] for r in select_in(
+        client, 'funding_rounds', 'id,company_id', 'id', unknown)})
+    companies |= {round_company[rid] for rid in rounds if rid in round_company}
+    return companies, stale_rounds
+
+
+def load_company_tables(client, company_ids):
+    """The tables of build_deals(), restricted to the given companies' rows."""
+    def ids(rows, column):
+        return {r[column] for r in rows}
+
+    tables = {}
+    tables['companies'] = select_in(client, 'companies', COLUMNS['companies'], 'id', company_ids)
+    tables['funding_rounds'] = select_in(client, 'funding_rounds', COLUMNS['funding_rounds'],
+                                         'company_id', company_ids)
+    tables['company_sectors'] = select_in(client, 'company_sectors', COLUMNS['company_sectors'],
+                                          'company_id', company_ids)
+    tables['sectors'] = select_in(client, 'sectors', COLUMNS['sectors'], 'id',
+                                  ids(tables['company_sectors'], 'sector_id'))
+    tables['company_people'] = select_in(client, 'company_people', COLUMNS['company_people'],
+                                         'company_id', company_ids)
+    tables['people'] = select_in(client, 'people', COLUMNS['people'], 'id',
+                                 ids(tables['company_people'], 'person_id'))
+    tables['funding_round_investors'] = select_in(
+        client, 'funding_round_investors', COLUMNS['funding_round_investors'],
+        'funding_round_id', ids(tables['funding_rounds'], 'id'))
+    tables['investors'] = select_in(client, 'investors', COLUMNS['investors'], 'id',
+                                    ids(tables['funding_round_investors'], 'investor_id'))
+    # select_in orders by the filter column; the join expects id order like select_all
+    return {table: sorted(rows, key=lambda r: r['id']) for table, rows in tables.items()}
+
+
+def refresh_deals(client, previous_deals, watermark):
+    """
+    Bring `previous_deals` (built up to `watermark`) up to date.
+
+    Returns (deals, new watermark, stats); stats counts the changed rows per
+    table, the tombstones read and the deals removed and re-joined.
+    """
+    changed, tombstones = load_changes(client, watermark)
+    companies, stale_rounds = affected_companies(client, previous_deals, changed, tombstones)
+    fresh = build_deals(load_company_tables(client, companies)) if companies else []
+
+    kept = [d for d in previous_deals if d['companyId'] not in companies and d['id'] not in stale_rounds]
+    deals = sorted(kept + fresh, key=lambda d: d['id'])
+    stats = {
+        'changed': {table: len(rows) for table, rows in changed.items()},
+        'tombstones': len(tombstones),
+        'companies': len(companies),
+        'removed': len(previous_deals) - len(kept),
+        'rejoined': len(fresh),
+    }
+    return deals, watermark_of(changed, tombstones, previous=watermark), stats
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Shared Supabase REST client for the Python migration scripts.
+
+Keeps a small pool of persistent HTTP/1.1 connections to PostgREST (one
+TCP+TLS handshake per pooled connection instead of one per call), asks for
+gzip-compressed responses, and retries 429s, 503s and dropped connections.
+A Retry-After header is honored (and pauses every thread, not just the one
+that got it); otherwise retries back off 2s/4s/8s as the curl-based scripts
+always have.
+
+The client is thread-safe: connections are checked out of a LIFO pool, so
+several worker threads can share it. Requests are admitted by a shared
+Throttle (throttle.py): an optional requests/second cap and an in-flight
+limit that grows while responses are fast and shrinks on overload, so bulk
+jobs run as fast as the project allows without tipping it into 503s.
+
+Every attempt is recorded in `client.metrics` (run_metrics.py). With
+SUPABASE_METRICS=path set, get_client() writes the end-of-run report there
+when the script exits.
+
+Usage:
+  from supabase_rest import get_client
+  client = get_client()
+  rows = client.request('GET', 'investors?select=id&name=eq.Bpifrance')
+"""
+
+import gzip
+import http.client
+import json
+import atexit
+import os
+import queue
+import threading
+import time
+import urllib.parse
+from email.utils import parsedate_to_datetime
+
+from run_metrics import RunMetrics
+from throttle import Throttle
+
+SUPABASE_URL = os.environ.get('SUPABASE_URL', 'https://tlwqkglfyjydwsgjrclx.supabase.co')
+SERVICE_KEY = os.environ.get('SUPABASE_SERVICE_KEY', '')
+METRICS_PATH = os.environ.get('SUPABASE_METRICS', '')
+
+# Status 0 means the request never got an HTTP response (connection refused,
+# reset, timed out...). It, 429 and 503 are worth retrying.
+RETRYABLE_STATUSES = {0, 429, 503}
+
+# Longest Retry-After the client will sleep for
+MAX_RETRY_AFTER = 60
+
+# Errors raised by http.client when a pooled keep-alive connection was closed
+# by the server while idle. These are retried once on a fresh connection
+# without counting as an attempt.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+def _retry_after(headers):
+    """Seconds to wait from a Retry-After header (delta or HTTP date), or None."""
+    value = headers.get('Retry-After') if headers is not None else None
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(MAX_RETRY_AFTER, max(0.0, seconds))
+
+
+class SupabaseError(RuntimeError):
+    """Non-2xx response from PostgREST."""
+
+    def __init__(self, status, method, path, body):
+        super().__init__(f'HTTP {status} {method} /{path}: {body}')
+        self.status = status
+        self.method = method
+        self.path = path
+        self.body = body
+
+
+class SupabaseClient:
+    """Pooled, keep-alive client for the Supabase REST API."""
+
+    def __init__(self, url=SUPABASE_URL, key=SERVICE_KEY, pool_size=32, timeout=30, retries=3,
+                 throttle=None):
+        parts = urllib.parse.urlsplit(url)
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/') + '/rest/v1/'
+        self.timeout = timeout
+        self.retries = retries
+        self.headers = {
+            'apikey': key,
+            'Authorization': f'Bearer {key}',
+            'Content-Type': 'application/json',
+            'Accept-Encoding': 'gzip',
+            'Connection': 'keep-alive',
+            'Prefer': 'return=representation',
+        }
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self.throttle = throttle or Throttle(max_limit=pool_size)
+        self.metrics = RunMetrics()
+
+    # ── Connection pool ──────────────────────────────────────────────────────
+
+    def _new_connection(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        """Return (connection, reused)."""
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # ── Transport ────────────────────────────────────────────────────────────
+
+    def _send_once(self, method, path, data, headers):
+        """
+        Send one request over a pooled connection.
+        Returns (status, text, headers, bytes received on the wire).
+        """
+        conn, reused = self._acquire()
+        try:
+            conn.request(method, self.base_path + path, body=data, headers=headers)
+            resp = conn.getresponse()
+            raw = resp.read()
+        except _STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+            # Server dropped an idle keep-alive connection — redo on a fresh one
+            conn = self._new_connection()
+            try:
+                conn.request(method, self.base_path + path, body=data, headers=headers)
+                resp = conn.getresponse()
+                raw = resp.read()
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+        received = len(raw)
+        if resp.getheader('Content-Encoding', '').lower() == 'gzip':
+            raw = gzip.decompress(raw)
+        return resp.status, raw.decode('utf-8'), resp.headers, received
+
+    def send(self, method, path, body=None, prefer=None, retries=None):
+        """
+        Send a request with retries. Never raises on HTTP errors.
+
+        `path` is relative to /rest/v1/ and includes the query string.
+        Returns (status, text); status is 0 if no response was ever received.
+        """
+        retries = self.retries if retries is None else retries
+        headers = dict(self.headers)
+        if prefer:
+            headers['Prefer'] = prefer
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+
+        status, text = 0, ''
+        for attempt in range(retries):
+            resp_headers, received = None, 0
+            start = self.throttle.acquire()
+            try:
+                status, text, resp_headers, received = self._send_once(method, path, data, headers)
+            except (http.client.HTTPException, OSError) as e:
+                status, text = 0, str(e)
+            finally:
+                self.throttle.release(start, status)
+                self.metrics.record(method, path, status, len(data or b''), received,
+                                    time.monotonic() - start, attempt)
+
+            if status not in RETRYABLE_STATUSES or attempt == retries - 1:
+                break
+            retry_after = _retry_after(resp_headers)
+            if retry_after is not None:
+                wait = retry_after
+                self.throttle.pause(wait)
+            else:
+                wait = 2 ** (attempt + 1)
+            print(f'    Retry {attempt+1}/{retries} after {wait:g}s (status={status})')
+            time.sleep(wait)
+        return status, text
+
+    def request(self, method, path, body=None, prefer=None, retries=None):
+        """Send a request and return the decoded JSON body (or None). Raises SupabaseError."""
+        status, text = self.send(method, path, body=body, prefer=prefer, retries=retries)
+        if not 200 <= status < 300:
+            raise SupabaseError(status, method, path, text)
+        return json.loads(text) if text else None
+
+    def insert(self, table, rows, on_conflict=None, resolution=None,
+               returning='representation', chunk_size=500):
+        """
+        POST rows as JSON arrays, at most `chunk_size` rows per request.
+
+        `on_conflict` names the unique columns and `resolution` is
+        'merge-duplicates' or 'ignore-duplicates'. PostgREST needs every object
+        in one array to have the same keys, so rows are grouped by key set.
+        Returns the rows sent back (empty with returning='minimal').
+        """
+        path = f'{table}?on_conflict={on_conflict}' if on_conflict else table
+        prefer = f'return={returning}'
+        if resolution:
+            prefer = f'resolution={resolution},{prefer}'
+
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        out = []
+        for group in groups.values():
+            for i in range(0, len(group), chunk_size):
+                out.extend(self.request('POST', path, body=group[i:i + chunk_size], prefer=prefer) or [])
+        return out
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client, created on first use from the environment."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SupabaseClient()
+            if METRICS_PATH:
+                atexit.register(_write_metrics, _client, METRICS_PATH)
+        return _client
+
+
+def _write_metrics(client, path):
+    client.metrics.write(path)
+    print(f'Metrics written to {path}')
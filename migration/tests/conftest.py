@@ -0,0 +1,68 @@
+"""
+Shared fixtures: a fresh in-process PostgREST stand-in (fake_postgrest.py)
+per test and a client pointed at it, so the scripts' request paths run
+without a Supabase project.
+"""
+
+import os
+import runpy
+import sys
+
+import pytest
+
+MIGRATION = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MIGRATION)
+
+# The scripts refuse to start without a key; the fake server accepts any
+os.environ.setdefault('SUPABASE_SERVICE_KEY', 'test')
+
+import supabase_rest  # noqa: E402
+from fake_postgrest import FakePostgrest  # noqa: E402
+from supabase_rest import SupabaseClient  # noqa: E402
+
+
+def load_script(name):
+    """Module globals of a migration script, without running its main()."""
+    return runpy.run_path(os.path.join(MIGRATION, name), run_name='test')
+
+
+def sector_seed(sector_ids):
+    """One sectors row per distinct id (several names share an id in the scripts)."""
+    rows = {}
+    for name, sector_id in sector_ids.items():
+        rows.setdefault(sector_id, {'id': sector_id, 'name': name,
+                                    'slug': f'{len(rows)}-' + name.lower().replace(' ', '-')})
+    return list(rows.values())
+
+
+@pytest.fixture
+def march():
+    """(DEALS, SECTORS) of insert-deals-march2026.py and the server seed with those sectors."""
+    script = load_script('insert-deals-march2026.py')
+    return script['DEALS'], script['SECTORS'], {'sectors': sector_seed(script['SECTORS'])}
+
+
+@pytest.fixture
+def make_server():
+    """Start fake servers on demand (`seed` as for FakePostgrest); all stopped after the test."""
+    servers = []
+
+    def start(seed=None):
+        server = FakePostgrest(seed=seed).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    """Client for a fake server, also returned by get_client() for the scripts."""
+    def client_for(server):
+        client = SupabaseClient(url=server.url, key='test')
+        client.metrics.progress = False
+        monkeypatch.setattr(supabase_rest, '_client', client)
+        return client
+    return client_for
@@ -0,0 +1,61 @@
+"""ChangePlan records only the differences and apply() makes the database match."""
+
+from change_plan import ChangePlan, Ref, load_links
+from entity_resolver import EntityResolver
+
+
+def seed(client):
+    company = client.insert('companies', [{'name': 'Acme'}])[0]['id']
+    rnd = client.insert('funding_rounds', [{'company_id': company, 'round_type': 'Seed',
+                                            'notes': 'old'}])[0]['id']
+    a, b, c = (r['id'] for r in client.insert('investors', [{'name': n} for n in 'ABC']))
+    client.insert('funding_round_investors', [
+        {'funding_round_id': rnd, 'investor_id': a, 'is_lead': True},
+        {'funding_round_id': rnd, 'investor_id': b, 'is_lead': False},
+        {'funding_round_id': rnd, 'investor_id': c, 'is_lead': False},
+    ])
+    return rnd, a, b, c
+
+
+def links(client, rnd):
+    return load_links(client, 'funding_round_investors', 'funding_round_id', 'investor_id', [rnd],
+                      columns=('is_lead',))[rnd]
+
+
+def test_diff_links_and_apply(make_server, connect):
+    client = connect(make_server())
+    rnd, a, b, c = seed(client)
+    current = links(client, rnd)
+    kept_id = current[b]['id']
+
+    plan = ChangePlan()
+    # B becomes lead, A stays (no longer lead), C goes, D is new
+    desired = {b: {'is_lead': True}, a: {'is_lead': False}, Ref('investors', 'D'): {'is_lead': False}}
+    plan.create('investors', 'D')
+    plan.diff_links('funding_round_investors', 'funding_round_id', 'investor_id', rnd, current, desired)
+    assert plan.counts() == {'investors': {'+': 1, '~': 0, '-': 0},
+                             'funding_round_investors': {'+': 1, '~': 2, '-': 1}}
+    plan.apply(client, EntityResolver(client))
+
+    after = links(client, rnd)
+    d = client.request('GET', 'investors?select=id&name=eq.D')[0]['id']
+    assert {k: v['is_lead'] for k, v in after.items()} == {a: False, b: True, d: False}
+    assert after[b]['id'] == kept_id            # updated in place, not re-inserted
+
+    again = ChangePlan()
+    again.diff_links('funding_round_investors', 'funding_round_id', 'investor_id', rnd, after,
+                     {b: {'is_lead': True}, a: {'is_lead': False}, d: {'is_lead': False}})
+    assert again.is_empty()
+
+
+def test_diff_row_only_changed_columns(make_server, connect):
+    client = connect(make_server())
+    rnd = seed(client)[0]
+    current = client.request('GET', f'funding_rounds?select=notes,round_type&id=eq.{rnd}')[0]
+
+    plan = ChangePlan()
+    assert not plan.diff_row('funding_rounds', {'id': rnd}, current, {'round_type': 'Seed'})
+    assert plan.diff_row('funding_rounds', {'id': rnd}, current, {'round_type': 'Seed', 'notes': 'new'})
+    assert plan.updates == {'funding_rounds': [({'id': rnd}, {'notes': 'new'})]}
+    plan.apply(client)
+    assert client.request('GET', f'funding_rounds?select=notes&id=eq.{rnd}') == [{'notes': 'new'}]
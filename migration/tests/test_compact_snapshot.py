@@ -0,0 +1,47 @@
+"""decode(encode(deals)) gives back exactly the deals, through JSON too."""
+
+import json
+import os
+
+import pytest
+
+from compact_snapshot import decode, dumps, encode
+from deal_ingest import DealIngestor
+from snapshot import build_deals, load_tables
+
+from conftest import MIGRATION
+
+
+def round_trip(deals, **extra):
+    compact = json.loads(dumps(encode(deals, **extra)))
+    assert {k: compact[k] for k in extra} == extra
+    return decode(compact)
+
+
+def test_funding_data():
+    with open(os.path.join(MIGRATION, '..', 'funding-data.json'), encoding='utf-8') as f:
+        deals = json.load(f)
+    assert round_trip(deals) == deals
+
+
+def test_snapshot_deals(make_server, connect, march):
+    deals, sectors, seed = march
+    client = connect(make_server(seed=seed))
+    DealIngestor(client=client, sector_ids=sectors).run(deals)
+    snapshot = build_deals(load_tables(client))
+    assert snapshot
+    assert round_trip(snapshot, data_version='x') == snapshot
+
+
+def test_nulls_and_empty_lists():
+    deals = [
+        {'company': 'A', 'hq': None, 'sectors': [], 'investors': '', 'founders': None, 'month': None},
+        {'company': 'B', 'hq': 'Paris', 'sectors': ['AI', 'AI'], 'investors': 'X, Y', 'founders': 'Z',
+         'month': 'March'},
+    ]
+    assert round_trip(deals) == deals
+
+
+def test_rejects_other_documents():
+    with pytest.raises(ValueError):
+        decode({'format': 'ftj-deals-compact', 'version': 0})
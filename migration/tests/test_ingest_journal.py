@@ -0,0 +1,59 @@
+"""A journaled ingest resumes where it stopped and never writes a row twice."""
+
+import json
+
+from deal_ingest import DealIngestor
+from ingest_journal import IngestJournal, deal_key
+
+TABLES = ('companies', 'funding_rounds', 'company_sectors', 'company_people', 'funding_round_investors')
+
+
+def counts(db):
+    return {t: len(db.rows[t]) for t in TABLES}
+
+
+def run(client, deals, sectors, path):
+    journal = IngestJournal(path)
+    try:
+        return DealIngestor(client=client, sector_ids=sectors, journal=journal).run(deals)
+    finally:
+        journal.close()
+
+
+def test_rerun_skips_done_deals(make_server, connect, march, tmp_path):
+    deals, sectors, seed = march
+    server = make_server(seed=seed)
+    client = connect(server)
+    path = tmp_path / 'journal.jsonl'
+    assert all(r.ok for r in run(client, deals, sectors, path))
+    before = counts(server.db)
+
+    client.metrics.requests = 0
+    results = run(client, deals, sectors, path)
+    assert all(r.ok and r.skipped for r in results)
+    assert client.metrics.requests == 0
+    assert counts(server.db) == before
+
+
+def test_half_done_deal_reuses_recorded_ids(make_server, connect, march, tmp_path):
+    deals, sectors, seed = march
+    server = make_server(seed=seed)
+    client = connect(server)
+    path = tmp_path / 'journal.jsonl'
+    first = run(client, deals, sectors, path)
+    before = counts(server.db)
+
+    # Crash of the last deal after its company and rounds: only those lines
+    # survive, the last one torn mid-write
+    last = deal_key(deals[-1])
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    kept = [e for e in lines if e['deal'] != last or e['step'] in ('company', 'round')]
+    path.write_text(''.join(json.dumps(e) + '\n' for e in kept) + '{"deal": "' + last[:8])
+
+    results = run(client, deals, sectors, path)
+    assert all(r.skipped for r in results[:-1])
+    assert results[-1].ok and not results[-1].skipped
+    assert results[-1].company_id == first[-1].company_id
+    assert results[-1].round_ids == first[-1].round_ids
+    assert counts(server.db) == before
+    assert IngestJournal(path).is_done(last)
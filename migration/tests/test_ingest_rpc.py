@@ -0,0 +1,67 @@
+"""The ingest_deals RPC writes exactly the rows of the step-by-step path."""
+
+from deal_ingest import DealIngestor
+
+IGNORED = {'id', 'created_at', 'updated_at', 'name_key'}
+
+
+def canonical(db):
+    """Every table as sorted rows, ids replaced by the names they point to."""
+    label = {}
+    for table, column in (('companies', 'name'), ('people', 'full_name'), ('investors', 'name'),
+                          ('sectors', 'name'), ('cities', 'name')):
+        label.update({row['id']: row[column] for row in db.rows[table].values()})
+    for row in db.rows['funding_rounds'].values():
+        label[row['id']] = (label[row['company_id']], row['round_type'], row['announced_month'])
+
+    out = {}
+    for table in ('companies', 'people', 'investors', 'cities', 'funding_rounds',
+                  'company_sectors', 'company_people', 'funding_round_investors'):
+        rows = [{k: label.get(v, v) if k.endswith('_id') else v
+                 for k, v in row.items() if k not in IGNORED}
+                for row in db.rows[table].values()]
+        out[table] = sorted(rows, key=repr)
+    return out
+
+
+def ingest(make_server, connect, march, **options):
+    deals, sectors, seed = march
+    server = make_server(seed=seed)
+    results = DealIngestor(client=connect(server), sector_ids=sectors, **options).run(deals)
+    assert all(r.ok for r in results), [r.error for r in results if not r.ok]
+    return server.db
+
+
+def test_rpc_matches_step_path(make_server, connect, march):
+    steps = canonical(ingest(make_server, connect, march))
+    rpc = canonical(ingest(make_server, connect, march, use_rpc=True))
+    assert rpc == steps
+
+
+def test_rpc_keeps_every_round_and_company_column(make_server, connect, march):
+    assert all(rnd.get('is_verified') for deal in march[0] for rnd in deal['rounds'])
+    db = ingest(make_server, connect, march, use_rpc=True)
+    assert all(row['is_verified'] for row in db.rows['funding_rounds'].values())
+    assert all(row['hq_country'] == 'France' and row['status'] == 'active'
+               for row in db.rows['companies'].values())
+
+
+def test_rpc_rejects_unknown_columns(make_server, connect, march):
+    deals, sectors, seed = march
+    deal = dict(deals[0], rounds=[dict(deals[0]['rounds'][0], valuation='1B')])
+    server = make_server(seed=seed)
+    results = DealIngestor(client=connect(server), sector_ids=sectors, use_rpc=True).run([deal])
+    assert not results[0].ok
+    assert 'valuation' in results[0].error
+    assert not server.db.rows['companies']
+
+
+def test_rpc_matches_name_variants(make_server, connect):
+    server = make_server(seed={'companies': [{'name': "Rob'Occ"}], 'investors': [{'name': 'Kima Ventures'}],
+                               'people': [{'full_name': 'Hélène Durand'}]})
+    deal = {'company': {'name': 'ROB’OCC'}, 'founders': ['HELENE DURAND'],
+            'rounds': [{'round_type': 'Seed', 'investors': ['KIMA  ventures']}]}
+    results = DealIngestor(client=connect(server), use_rpc=True).run([deal])
+    assert results[0].ok, results[0].error
+    for table in ('companies', 'investors', 'people'):
+        assert len(server.db.rows[table]) == 1, table
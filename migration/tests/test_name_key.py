@@ -0,0 +1,43 @@
+"""name_key.py agrees with the SQL function and finds rows written through the API."""
+
+import os
+import re
+import urllib.parse
+
+import pytest
+
+from name_key import ACCENTS_FROM, ACCENTS_TO, name_key
+
+from conftest import MIGRATION
+
+SQL = os.path.join(MIGRATION, '..', 'supabase', 'migrations', '20261017000200_name_key.sql')
+
+
+@pytest.mark.parametrize('name, key', [
+    ('ROB’OCC', 'rob occ'),
+    ("Rob'Occ", 'rob occ'),
+    ('Crédit Agricole', 'credit agricole'),
+    ('Bpifrance​', 'bpifrance'),
+    ('Œuvre  Capital', 'oeuvre capital'),
+    ('  Straße 42 ', 'strasse 42'),
+    ('---', ''),
+])
+def test_name_key(name, key):
+    assert name_key(name) == key
+
+
+def test_accent_map_matches_sql():
+    with open(SQL, encoding='utf-8') as f:
+        sql = f.read()
+    literals = re.findall(r"'([^'\n]{100,})'", sql)
+    assert literals == [ACCENTS_FROM, ACCENTS_TO]
+
+
+def test_round_trip_through_api(make_server, connect):
+    client = connect(make_server())
+    client.insert('investors', [{'name': 'Kima Ventures'}, {'name': 'Crédit Agricole Innovations'}])
+    for variant, name in (('KIMA  ventures', 'Kima Ventures'),
+                          ('credit-agricole innovations', 'Crédit Agricole Innovations')):
+        key = urllib.parse.quote(name_key(variant), safe='')
+        rows = client.request('GET', f'investors?select=name,name_key&name_key=eq.{key}')
+        assert rows == [{'name': name, 'name_key': name_key(name)}]
@@ -0,0 +1,42 @@
+"""SearchIndex finds what the site's substring search found."""
+
+from search_index import SearchIndex, build_index
+
+DEALS = [
+    {'id': 'a', 'company': 'Qonto', 'sectors': ['FinTech'], 'investors': 'Crédit Agricole, Bpifrance'},
+    {'id': 'b', 'company': "ROB'OCC", 'sectors': ['DeepTech'], 'hq': 'Montpellier'},
+    {'id': 'c', 'company': "L'Oréal", 'sectors': ['Beauty'], 'hq': 'Paris'},
+    {'id': 'd', 'company': 'Alan', 'description': 'Incubated at Station F', 'hq': 'Paris'},
+    {'id': 'e', 'company': 'Ynsect', 'description': 'Insect farming', 'hq': 'Station Ouest'},
+]
+
+
+def search(query):
+    return SearchIndex(build_index(DEALS), DEALS).search(query)
+
+
+def test_infix_and_prefix_terms():
+    assert search('tech') == ['a', 'b']
+    assert search('agri') == ['a']
+    assert search('CREDIT agricole') == ['a']
+
+
+def test_terms_are_intersected_and_folded():
+    assert search('oreal paris') == ['c']
+    assert search('oréal montpellier') == []
+    assert search('robocc') == ['b']
+
+
+def test_query_without_terms():
+    assert SearchIndex(build_index(DEALS)).positions('l') is None
+    index = SearchIndex(build_index(DEALS), DEALS)
+    assert index.search('l') == ['a', 'b', 'c', 'd']
+    assert index.search('') == ['a', 'b', 'c', 'd', 'e']
+
+
+def test_short_words_keep_substring_semantics():
+    assert search('station') == ['d', 'e']
+    assert search('station f') == ['d']
+    assert search('l oreal') == []
+    assert search("l'oréal") == ['c']
+    assert search('paris -') == []
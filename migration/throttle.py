@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Shared request throttle for the Supabase client.
+
+Every request made through supabase_rest.SupabaseClient passes through one
+Throttle, so a bulk job with many worker threads backs off as a whole
+instead of each thread hammering an overloaded project on its own:
+
+  token bucket   at most `rate` requests per second on average, with bursts
+                 of up to `burst` (SUPABASE_MAX_RPS, 0 = no cap)
+  AIMD limit     at most `limit` requests in flight. Each fast success adds
+                 1/limit (about +1 per round of requests); a 429 / 503 /
+                 dropped connection halves it, and a response much slower
+                 than the best recent latency takes 10% off, each at most
+                 once per `cooldown` seconds. The limit stays within
+                 [min_limit, max_limit] (max_limit = the connection pool).
+  pause          a 429 / 503 carrying Retry-After stops every thread from
+                 sending until that time has passed.
+
+  throttle = Throttle(rate=50, max_limit=32)
+  start = throttle.acquire()
+  status = ...send...
+  throttle.release(start, status)
+"""
+
+import os
+import threading
+import time
+
+OVERLOAD_STATUSES = {0, 429, 503}
+
+DEFAULT_RATE = float(os.environ.get('SUPABASE_MAX_RPS', '0'))
+DEFAULT_INITIAL_LIMIT = int(os.environ.get('SUPABASE_INITIAL_INFLIGHT', '8'))
+
+# A response this many times slower than the baseline counts as queueing
+SLOW_FACTOR = 3.0
+# How fast the latency baseline follows slower responses (per sample)
+BASELINE_DRIFT = 0.01
+
+
+class Throttle:
+    """Token bucket + AIMD in-flight limit + shared Retry-After pause."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None, initial_limit=DEFAULT_INITIAL_LIMIT,
+                 min_limit=1, max_limit=32, cooldown=1.0):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.baseline = None            # best recent latency, seconds
+        self.decreases = 0
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    # ── Admission ────────────────────────────────────────────────────────────
+
+    def _take_token(self, now):
+        """Take a token if one is available; else return seconds until one is."""
+        if not self.rate:
+            return 0.0
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Block until a request may be sent; returns its start time for release()."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    self._cond.wait(self._paused_until - now)
+                    continue
+                if self.in_flight >= int(self.limit):
+                    self._cond.wait()
+                    continue
+                wait = self._take_token(now)
+                if wait:
+                    self._cond.wait(wait)
+                    continue
+                self.in_flight += 1
+                return now
+
+    def release(self, start, status):
+        """Record a finished request and adapt the in-flight limit."""
+        now = time.monotonic()
+        latency = now - start
+        with self._cond:
+            self.in_flight -= 1
+            if status in OVERLOAD_STATUSES:
+                self._decrease(now, 0.5)
+            else:
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    self.baseline += (latency - self.baseline) * BASELINE_DRIFT
+                if latency > SLOW_FACTOR * self.baseline and latency > 0.05:
+                    self._decrease(now, 0.9)
+                elif status < 500:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _decrease(self, now, factor):
+        # One cut per cooldown: a burst of failures from the same overload
+        # should not collapse the limit to the floor
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+        self.decreases += 1
+
+    def pause(self, seconds):
+        """Hold every new request for `seconds` (a server Retry-After)."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
@@ -1,65 +1,46 @@
 #!/usr/bin/env python3
 """
 Batch founder update script.
-For each company: replaces all founder entries with the specified list.
+For each company: makes the founder entries match the specified list. Current
+founder links are loaded in bulk and only the difference is written.
 
 Usage:
   export SUPABASE_SERVICE_KEY="..."
-  python3 migration/update-founders-batch.py
+  python3 migration/update-founders-batch.py [--dry-run]
 """
 
-import json, os, sys, urllib.request, urllib.parse
+import sys
 
-SUPABASE_URL = os.environ.get('SUPABASE_URL', 'https://tlwqkglfyjydwsgjrclx.supabase.co')
-SERVICE_KEY  = os.environ.get('SUPABASE_SERVICE_KEY', '')
+from change_plan import ChangePlan, load_links
+from entity_resolver import EntityResolver, select_all, select_in
+from name_key import name_key
+from supabase_rest import SERVICE_KEY, get_client
 
 if not SERVICE_KEY:
     print('Error: SUPABASE_SERVICE_KEY required'); sys.exit(1)
 
-HEADERS = {
-    'apikey': SERVICE_KEY,
-    'Authorization': f'Bearer {SERVICE_KEY}',
-    'Content-Type': 'application/json',
-    'Prefer': 'return=representation',
-}
-
-def req(method, path, body=None, prefer=None):
-    url = f'{SUPABASE_URL}/rest/v1/{path}'
-    h = dict(HEADERS)
-    if prefer: h['Prefer'] = prefer
-    data = json.dumps(body).encode() if body is not None else None
-    r = urllib.request.Request(url, data=data, headers=h, method=method)
-    try:
-        with urllib.request.urlopen(r) as resp:
-            c = resp.read(); return json.loads(c) if c else None
-    except urllib.error.HTTPError as e:
-        raise RuntimeError(f'HTTP {e.code} {method} /{path}: {e.read().decode()}')
-
-def find_company(name):
-    enc = urllib.parse.quote(name, safe='')
-    rows = req('GET', f'companies?select=id,name&name=ilike.{enc}')
-    if rows: return rows[0]
-    # Fallback: prefix match for companies with suffixes like "(ex-Meero)"
-    enc2 = urllib.parse.quote(f'{name}%', safe='')
-    rows = req('GET', f'companies?select=id,name&name=ilike.{enc2}')
-    return rows[0] if rows else None
-
-def get_or_create_person(full_name):
-    enc = urllib.parse.quote(full_name, safe='')
-    rows = req('GET', f'people?select=id&full_name=eq.{enc}')
-    if rows: return rows[0]['id']
-    rows = req('POST', 'people', body={'full_name': full_name})
-    return rows[0]['id']
-
-def clear_founders(company_id):
-    req('DELETE', f'company_people?company_id=eq.{company_id}&role=eq.founder',
-        prefer='return=minimal')
-
-def link_founder(company_id, person_id):
-    req('POST', 'company_people',
-        body={'company_id': company_id, 'person_id': person_id,
-              'role': 'founder', 'is_current': True},
-        prefer='return=minimal')
+def find_companies(client, names):
+    """Return {name: {'id', 'name'}} for the names found, in a few chunked name_key reads."""
+    by_key = {}
+    for row in select_in(client, 'companies', 'id,name,name_key', 'name_key', {name_key(n) for n in names}):
+        by_key.setdefault(row['name_key'], {'id': row['id'], 'name': row['name']})
+    found = {n: by_key[name_key(n)] for n in names if name_key(n) in by_key}
+    missing = [n for n in names if n not in found]
+    if missing:
+        # Fallback: prefix match for companies with suffixes like "(ex-Meero)",
+        # against one paged read of every company instead of a query per name
+        rows = select_all(client, 'companies', 'id,name,name_key')
+        for n in missing:
+            prefix = name_key(n) + ' '
+            match = next((r for r in rows if (r['name_key'] or '').startswith(prefix)), None)
+            if match:
+                found[n] = {'id': match['id'], 'name': match['name']}
+    return found
+
+def get_founder_links(company_ids):
+    """Return {company_id: {person_id: {'id', 'is_current'}}} for many companies at once."""
+    return load_links(get_client(), 'company_people', 'company_id', 'person_id', company_ids,
+                      columns=('is_current',), filters='role=eq.founder')
 
 # ── Batch 1 ───────────────────────────────────────────────────────────────────
 # Adcytherix, Upway, Vibe, Pelico, Onepark, Step Pharma, Maki, Spiko,
@@ -151,7 +132,7 @@ UPDATES = [
     ('Retab',                    ['Victor Plaisance', 'Louis de Benoist', 'Sacha Ichbiah']),
     ('Tibeka Protections',       ['Stéphane Belamy', 'Mulat Alubel Abtew', 'Bertrand Meslier']),
     ('Waypoint AI',              ['Steve Boogar', 'Liam Boogar-Azoulay', 'Tomas Polivka']),
-    # ROB\u2019OCC: matched by ID (curly apostrophe in name); Patrick Dehlinger
+    ("ROB'OCC",                  ['Patrick Dehlinger']),   # stored with a curly apostrophe
     ('MNGRS.AI',                 ['Alexandre Deniot', 'Thomas Quenoil']),
     ('Kikleo',                   ['Vincent Garcia', 'Jean Dussaix', "Martin d'Agay"]),
     ('WeWard',                   ['Yves Benchimol', 'Tanguy de La Villegeorges', 'Nicolas Hardy']),
@@ -159,24 +140,57 @@ UPDATES = [
 
 # ── Main ─────────────────────────────────────────────────────────────────────
 def main():
+    dry_run = '--dry-run' in sys.argv
     print('==============================================')
-    print('Batch Founder Update')
+    print('Batch Founder Update' + (' (dry run)' if dry_run else ''))
     print('==============================================\n')
-    ok = err = 0
+    client = get_client()
+    resolver = EntityResolver(client)
+    resolver.prefetch('people', {name for _, founders in UPDATES for name in founders})
 
-    for company_name, founders in UPDATES:
+    # 1. Load current state in bulk
+    companies = {}
+    err = 0
+    try:
+        found = find_companies(client, dict(UPDATES))
+    except Exception as e:
+        print(f'  ERROR loading companies: {e}'); sys.exit(1)
+    for company_name in dict(UPDATES):
+        comp = found.get(company_name)
+        if not comp:
+            print(f'  NOT FOUND: "{company_name}"'); err += 1; continue
+        companies[company_name] = comp
+    links = get_founder_links([c['id'] for c in companies.values()])
+
+    # 2. Plan the difference
+    plan = ChangePlan()
+    ok = 0
+    # A company listed twice takes its last entry, as when entries ran in order
+    for company_name, founders in dict(UPDATES).items():
+        comp = companies.get(company_name)
+        if not comp:
+            continue
+        desired = {}
+        for name in founders:
+            pid = resolver.get('people', name) or plan.create('people', name)
+            desired.setdefault(pid, {'is_current': True})
+        before = plan.size()
+        plan.diff_links('company_people', 'company_id', 'person_id', comp['id'],
+                        links[comp['id']], desired, key_extra={'role': 'founder'},
+                        label=comp['name'],
+                        child_labels={resolver.get('people', n): n for n in founders})
+        status = '' if plan.size() > before else ' (unchanged)'
+        print(f'  ✓ {comp["name"]}: {", ".join(founders)}{status}')
+        ok += 1
+
+    # 3. Apply only the delta
+    plan.print()
+    if not dry_run and not plan.is_empty():
         try:
-            comp = find_company(company_name)
-            if not comp:
-                print(f'  NOT FOUND: "{company_name}"'); err += 1; continue
-            clear_founders(comp['id'])
-            for name in founders:
-                pid = get_or_create_person(name)
-                link_founder(comp['id'], pid)
-            print(f'  ✓ {comp["name"]}: {", ".join(founders)}')
-            ok += 1
+            plan.apply(client, resolver)
+            print('  Plan applied.')
         except Exception as e:
-            print(f'  ERROR {company_name}: {e}'); err += 1
+            print(f'  ERROR applying plan: {e}'); err += 1
 
     print(f'\n  Done — {ok} updated, {err} errors\n')
     if err: sys.exit(1)
@@ -1,78 +1,43 @@
 #!/usr/bin/env python3
 """
 Batch investor update script.
-For each company: clears existing investor links and sets them to the specified list.
+For each company: sets the investor links of every round to the specified list
+(first investor is the lead). Current links are loaded in bulk and only the
+difference is written; links that stay keep their id and investment amount.
+
 Usage:
   export SUPABASE_SERVICE_KEY="..."
-  python3 migration/update-investors-batch.py
+  python3 migration/update-investors-batch.py [--dry-run]
 """
 
-import json, os, sys, urllib.request, urllib.parse
+import sys
 
-SUPABASE_URL = os.environ.get('SUPABASE_URL', 'https://tlwqkglfyjydwsgjrclx.supabase.co')
-SERVICE_KEY  = os.environ.get('SUPABASE_SERVICE_KEY', '')
+from change_plan import ChangePlan, load_links
+from entity_resolver import EntityResolver, select_in
+from name_key import name_key
+from supabase_rest import SERVICE_KEY, get_client
 
 if not SERVICE_KEY:
     print('Error: SUPABASE_SERVICE_KEY required'); sys.exit(1)
 
-HEADERS = {
-    'apikey': SERVICE_KEY,
-    'Authorization': f'Bearer {SERVICE_KEY}',
-    'Content-Type': 'application/json',
-    'Prefer': 'return=representation',
-}
-
-def req(method, path, body=None, prefer=None):
-    url = f'{SUPABASE_URL}/rest/v1/{path}'
-    h = dict(HEADERS)
-    if prefer: h['Prefer'] = prefer
-    data = json.dumps(body).encode() if body is not None else None
-    r = urllib.request.Request(url, data=data, headers=h, method=method)
-    try:
-        with urllib.request.urlopen(r) as resp:
-            c = resp.read()
-            return json.loads(c) if c else None
-    except urllib.error.HTTPError as e:
-        raise RuntimeError(f'HTTP {e.code} {method} /{path}: {e.read().decode()}')
-
-def find_company(name):
-    enc = urllib.parse.quote(name, safe='')
-    rows = req('GET', f'companies?select=id,name&name=ilike.{enc}')
-    return rows[0] if rows else None
-
-def get_rounds(company_id):
-    return req('GET', f'funding_rounds?select=id&company_id=eq.{company_id}') or []
-
-def get_round_investor_amounts(round_id):
-    """Return {investor_id: investment_amount_eur} for existing links (None values excluded)."""
-    rows = req('GET', f'funding_round_investors?select=investor_id,investment_amount_eur&funding_round_id=eq.{round_id}') or []
-    return {r['investor_id']: r['investment_amount_eur'] for r in rows if r['investment_amount_eur'] is not None}
-
-def clear_round_investors(round_id):
-    req('DELETE', f'funding_round_investors?funding_round_id=eq.{round_id}', prefer='return=minimal')
-
-def upsert_investor(name):
-    enc = urllib.parse.quote(name, safe='')
-    rows = req('GET', f'investors?select=id&name=eq.{enc}')
-    if rows:
-        return rows[0]['id']
-    # Not found — create it
-    try:
-        rows = req('POST', 'investors', body={'name': name})
-        return rows[0]['id']
-    except RuntimeError as e:
-        if '23505' in str(e) or '409' in str(e):
-            # Race condition — fetch again
-            rows = req('GET', f'investors?select=id&name=eq.{enc}')
-            return rows[0]['id'] if rows else None
-        raise
-
-def link_investor(round_id, investor_id, is_lead=False, investment_amount_eur=None):
-    body = {'funding_round_id': round_id, 'investor_id': investor_id, 'is_lead': is_lead}
-    if investment_amount_eur is not None:
-        body['investment_amount_eur'] = investment_amount_eur
-    req('POST', 'funding_round_investors', body=body,
-        prefer='resolution=ignore-duplicates,return=minimal')
+def find_companies(client, names):
+    """Return {name: {'id', 'name'}} for the names found, in a few chunked name_key reads."""
+    by_key = {}
+    for row in select_in(client, 'companies', 'id,name,name_key', 'name_key', {name_key(n) for n in names}):
+        by_key.setdefault(row['name_key'], {'id': row['id'], 'name': row['name']})
+    return {n: by_key[name_key(n)] for n in names if name_key(n) in by_key}
+
+def get_rounds(company_ids):
+    """Return {company_id: [round_id, ...]} for many companies at once."""
+    rounds = {}
+    for r in select_in(get_client(), 'funding_rounds', 'id,company_id', 'company_id', company_ids):
+        rounds.setdefault(r['company_id'], []).append(r['id'])
+    return rounds
+
+def get_round_links(round_ids):
+    """Return {round_id: {investor_id: {'id', 'is_lead'}}} for many rounds at once."""
+    return load_links(get_client(), 'funding_round_investors', 'funding_round_id', 'investor_id',
+                      round_ids, columns=('is_lead',))
 
 # ── Company → investor list ──────────────────────────────────────────────────
 UPDATES = [
@@ -156,48 +121,64 @@ UPDATES = [
 
 # ── Main ─────────────────────────────────────────────────────────────────────
 def main():
+    dry_run = '--dry-run' in sys.argv
     print('==============================================')
-    print('Batch Investor Update')
+    print('Batch Investor Update' + (' (dry run)' if dry_run else ''))
     print('==============================================\n')
-    ok = err = 0
+    client = get_client()
+    resolver = EntityResolver(client)
+    resolver.prefetch('investors', {name for _, investors in UPDATES for name in investors})
 
-    for company_name, investors in UPDATES:
+    # 1. Load current state in bulk
+    companies = {}
+    err = 0
+    try:
+        found = find_companies(client, dict(UPDATES))
+    except Exception as e:
+        print(f'  ERROR loading companies: {e}'); sys.exit(1)
+    for company_name in dict(UPDATES):
+        comp = found.get(company_name)
+        if not comp:
+            print(f'  NOT FOUND: "{company_name}"'); err += 1; continue
+        companies[company_name] = comp
+    rounds = get_rounds([c['id'] for c in companies.values()])
+    links = get_round_links([rid for rids in rounds.values() for rid in rids])
+
+    # 2. Plan the difference
+    plan = ChangePlan()
+    ok = 0
+    # A company listed twice takes its last entry, as when entries ran in order
+    for company_name, investors in dict(UPDATES).items():
+        comp = companies.get(company_name)
+        if not comp:
+            continue
+        comp_rounds = rounds.get(comp['id'], [])
+        if not comp_rounds:
+            print(f'  NO ROUNDS: "{company_name}"'); err += 1; continue
+
+        desired = {}
+        for i, name in enumerate(investors):
+            inv = resolver.get('investors', name) or plan.create('investors', name)
+            desired.setdefault(inv, {'is_lead': i == 0})
+        before = plan.size()
+        for rid in comp_rounds:
+            plan.diff_links('funding_round_investors', 'funding_round_id', 'investor_id', rid,
+                            links[rid], desired, label=comp['name'],
+                            child_labels={resolver.get('investors', n): n for n in investors})
+
+        suffix = f' (×{len(comp_rounds)} rounds)' if len(comp_rounds) > 1 else ''
+        status = '' if plan.size() > before else ' (unchanged)'
+        print(f'  ✓ {comp["name"]}{suffix}: {", ".join(investors)}{status}')
+        ok += 1
+
+    # 3. Apply only the delta
+    plan.print()
+    if not dry_run and not plan.is_empty():
         try:
-            comp = find_company(company_name)
-            if not comp:
-                print(f'  NOT FOUND: "{company_name}"'); err += 1; continue
-
-            rounds = get_rounds(comp['id'])
-            if not rounds:
-                print(f'  NO ROUNDS: "{company_name}"'); err += 1; continue
-
-            # Snapshot per-round amounts before clearing, keyed by investor_id
-            round_amounts = {rnd['id']: get_round_investor_amounts(rnd['id']) for rnd in rounds}
-
-            # Clear all existing investor links across all rounds
-            for rnd in rounds:
-                clear_round_investors(rnd['id'])
-
-            # Upsert each investor and link to every round
-            investor_ids = []
-            for inv_name in investors:
-                inv_id = upsert_investor(inv_name)
-                if not inv_id:
-                    raise RuntimeError(f'Could not upsert investor "{inv_name}"')
-                investor_ids.append((inv_name, inv_id))
-
-            for rnd in rounds:
-                amounts = round_amounts[rnd['id']]
-                for i, (inv_name, inv_id) in enumerate(investor_ids):
-                    link_investor(rnd['id'], inv_id, is_lead=(i == 0),
-                                  investment_amount_eur=amounts.get(inv_id))
-
-            suffix = f' (×{len(rounds)} rounds)' if len(rounds) > 1 else ''
-            print(f'  ✓ {comp["name"]}{suffix}: {", ".join(investors)}')
-            ok += 1
-
+            plan.apply(client, resolver)
+            print('  Plan applied.')
         except Exception as e:
-            print(f'  ERROR {company_name}: {e}'); err += 1
+            print(f'  ERROR applying plan: {e}'); err += 1
 
     print(f'\n  Done — {ok} updated, {err} errors\n')
     if err: sys.exit(1)
@@ -0,0 +1,198 @@
+-- =============================================
+-- INGEST_DEAL RPC
+-- One deal document in, every get-or-create and link done server-side
+-- =============================================
+--
+-- Called through PostgREST:
+--   POST /rest/v1/rpc/ingest_deal   {"deal":  {...}}         → {"company_id", "round_ids"}
+--   POST /rest/v1/rpc/ingest_deals  {"deals": [{...}, ...]}  → [{"ok", "company_id", "round_ids" | "error"}]
+--
+-- Deal document (the nested shape used by migration/deal_ingest.py, with
+-- sectors already resolved to ids):
+--   {
+--     "company":    {"name", "description", "website", "hq_city_name", "hq_country", ...},
+--     "link_city":  true,                  -- also get-or-create the city, set hq_city_id
+--     "sector_ids": ["uuid", ...],         -- first one is the primary sector
+--     "founders":   ["Full Name", ...],
+--     "rounds":     [{"round_type", "amount_eur", "announced_month", "announced_year",
+--                     "is_verified", ..., "investors": ["Name", ...]}]   -- first investor leads
+--   }
+--
+-- company and rounds take any writable column of companies / funding_rounds,
+-- with the same meaning as a direct insert of that object (the step-by-step
+-- path): a key that is present is stored as given, null included, and a
+-- missing key gets the column default. Any other key is an error rather
+-- than being dropped.
+--
+-- A deal is all-or-nothing: a failure rolls back its company, rounds and
+-- links. ingest_deals runs each deal in its own subtransaction, so one bad
+-- deal is reported in its result slot and the others still commit.
+--
+-- Companies, people and investors are matched on name_key (see
+-- 20261017000200_name_key.sql) like migration/entity_resolver.py does:
+-- "ROB’OCC" finds "Rob'Occ", and among rows sharing a key the one spelled
+-- exactly like the name wins. A name without any letter or digit (empty
+-- key) only matches itself. Each get-or-create takes a transaction-scoped
+-- advisory lock on the key, so concurrent callers never create two rows
+-- for variants of one name.
+
+CREATE OR REPLACE FUNCTION ingest_deal(deal JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    v_company   JSONB := deal->'company';
+    v_name      TEXT := NULLIF(btrim(v_company->>'name'), '');
+    v_city_id   UUID;
+    v_company_id UUID;
+    v_round     JSONB;
+    v_round_id  UUID;
+    v_round_ids JSONB := '[]'::jsonb;
+    v_name_item TEXT;
+    v_key       TEXT;
+    v_person_id UUID;
+    v_inv_id    UUID;
+    v_pos       INTEGER;
+    v_unknown   TEXT;
+BEGIN
+    IF v_name IS NULL THEN
+        RAISE EXCEPTION 'deal has no company name';
+    END IF;
+    SELECT string_agg(k, ', ') INTO v_unknown
+    FROM jsonb_object_keys(v_company) AS k
+    WHERE k <> ALL (ARRAY['name', 'description', 'website', 'hq_city_id', 'hq_city_name',
+                          'hq_country', 'founded_year', 'status', 'logo_url', 'siren', 'siret']);
+    IF v_unknown IS NOT NULL THEN
+        RAISE EXCEPTION 'unknown company column(s): %', v_unknown;
+    END IF;
+
+    -- City
+    IF COALESCE((deal->>'link_city')::boolean, false)
+       AND NULLIF(v_company->>'hq_city_name', '') IS NOT NULL THEN
+        INSERT INTO cities (name, country)
+        VALUES (v_company->>'hq_city_name', 'France')
+        ON CONFLICT (name, country) DO NOTHING;
+        SELECT id INTO v_city_id FROM cities
+        WHERE name = v_company->>'hq_city_name' AND country = 'France';
+    END IF;
+
+    -- Company
+    v_key := name_key(v_name);
+    PERFORM pg_advisory_xact_lock(hashtext('companies:' || v_key));
+    SELECT id INTO v_company_id FROM companies
+    WHERE name_key = v_key AND (v_key <> '' OR name = v_name)
+    ORDER BY name = v_name DESC, id LIMIT 1;
+    IF v_company_id IS NULL THEN
+        -- Column defaults of companies, overridden by the keys the deal carries
+        INSERT INTO companies (name, description, website, hq_city_id, hq_city_name, hq_country,
+                               founded_year, status, logo_url, siren, siret)
+        SELECT v_name, c.description, c.website, COALESCE(v_city_id, c.hq_city_id), c.hq_city_name,
+               c.hq_country, c.founded_year, c.status, c.logo_url, c.siren, c.siret
+        FROM jsonb_populate_record(NULL::companies,
+                                   '{"hq_country": "France", "status": "active"}'::jsonb || v_company) AS c
+        RETURNING id INTO v_company_id;
+    END IF;
+
+    -- Sectors (first one is primary)
+    INSERT INTO company_sectors (company_id, sector_id, is_primary)
+    SELECT v_company_id, s.value::uuid, s.ord = 1
+    FROM jsonb_array_elements_text(COALESCE(deal->'sector_ids', '[]'::jsonb))
+         WITH ORDINALITY AS s(value, ord)
+    ON CONFLICT (company_id, sector_id) DO NOTHING;
+
+    -- Founders
+    FOR v_name_item IN
+        SELECT DISTINCT btrim(f) FROM jsonb_array_elements_text(COALESCE(deal->'founders', '[]'::jsonb)) AS f
+        WHERE btrim(f) <> ''
+    LOOP
+        v_key := name_key(v_name_item);
+        PERFORM pg_advisory_xact_lock(hashtext('people:' || v_key));
+        SELECT id INTO v_person_id FROM people
+        WHERE name_key = v_key AND (v_key <> '' OR full_name = v_name_item)
+        ORDER BY full_name = v_name_item DESC, id LIMIT 1;
+        IF v_person_id IS NULL THEN
+            INSERT INTO people (full_name) VALUES (v_name_item) RETURNING id INTO v_person_id;
+        END IF;
+        INSERT INTO company_people (company_id, person_id, role, is_current)
+        VALUES (v_company_id, v_person_id, 'founder', true)
+        ON CONFLICT (company_id, person_id, role) DO NOTHING;
+    END LOOP;
+
+    -- Rounds and their investors
+    FOR v_round IN SELECT value FROM jsonb_array_elements(COALESCE(deal->'rounds', '[]'::jsonb))
+    LOOP
+        SELECT string_agg(k, ', ') INTO v_unknown
+        FROM jsonb_object_keys(v_round) AS k
+        WHERE k <> ALL (ARRAY['round_type', 'amount_eur', 'announced_date', 'announced_month',
+                              'announced_year', 'valuation_eur', 'news_url', 'press_release_url',
+                              'notes', 'is_verified', 'source', 'investors']);
+        IF v_unknown IS NOT NULL THEN
+            RAISE EXCEPTION 'unknown funding round column(s): %', v_unknown;
+        END IF;
+
+        -- Column defaults of funding_rounds, overridden by the keys the round carries
+        INSERT INTO funding_rounds (company_id, round_type, amount_eur, announced_date,
+                                    announced_month, announced_year, valuation_eur, news_url,
+                                    press_release_url, notes, is_verified, source)
+        SELECT v_company_id, r.round_type, r.amount_eur, r.announced_date,
+               r.announced_month, r.announced_year, r.valuation_eur, r.news_url,
+               r.press_release_url, r.notes, r.is_verified, r.source
+        FROM jsonb_populate_record(NULL::funding_rounds,
+                                   '{"announced_year": 2025, "is_verified": false, "source": "ftj"}'::jsonb
+                                   || (v_round - 'investors')) AS r
+        RETURNING id INTO v_round_id;
+        v_round_ids := v_round_ids || to_jsonb(v_round_id);
+
+        FOR v_name_item, v_pos IN
+            SELECT btrim(i.value), i.ord
+            FROM jsonb_array_elements_text(COALESCE(v_round->'investors', '[]'::jsonb))
+                 WITH ORDINALITY AS i(value, ord)
+            WHERE btrim(i.value) <> ''
+        LOOP
+            v_key := name_key(v_name_item);
+            PERFORM pg_advisory_xact_lock(hashtext('investors:' || v_key));
+            SELECT id INTO v_inv_id FROM investors
+            WHERE name_key = v_key AND (v_key <> '' OR name = v_name_item)
+            ORDER BY name = v_name_item DESC, id LIMIT 1;
+            IF v_inv_id IS NULL THEN
+                INSERT INTO investors (name) VALUES (v_name_item) RETURNING id INTO v_inv_id;
+            END IF;
+            INSERT INTO funding_round_investors (funding_round_id, investor_id, is_lead)
+            VALUES (v_round_id, v_inv_id, v_pos = 1)
+            ON CONFLICT (funding_round_id, investor_id) DO NOTHING;
+        END LOOP;
+    END LOOP;
+
+    RETURN jsonb_build_object('company_id', v_company_id, 'round_ids', v_round_ids);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION ingest_deals(deals JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    v_deal    JSONB;
+    v_result  JSONB;
+    v_results JSONB := '[]'::jsonb;
+BEGIN
+    FOR v_deal IN SELECT value FROM jsonb_array_elements(deals)
+    LOOP
+        BEGIN
+            v_result := ingest_deal(v_deal) || '{"ok": true}'::jsonb;
+        EXCEPTION WHEN OTHERS THEN
+            v_result := jsonb_build_object('ok', false, 'error', SQLERRM);
+        END;
+        v_results := v_results || jsonb_build_array(v_result);
+    END LOOP;
+    RETURN v_results;
+END;
+$$;
+
+-- Writes bypass RLS only for the service role; keep the RPCs off the public API
+REVOKE EXECUTE ON FUNCTION ingest_deal(JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION ingest_deals(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION ingest_deal(JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION ingest_deals(JSONB) TO service_role;
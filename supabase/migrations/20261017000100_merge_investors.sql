@@ -0,0 +1,89 @@
+-- =============================================
+-- MERGE_INVESTORS
+-- Fold duplicate investor records into a clean one, set-based
+-- =============================================
+--
+--   POST /rest/v1/rpc/merge_investors        {"dirty_ids": ["uuid", ...], "clean_id": "uuid"}
+--   POST /rest/v1/rpc/merge_investors_batch  {"merges": [{"dirty_ids": [...], "clean_id": "..."}, ...]}
+--
+-- For every round a dirty record is linked to:
+--   - the clean investor is already linked → is_lead becomes clean OR dirty,
+--     investment_amount_eur keeps the clean value (filled from dirty if NULL)
+--   - otherwise the link is moved to the clean investor unchanged
+-- then the dirty investors are deleted (their links go with ON DELETE CASCADE).
+--
+-- merge_investors_batch applies a list of merges in one transaction: if one
+-- fails, none is applied.
+
+CREATE OR REPLACE FUNCTION merge_investors(dirty_ids UUID[], clean_id UUID)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    v_dirty   UUID[] := array_remove(dirty_ids, clean_id);
+    v_updated INTEGER;
+    v_moved   INTEGER;
+    v_deleted INTEGER;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM investors WHERE id = clean_id) THEN
+        RAISE EXCEPTION 'clean investor % does not exist', clean_id;
+    END IF;
+
+    -- One row per round across all dirty records
+    CREATE TEMP TABLE _dirty_links ON COMMIT DROP AS
+    SELECT funding_round_id,
+           bool_or(COALESCE(is_lead, false)) AS is_lead,
+           max(investment_amount_eur)        AS investment_amount_eur
+    FROM funding_round_investors
+    WHERE investor_id = ANY(v_dirty)
+    GROUP BY funding_round_id;
+
+    UPDATE funding_round_investors fri
+    SET is_lead = COALESCE(fri.is_lead, false) OR d.is_lead,
+        investment_amount_eur = COALESCE(fri.investment_amount_eur, d.investment_amount_eur)
+    FROM _dirty_links d
+    WHERE fri.investor_id = clean_id
+      AND fri.funding_round_id = d.funding_round_id;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+    INSERT INTO funding_round_investors (funding_round_id, investor_id, is_lead, investment_amount_eur)
+    SELECT d.funding_round_id, clean_id, d.is_lead, d.investment_amount_eur
+    FROM _dirty_links d
+    ON CONFLICT (funding_round_id, investor_id) DO NOTHING;
+    GET DIAGNOSTICS v_moved = ROW_COUNT;
+
+    DELETE FROM investors WHERE id = ANY(v_dirty);
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+
+    DROP TABLE _dirty_links;
+
+    RETURN jsonb_build_object('links_moved', v_moved,
+                              'links_merged', v_updated,
+                              'investors_deleted', v_deleted);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION merge_investors_batch(merges JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    v_merge   JSONB;
+    v_results JSONB := '[]'::jsonb;
+BEGIN
+    FOR v_merge IN SELECT value FROM jsonb_array_elements(merges)
+    LOOP
+        v_results := v_results || jsonb_build_array(merge_investors(
+            ARRAY(SELECT jsonb_array_elements_text(v_merge->'dirty_ids'))::uuid[],
+            (v_merge->>'clean_id')::uuid));
+    END LOOP;
+    RETURN v_results;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION merge_investors(UUID[], UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION merge_investors_batch(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION merge_investors(UUID[], UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION merge_investors_batch(JSONB) TO service_role;
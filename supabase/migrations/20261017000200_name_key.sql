@@ -0,0 +1,42 @@
+-- =============================================
+-- NAME_KEY
+-- Normalized name key for indexed, variant-tolerant lookups
+-- =============================================
+--
+-- name_key('ROB’OCC') = name_key('Rob''Occ') = 'rob occ'
+--
+-- Must produce exactly what migration/name_key.py produces: ligatures
+-- first, then the accent map (same FROM / TO strings as ACCENTS_FROM /
+-- ACCENTS_TO there), then runs of anything but A-Z a-z 0-9 collapse to one
+-- space, then lower + trim. Only ASCII is left when lower() runs, so the
+-- key does not depend on the database locale.
+--
+-- The column is STORED: after changing this function, drop and re-add the
+-- name_key columns to recompute them.
+
+CREATE OR REPLACE FUNCTION name_key(name TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE STRICT PARALLEL SAFE
+AS $$
+    SELECT btrim(lower(regexp_replace(
+        translate(
+            replace(replace(replace(replace(replace(name,
+                'Œ', 'oe'), 'œ', 'oe'), 'Æ', 'ae'), 'æ', 'ae'), 'ß', 'ss'),
+            'ÀÁÂÃÄÅÇÈÉÊËÌÍÎÏÑÒÓÔÕÖÙÚÛÜÝàáâãäåçèéêëìíîïñòóôõöùúûüýÿĀāĂăĄąĆćĈĉĊċČčĎďĒēĔĕĖėĘęĚěĜĝĞğĠġĢģĤĥĨĩĪīĬĭĮįİĴĵĶķĹĺĻļĽľŃńŅņŇňŌōŎŏŐőŔŕŖŗŘřŚśŜŝŞşŠšŢţŤťŨũŪūŬŭŮůŰűŲųŴŵŶŷŸŹźŻżŽžȘșȚțØøĐđĦħŁłıŦŧ',
+            'aaaaaaceeeeiiiinooooouuuuyaaaaaaceeeeiiiinooooouuuuyyaaaaaaccccccccddeeeeeeeeeegggggggghhiiiiiiiiijjkkllllllnnnnnnoooooorrrrrrssssssssttttuuuuuuuuuuuuwwyyyzzzzzzssttooddhhllitt'),
+        '[^A-Za-z0-9]+', ' ', 'g')))
+$$;
+
+ALTER TABLE companies ADD COLUMN IF NOT EXISTS name_key TEXT
+    GENERATED ALWAYS AS (name_key(name)) STORED;
+ALTER TABLE investors ADD COLUMN IF NOT EXISTS name_key TEXT
+    GENERATED ALWAYS AS (name_key(name)) STORED;
+ALTER TABLE people ADD COLUMN IF NOT EXISTS name_key TEXT
+    GENERATED ALWAYS AS (name_key(full_name)) STORED;
+
+-- Plain btree, not unique: existing duplicates (see cleanup-investors-cat4.py)
+-- share a key until they are merged
+CREATE INDEX IF NOT EXISTS idx_companies_name_key ON companies(name_key);
+CREATE INDEX IF NOT EXISTS idx_investors_name_key ON investors(name_key);
+CREATE INDEX IF NOT EXISTS idx_people_name_key ON people(name_key);
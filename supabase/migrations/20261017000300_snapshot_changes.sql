@@ -0,0 +1,148 @@
+-- =============================================
+-- SNAPSHOT_CHANGES
+-- Maintained updated_at columns and a deletion log for incremental refresh
+-- =============================================
+--
+--   GET /rest/v1/<table>?updated_at=gte.<watermark>
+--   GET /rest/v1/deleted_rows?deleted_at=gte.<watermark>
+--
+-- migration/build-snapshot.py reads only the rows written or deleted
+-- since its last run and merges them into the previous deals snapshot.
+--
+-- Every table gets an updated_at column (cities, sectors and the junction
+-- tables had none; existing rows start at their created_at), set by a
+-- BEFORE INSERT OR UPDATE trigger so no script has to remember it. Every
+-- deleted row, including those removed by ON DELETE CASCADE, is copied to
+-- deleted_rows by an AFTER DELETE trigger together with its old values, so
+-- the refresh knows which company or round a deleted link belonged to.
+--
+-- Both use now(), the start of the writing transaction: a transaction still
+-- running when the refresh reads commits rows stamped before its watermark.
+-- The refresh therefore re-reads an overlap window before the watermark.
+--
+-- deleted_rows is only readable with the service key. Rows older than the
+-- refresh's retention (TOMBSTONE_RETENTION_DAYS, 90) can be pruned:
+--   DELETE FROM deleted_rows WHERE deleted_at < NOW() - INTERVAL '90 days';
+
+ALTER TABLE cities ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE sectors ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE company_people ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE company_sectors ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE funding_round_investors ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+
+UPDATE cities SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE sectors SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE company_people SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE company_sectors SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE funding_round_investors SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+
+ALTER TABLE cities ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE sectors ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE company_people ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE company_sectors ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE funding_round_investors ALTER COLUMN updated_at SET DEFAULT NOW();
+
+CREATE TABLE IF NOT EXISTS deleted_rows (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    table_name TEXT NOT NULL,
+    row_id UUID NOT NULL,
+    old_row JSONB NOT NULL,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- No policy: anon and authenticated see nothing, the service key bypasses RLS
+ALTER TABLE deleted_rows ENABLE ROW LEVEL SECURITY;
+
+CREATE INDEX IF NOT EXISTS idx_cities_updated_at ON cities(updated_at);
+CREATE INDEX IF NOT EXISTS idx_sectors_updated_at ON sectors(updated_at);
+CREATE INDEX IF NOT EXISTS idx_companies_updated_at ON companies(updated_at);
+CREATE INDEX IF NOT EXISTS idx_people_updated_at ON people(updated_at);
+CREATE INDEX IF NOT EXISTS idx_investors_updated_at ON investors(updated_at);
+CREATE INDEX IF NOT EXISTS idx_funding_rounds_updated_at ON funding_rounds(updated_at);
+CREATE INDEX IF NOT EXISTS idx_company_people_updated_at ON company_people(updated_at);
+CREATE INDEX IF NOT EXISTS idx_company_sectors_updated_at ON company_sectors(updated_at);
+CREATE INDEX IF NOT EXISTS idx_funding_round_investors_updated_at ON funding_round_investors(updated_at);
+CREATE INDEX IF NOT EXISTS idx_deleted_rows_deleted_at ON deleted_rows(deleted_at);
+
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION log_deleted_row()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    INSERT INTO deleted_rows (table_name, row_id, old_row)
+    VALUES (TG_TABLE_NAME, OLD.id, to_jsonb(OLD));
+    RETURN OLD;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION set_updated_at() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION log_deleted_row() FROM PUBLIC, anon, authenticated;
+
+DROP TRIGGER IF EXISTS cities_updated_at ON cities;
+CREATE TRIGGER cities_updated_at BEFORE INSERT OR UPDATE ON cities
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+DROP TRIGGER IF EXISTS sectors_updated_at ON sectors;
+CREATE TRIGGER sectors_updated_at BEFORE INSERT OR UPDATE ON sectors
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+DROP TRIGGER IF EXISTS companies_updated_at ON companies;
+CREATE TRIGGER companies_updated_at BEFORE INSERT OR UPDATE ON companies
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+DROP TRIGGER IF EXISTS people_updated_at ON people;
+CREATE TRIGGER people_updated_at BEFORE INSERT OR UPDATE ON people
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+DROP TRIGGER IF EXISTS investors_updated_at ON investors;
+CREATE TRIGGER investors_updated_at BEFORE INSERT OR UPDATE ON investors
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+DROP TRIGGER IF EXISTS funding_rounds_updated_at ON funding_rounds;
+CREATE TRIGGER funding_rounds_updated_at BEFORE INSERT OR UPDATE ON funding_rounds
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+DROP TRIGGER IF EXISTS company_people_updated_at ON company_people;
+CREATE TRIGGER company_people_updated_at BEFORE INSERT OR UPDATE ON company_people
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+DROP TRIGGER IF EXISTS company_sectors_updated_at ON company_sectors;
+CREATE TRIGGER company_sectors_updated_at BEFORE INSERT OR UPDATE ON company_sectors
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+DROP TRIGGER IF EXISTS funding_round_investors_updated_at ON funding_round_investors;
+CREATE TRIGGER funding_round_investors_updated_at BEFORE INSERT OR UPDATE ON funding_round_investors
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS cities_deleted ON cities;
+CREATE TRIGGER cities_deleted AFTER DELETE ON cities
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_row();
+DROP TRIGGER IF EXISTS sectors_deleted ON sectors;
+CREATE TRIGGER sectors_deleted AFTER DELETE ON sectors
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_row();
+DROP TRIGGER IF EXISTS companies_deleted ON companies;
+CREATE TRIGGER companies_deleted AFTER DELETE ON companies
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_row();
+DROP TRIGGER IF EXISTS people_deleted ON people;
+CREATE TRIGGER people_deleted AFTER DELETE ON people
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_row();
+DROP TRIGGER IF EXISTS investors_deleted ON investors;
+CREATE TRIGGER investors_deleted AFTER DELETE ON investors
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_row();
+DROP TRIGGER IF EXISTS funding_rounds_deleted ON funding_rounds;
+CREATE TRIGGER funding_rounds_deleted AFTER DELETE ON funding_rounds
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_row();
+DROP TRIGGER IF EXISTS company_people_deleted ON company_people;
+CREATE TRIGGER company_people_deleted AFTER DELETE ON company_people
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_row();
+DROP TRIGGER IF EXISTS company_sectors_deleted ON company_sectors;
+CREATE TRIGGER company_sectors_deleted AFTER DELETE ON company_sectors
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_row();
+DROP TRIGGER IF EXISTS funding_round_investors_deleted ON funding_round_investors;
+CREATE TRIGGER funding_round_investors_deleted AFTER DELETE ON funding_round_investors
+    FOR EACH ROW EXECUTE FUNCTION log_deleted_row();
@@ -0,0 +1,189 @@
+-- =============================================
+-- FUNDING_COMPLETE
+-- Materialized joined deals behind v_funding_complete, refreshed per company
+-- =============================================
+--
+--   POST /rest/v1/rpc/refresh_funding_complete  {"company_ids": ["uuid", ...]}   those companies
+--   POST /rest/v1/rpc/refresh_funding_complete  {}                               everything
+--   → {"rows": 12, "as_of": "2026-10-17T09:00:00.123456+00:00"}
+--
+-- v_funding_complete ran three correlated json_agg subqueries per row and
+-- sorted by announced_month as TEXT ("March" after "January", '3' before
+-- both). funding_complete holds the same joined document per funding round,
+-- built with one grouped aggregate per related table, plus:
+--   month_number  announced_month as 1-12 (month_number() below)
+--   sort_date     announced_date, else the 1st of announced month / year
+--                 (an unknown month counts as January), for chronological order
+--
+-- refresh_funding_complete(company_ids) deletes and rebuilds the rows of
+-- those companies (including rounds that moved to them) in one transaction;
+-- without ids it rebuilds the table. migration/refresh-funding-complete.py
+-- passes the companies touched since its last run, found through the
+-- updated_at / deleted_rows changes of 20261017000300_snapshot_changes.sql,
+-- and keeps its watermark in refresh_state. Rounds and companies deleted
+-- in between disappear with them (ON DELETE CASCADE).
+--
+-- v_funding_complete keeps its columns and now reads the table, newest first.
+
+-- Must give exactly what month_number() in migration/snapshot.py gives
+CREATE OR REPLACE FUNCTION month_number(month TEXT)
+RETURNS SMALLINT
+LANGUAGE sql
+IMMUTABLE STRICT PARALLEL SAFE
+AS $$
+    SELECT CASE
+        WHEN k ~ '^(0?[1-9]|1[0-2])$' THEN k::SMALLINT
+        WHEN k ~ '^[0-9]+$' THEN NULL
+        WHEN length(k) >= 3 THEN (
+            SELECT m.n::SMALLINT
+            FROM unnest(
+                ARRAY['january', 'february', 'march', 'april', 'may', 'june', 'july',
+                      'august', 'september', 'october', 'november', 'december'],
+                ARRAY['janvier', 'fevrier', 'mars', 'avril', 'mai', 'juin', 'juillet',
+                      'aout', 'septembre', 'octobre', 'novembre', 'decembre']
+            ) WITH ORDINALITY AS m(en, fr, n)
+            WHERE m.en LIKE k || '%' OR m.fr LIKE k || '%'
+            ORDER BY (m.en LIKE k || '%') DESC, m.n
+            LIMIT 1)
+    END
+    FROM name_key(month) AS k
+$$;
+
+CREATE TABLE IF NOT EXISTS funding_complete (
+    id UUID PRIMARY KEY REFERENCES funding_rounds(id) ON DELETE CASCADE,
+    company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    company_name TEXT NOT NULL,
+    company_description TEXT,
+    company_website TEXT,
+    hq_city_name TEXT,
+    round_type TEXT,
+    amount_eur DECIMAL(15, 2),
+    announced_date DATE,
+    announced_month TEXT,
+    announced_year INTEGER,
+    month_number SMALLINT,
+    sort_date DATE,
+    news_url TEXT,
+    sectors JSONB NOT NULL DEFAULT '[]',
+    founders JSONB NOT NULL DEFAULT '[]',
+    investors JSONB NOT NULL DEFAULT '[]',
+    refreshed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_funding_complete_company ON funding_complete(company_id);
+CREATE INDEX IF NOT EXISTS idx_funding_complete_year ON funding_complete(announced_year);
+CREATE INDEX IF NOT EXISTS idx_funding_complete_sort_date ON funding_complete(sort_date DESC NULLS LAST, amount_eur DESC NULLS LAST);
+CREATE INDEX IF NOT EXISTS idx_funding_complete_amount ON funding_complete(amount_eur DESC NULLS LAST);
+
+ALTER TABLE funding_complete ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Allow public read access" ON funding_complete;
+CREATE POLICY "Allow public read access" ON funding_complete FOR SELECT USING (true);
+
+-- Watermarks of the incremental refresh jobs, by job name (service key only)
+CREATE TABLE IF NOT EXISTS refresh_state (
+    id TEXT PRIMARY KEY,
+    watermark TIMESTAMPTZ,
+    refreshed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE refresh_state ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION refresh_funding_complete(company_ids UUID[] DEFAULT NULL)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    IF company_ids IS NULL THEN
+        DELETE FROM funding_complete;
+    ELSE
+        DELETE FROM funding_complete fc
+        WHERE fc.company_id = ANY(company_ids)
+           OR fc.id IN (SELECT fr.id FROM funding_rounds fr WHERE fr.company_id = ANY(company_ids));
+    END IF;
+
+    INSERT INTO funding_complete (
+        id, company_id, company_name, company_description, company_website, hq_city_name,
+        round_type, amount_eur, announced_date, announced_month, announced_year,
+        month_number, sort_date, news_url, sectors, founders, investors)
+    WITH rounds AS (
+        SELECT fr.*
+        FROM funding_rounds fr
+        WHERE company_ids IS NULL OR fr.company_id = ANY(company_ids)
+    ),
+    company_sector_list AS (
+        SELECT cs.company_id,
+               jsonb_agg(jsonb_build_object('id', s.id, 'name', s.name, 'slug', s.slug, 'color', s.color)
+                         ORDER BY cs.is_primary DESC, s.name) AS sectors
+        FROM company_sectors cs
+        JOIN sectors s ON s.id = cs.sector_id
+        WHERE cs.company_id IN (SELECT company_id FROM rounds)
+        GROUP BY cs.company_id
+    ),
+    company_founder_list AS (
+        SELECT cp.company_id,
+               jsonb_agg(jsonb_build_object('id', p.id, 'name', p.full_name, 'linkedin', p.linkedin_url,
+                                            'role', cp.role)
+                         ORDER BY p.full_name) AS founders
+        FROM company_people cp
+        JOIN people p ON p.id = cp.person_id
+        WHERE cp.company_id IN (SELECT company_id FROM rounds)
+        GROUP BY cp.company_id
+    ),
+    round_investor_list AS (
+        SELECT fri.funding_round_id,
+               jsonb_agg(jsonb_build_object('id', i.id, 'name', i.name, 'is_lead', fri.is_lead)
+                         ORDER BY fri.is_lead DESC, i.name) AS investors
+        FROM funding_round_investors fri
+        JOIN investors i ON i.id = fri.investor_id
+        WHERE fri.funding_round_id IN (SELECT id FROM rounds)
+        GROUP BY fri.funding_round_id
+    )
+    SELECT
+        r.id, c.id, c.name, c.description, c.website, c.hq_city_name,
+        r.round_type, r.amount_eur, r.announced_date, r.announced_month, r.announced_year,
+        month_number(r.announced_month),
+        COALESCE(r.announced_date,
+                 make_date(r.announced_year, COALESCE(month_number(r.announced_month), 1), 1)),
+        r.news_url,
+        COALESCE(sl.sectors, '[]'::jsonb),
+        COALESCE(fl.founders, '[]'::jsonb),
+        COALESCE(il.investors, '[]'::jsonb)
+    FROM rounds r
+    JOIN companies c ON c.id = r.company_id
+    LEFT JOIN company_sector_list sl ON sl.company_id = c.id
+    LEFT JOIN company_founder_list fl ON fl.company_id = c.id
+    LEFT JOIN round_investor_list il ON il.funding_round_id = r.id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN jsonb_build_object('rows', v_rows, 'as_of', NOW());
+END;
+$$;
+
+REVOKE ALL ON FUNCTION refresh_funding_complete(UUID[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION refresh_funding_complete(UUID[]) TO service_role;
+
+-- Same columns as before; sectors / founders / investors are now JSONB
+DROP VIEW IF EXISTS v_funding_complete;
+CREATE VIEW v_funding_complete AS
+SELECT
+    company_id,
+    company_name,
+    company_description,
+    company_website,
+    hq_city_name,
+    id AS funding_round_id,
+    round_type,
+    amount_eur,
+    announced_month,
+    announced_year,
+    news_url,
+    sectors,
+    founders,
+    investors
+FROM funding_complete
+ORDER BY sort_date DESC NULLS LAST, amount_eur DESC NULLS LAST;
+
+SELECT refresh_funding_complete();